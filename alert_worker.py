@@ -0,0 +1,174 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+import metrics
+
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit per message
+
+DELIVERY_SECONDS = metrics.histogram("alert_delivery_seconds", "Time from queueing an alert to Telegram accepting it")
+ALERTS_SENT = metrics.counter("alerts_sent_total", "Telegram messages sent (after coalescing)")
+
+
+class NotifierWorker:
+    """
+    Background thread that sends Telegram alerts for the whole process.
+
+    It owns one `telegram.Bot` (and so one pooled HTTP client) and one event
+    loop for its lifetime. `send` only puts the message on a queue, so the
+    scan thread never waits on Telegram. Messages queued within
+    `coalesce_window` seconds of each other that share a `group` (e.g. the
+    candle they fired on) go out as a single message. Rate limits are honoured
+    via RetryAfter, other network errors are retried with jittered backoff.
+    """
+
+    def __init__(self, token, chat_id, coalesce_window=1.0, min_interval=1.0, max_retries=5):
+        self.token = token
+        self.chat_id = chat_id
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval  # Telegram allows ~1 msg/s per chat
+        self.max_retries = max_retries
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_sent = 0.0
+        self._bot_ready = False
+
+    def start(self):
+        with self._lock:
+            # Also restarts a worker that died
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self._thread.start()
+
+    def send(self, msg, group=None):
+        """Queues a message without blocking. Starts (or restarts) the worker if needed."""
+        self.start()
+        self.queue.put_nowait((group, msg, time.monotonic()))
+
+    def flush(self, timeout=30):
+        """Waits until every queued message has been handled (or `timeout`)."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _run(self):
+        from telegram import Bot
+
+        if not self.token or not self.chat_id:
+            print("Error: Bot token or Chat ID not found in environment variables.")
+
+        # The loop and Bot live as long as the thread, so the HTTP client and
+        # its keep-alive connections are reused for every alert. The Bot is
+        # initialized on the first send (see `_send_with_retry`), so a failure
+        # there is retried like any other instead of stopping the worker.
+        loop = asyncio.new_event_loop()
+        bot = Bot(token=self.token) if self.token else None
+        self._bot_ready = False
+
+        while True:
+            batch = self._next_batch()
+            try:
+                loop.run_until_complete(self._deliver(bot, batch))
+            except Exception as e:
+                metrics.ERRORS.inc(stage="notify")
+                print(f"Failed to send alert: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _deliver(self, bot, batch):
+        queued_at = min(item[2] for item in batch)
+        for text in coalesce([item[:2] for item in batch]):
+            if bot is None or not self.chat_id:
+                continue
+            wait = self.min_interval - (time.monotonic() - self._last_sent)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if await self._send_with_retry(bot, text):
+                ALERTS_SENT.inc()
+                DELIVERY_SECONDS.observe(time.monotonic() - queued_at)
+            self._last_sent = time.monotonic()
+
+    def _next_batch(self):
+        # Block for the first message, then gather whatever arrives in the window
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    async def _send_with_retry(self, bot, text):
+        from telegram.error import BadRequest, Forbidden, InvalidToken, RetryAfter, TelegramError
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if not self._bot_ready:
+                    await bot.initialize()
+                    self._bot_ready = True
+                await bot.send_message(chat_id=self.chat_id, text=text)
+                return True
+            except RetryAfter as e:
+                delay = e.retry_after
+                if hasattr(delay, "total_seconds"):
+                    delay = delay.total_seconds()
+                print(f"Telegram rate limit, retrying in {delay}s")
+                await asyncio.sleep(delay)
+            except (BadRequest, Forbidden, InvalidToken) as e:
+                # Retrying won't help
+                metrics.ERRORS.inc(stage="notify")
+                print(f"Failed to send alert: {e}")
+                return False
+            except TelegramError as e:
+                # Start over with a fresh HTTP client on the next attempt
+                await self._reset_bot(bot)
+                delay = min(60, 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"Failed to send alert ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        metrics.ERRORS.inc(stage="notify")
+        print(f"Giving up on alert after {self.max_retries + 1} attempts")
+        return False
+
+    async def _reset_bot(self, bot):
+        if self._bot_ready:
+            self._bot_ready = False
+            try:
+                await bot.shutdown()
+            except Exception as e:
+                print(f"Error closing Telegram client: {e}")
+
+
+def coalesce(batch):
+    """
+    Merges queued (group, msg) pairs into the texts to send: one text per
+    group in first-seen order, ungrouped messages on their own, and nothing
+    longer than Telegram's message limit.
+    """
+    texts = []
+    groups = {}
+    for group, msg in batch:
+        if group is None:
+            texts.append([msg])
+        elif group in groups:
+            groups[group].append(msg)
+        else:
+            groups[group] = [msg]
+            texts.append(groups[group])
+
+    out = []
+    for msgs in texts:
+        text = ""
+        for msg in msgs:
+            msg = msg.strip()
+            if text and len(text) + len(msg) + 2 > MAX_MESSAGE_LENGTH:
+                out.append(text)
+                text = ""
+            text = f"{text}\n\n{msg}" if text else msg
+        out.append(text[:MAX_MESSAGE_LENGTH])
+    return out
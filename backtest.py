@@ -0,0 +1,135 @@
+import functools
+import sys
+import numpy as np
+import pandas as pd
+from config import SYMBOLS, TIMEFRAME, EMA_PERIOD, CANDLE_STORE_DIR, SWEEP_LOOKBACK, SWEEP_PIVOT
+from indicators import ema
+from rules import compile_rules, field
+from strategy import check_liquidity_sweep_signal, liquidity_sweep_rule
+
+WICK_RATIO = 0.3   # min rejection wick / C1 range
+BODY_RATIO = 0.30  # min share of C2 body beyond the EMA
+LOOKBACK = SWEEP_LOOKBACK  # candles before C1 whose low/high C1 must sweep
+PIVOT = SWEEP_PIVOT        # if > 0, sweep the last fractal pivot instead
+
+
+def sweep_signal_masks(o, h, l, c, e, wick_ratio=WICK_RATIO, body_ratio=BODY_RATIO, lookback=LOOKBACK, pivot=PIVOT):
+    """
+    Evaluates the liquidity sweep BUY/SELL rules for every candle at once
+    (the compiled `strategy.liquidity_sweep_rule`).
+
+    Position i is treated as C2, i-1 as C1 and i-2 as the previous candle
+    whose low/high C1 must sweep, exactly like `check_liquidity_sweep_signal`
+    is called from `run_bot`.
+
+    Args:
+        o, h, l, c: float arrays of open/high/low/close, 1-d or
+            (symbols x candles) for several symbols in one pass
+        e: EMA of close, same shape
+        lookback: C1 must sweep the lowest low / highest high of this many
+            candles before it. The live bot compares with the last one only
+            (`recent_lows[-1]`), i.e. 1.
+        pivot: if > 0, C1 must sweep the last confirmed fractal pivot with
+            this many candles on each side instead (lookback is ignored)
+
+    Returns:
+        (buy, sell) boolean arrays indexed by C2 position.
+    """
+    result = sweep_kernel(wick_ratio, body_ratio, lookback, pivot).run({"open": o, "high": h, "low": l, "close": c, "ema": e})
+    return result.mask("sweep", "BUY"), result.mask("sweep", "SELL")
+
+
+@functools.lru_cache(maxsize=None)
+def sweep_kernel(wick_ratio=WICK_RATIO, body_ratio=BODY_RATIO, lookback=LOOKBACK, pivot=PIVOT):
+    """The compiled sweep rule, reading the EMA from a precomputed "ema" column."""
+    return compile_rules([liquidity_sweep_rule(field("ema"), wick_ratio, body_ratio, lookback, pivot)])
+
+
+def backtest_sweep(df, ema_period=EMA_PERIOD, wick_ratio=WICK_RATIO, body_ratio=BODY_RATIO,
+                   lookback=LOOKBACK, pivot=PIVOT):
+    """
+    Runs the liquidity sweep strategy over a full candle history.
+
+    Args:
+        df: DataFrame with time/open/high/low/close columns, sorted by time
+
+    Returns:
+        DataFrame of signals with columns index, time, signal, close, ema.
+    """
+    close = df["close"].to_numpy(dtype=float)
+    e = ema(df["close"].astype(float), ema_period).to_numpy()
+    buy, sell = sweep_signal_masks(
+        df["open"].to_numpy(dtype=float),
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        close,
+        e,
+        wick_ratio,
+        body_ratio,
+        lookback,
+        pivot
+    )
+
+    idx = np.flatnonzero(buy | sell)
+    return pd.DataFrame({
+        "index": idx,
+        "time": df["time"].to_numpy()[idx],
+        "signal": np.where(buy[idx], "BUY", "SELL"),
+        "close": close[idx],
+        "ema": e[idx],
+    })
+
+
+def live_signals(df, ema_period=EMA_PERIOD):
+    """
+    Reference implementation: calls `check_liquidity_sweep_signal` candle by
+    candle the way `run_bot` does. Slow; used to check the vectorized engine.
+
+    Returns:
+        List of (index, signal) tuples.
+    """
+    df = df.reset_index(drop=True)
+    e = ema(df["close"].astype(float), ema_period)
+    out = []
+    for i in range(2, len(df)):
+        recent = df.iloc[max(0, i - 12):i - 1]
+        signal = check_liquidity_sweep_signal(
+            df.iloc[i - 1], df.iloc[i], e.iloc[i - 1], e.iloc[i],
+            recent["low"].tolist(), recent["high"].tolist()
+        )
+        if signal:
+            out.append((i, signal))
+    return out
+
+
+def check_parity(df, ema_period=EMA_PERIOD):
+    """
+    Returns True if the vectorized engine emits exactly the signals the live
+    function does on `df`; prints the first differences otherwise.
+    """
+    signals = backtest_sweep(df, ema_period)
+    fast = [(int(i), s) for i, s in zip(signals["index"], signals["signal"])]
+    slow = live_signals(df, ema_period)
+    if fast == slow:
+        return True
+    print("Parity mismatch!")
+    print("  vectorized only:", sorted(set(fast) - set(slow))[:10])
+    print("  live only:      ", sorted(set(slow) - set(fast))[:10])
+    return False
+
+
+if __name__ == "__main__":
+    import time
+    from candle_store import CandleStore
+
+    BACKTEST_DAYS = 365
+
+    store = CandleStore(CANDLE_STORE_DIR)
+    symbols = sys.argv[1:] or SYMBOLS
+    for symbol in symbols:
+        # Only the candles missing from the local store are downloaded
+        store.backfill(symbol, TIMEFRAME, int(time.time()) - BACKTEST_DAYS * 86400)
+        df = store.read_frame(symbol, TIMEFRAME)
+        signals = backtest_sweep(df)
+        print(f"{symbol}: {len(df)} candles, {len(signals)} signals, parity={check_parity(df)}")
+        print(signals.tail(10).to_string(index=False))
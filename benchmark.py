@@ -0,0 +1,292 @@
+"""
+Benchmarks for one scan cycle: fetch parsing -> indicator -> signal -> alert.
+The alert stage is the real `NotifierWorker` queue and coalescing, with the
+Telegram send stubbed out.
+
+    python benchmark.py                 # quick run, compared against the baseline
+    python benchmark.py --full          # up to 1000 symbols / 1M candles
+    python benchmark.py --save          # record the current timings as the baseline
+    python benchmark.py --payload f.json  # also time a recorded API response
+
+Timings are the best of several repeats. Any case slower than its baseline by
+more than --tolerance makes the run exit with status 1. Timings depend on the
+host, so the baseline isn't committed: record one with --save on the machine
+you compare on (e.g. before a change). Without one the run exits with status 2.
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import delta_api
+from alert_worker import NotifierWorker
+from candle_cache import CandleCache
+from dedupe import SignalDedupe
+from indicators import ema, EMAState
+from rules import compile_rules, stack
+from strategy import check_liquidity_sweep_signal, LIQUIDITY_SWEEP, EMA_DETACH
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+BAR_SECONDS = 15 * 60
+
+
+def make_candles(n, start=1_700_000_000, seed=0):
+    """Random-walk candles as API dicts (the `result` list of the history endpoint)."""
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.exponential(0.5, n)
+    low = np.minimum(open_, close) - rng.exponential(0.5, n)
+    times = start + BAR_SECONDS * np.arange(n)
+    # Newest first, like the API
+    return [
+        {"time": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c), "volume": 1.0}
+        for t, o, h, l, c in zip(times[::-1], open_[::-1], high[::-1], low[::-1], close[::-1])
+    ]
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class StubNotifier(NotifierWorker):
+    """
+    `NotifierWorker` whose Telegram send is a no-op. There is no worker
+    thread: `drain` delivers everything queued, as one coalescing batch,
+    in the calling thread.
+    """
+
+    def __init__(self):
+        super().__init__("token", "chat", coalesce_window=0, min_interval=0)
+        self.loop = asyncio.new_event_loop()
+        self.sent = 0
+
+    def start(self):
+        pass
+
+    async def _send_with_retry(self, bot, text):
+        self.sent += 1
+        return True
+
+    def drain(self):
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            self.loop.run_until_complete(self._deliver(object(), batch))
+        for _ in batch:
+            self.queue.task_done()
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def repeats_for(n):
+    return 20 if n <= 10_000 else 3
+
+
+def bench_parse(body, n, fetch=delta_api.fetch_candles):
+    """JSON decode + DataFrame (or `Candles`, per `fetch`) build."""
+    original = delta_api.session.get
+    delta_api.session.get = lambda *args, **kwargs: FakeResponse(body)
+    try:
+        return best_of(lambda: fetch("BTCUSD", "15m", limit=n), repeats_for(n))
+    finally:
+        delta_api.session.get = original
+
+
+def bench_ema(close):
+    return best_of(lambda: ema(close, 5), repeats_for(len(close)))
+
+
+def bench_ema_state(close):
+    values = close.tolist()
+    state = EMAState(5)
+    state.seed(values[:-1])
+    # One steady-state update per candle
+    return best_of(lambda: state.update(values[-1]), 1000)
+
+
+def bench_sweep_signal(df):
+    e = ema(df["close"], 5)
+    c1, c2 = df.iloc[-2], df.iloc[-1]
+    recent = df.iloc[-12:-2]
+    lows, highs = recent["low"].tolist(), recent["high"].tolist()
+    ema_c1, ema_c2 = e.iloc[-2], e.iloc[-1]
+    return best_of(lambda: check_liquidity_sweep_signal(c1, c2, ema_c1, ema_c2, lows, highs), 1000)
+
+
+def bench_rules_latest(df):
+    kernel = compile_rules([LIQUIDITY_SWEEP, EMA_DETACH])
+    data = {col: df[col].to_numpy() for col in ("open", "high", "low", "close")}
+    return best_of(lambda: kernel.latest(data), 100)
+
+
+def bench_rules_batch(n_symbols, n_candles=100):
+    """Both rules on the latest candle of `n_symbols` symbols in one pass."""
+    kernel = compile_rules([LIQUIDITY_SWEEP, EMA_DETACH])
+    data = stack([
+        {col: np.array([c[col] for c in make_candles(n_candles, seed=i)]) for col in ("open", "high", "low", "close")}
+        for i in range(n_symbols)
+    ], fields=("open", "high", "low", "close"))
+    return best_of(lambda: kernel.latest(data), 10)
+
+
+def load_pdl_strategy():
+    # The PDL bot's modules share names with the root bot's, so load by path
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdl-reentry-bot", "strategy.py")
+    spec = importlib.util.spec_from_file_location("pdl_strategy", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Strategy
+
+
+def bench_pdl_check_signal(df):
+    strategy = load_pdl_strategy()()
+    window = df.iloc[-20:]
+    strategy.pdh = window["high"].max() - 0.5
+    strategy.pdl = window["low"].min() + 0.5
+    return best_of(lambda: strategy.check_signal(window), 1000)
+
+
+def bench_cycle(n_symbols, n_candles=100):
+    """Steady-state `main.scan` body for `n_symbols` with a canned fetch."""
+    import main
+
+    now = int(time.time()) // BAR_SECONDS * BAR_SECONDS
+    candles = make_candles(n_candles + 1, start=now - BAR_SECONDS * n_candles)
+
+    def fetch(symbol, resolution, start, end, timeout=None):
+        return [c for c in candles if start <= c["time"] <= end]
+
+    main.SYMBOLS = [f"SYM{i}" for i in range(n_symbols)]
+    main.BASE_TIMEFRAME = None
+    main.candle_cache = CandleCache(fetch=fetch)
+    main.sent_signals = SignalDedupe()
+    notifier = StubNotifier()
+    main.send_alert = notifier.send
+
+    def cycle():
+        main.scan(["15m"])
+        notifier.drain()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cycle()
+        return best_of(cycle, 3)
+
+
+def bench_alerts(n_signals):
+    """`n_signals` alerts on one candle queued and delivered as coalesced messages."""
+    notifier = StubNotifier()
+    messages = [f"\n🚨 LIQUIDITY SWEEP SIGNAL\n\nSymbol: SYM{i}\nType: BUY\nTimeframe: 15m\nClose: 100.0\n"
+                for i in range(n_signals)]
+
+    def alert():
+        for msg in messages:
+            notifier.send(msg, group="15m_2024-01-01 00:00")
+        notifier.drain()
+
+    return best_of(alert, 20)
+
+
+def run(full, payload_path=None):
+    candle_sizes = [100, 10_000, 100_000, 1_000_000] if full else [100, 10_000]
+    symbol_counts = [5, 100, 1000] if full else [5, 100]
+    results = {}
+
+    for n in candle_sizes:
+        rows = make_candles(n)
+        body = json.dumps({"result": rows}).encode()
+        df = pd.DataFrame(rows[::-1], columns=delta_api.COLUMNS)
+        results[f"parse/{n}"] = bench_parse(body, n)
+        results[f"parse_candles/{n}"] = bench_parse(body, n, delta_api.fetch_candle_series)
+        results[f"ema/{n}"] = bench_ema(df["close"])
+    results["ema_state/update"] = bench_ema_state(df["close"])
+    results["sweep_signal/call"] = bench_sweep_signal(df)
+    results["pdl_check_signal/call"] = bench_pdl_check_signal(df)
+    results["rules/latest"] = bench_rules_latest(df)
+
+    for n in symbol_counts:
+        results[f"cycle/{n}_symbols"] = bench_cycle(n)
+        results[f"rules/{n}_symbols"] = bench_rules_batch(n)
+        results[f"alert/{n}_signals"] = bench_alerts(n)
+
+    if payload_path:
+        with open(payload_path, "rb") as f:
+            body = f.read()
+        n = len(json.loads(body)["result"])
+        results[f"parse/recorded_{os.path.basename(payload_path)}"] = bench_parse(body, n)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        note = "(no baseline)"
+        if base:
+            ratio = seconds / base
+            note = f"{ratio:6.2f}x baseline"
+            if ratio > 1 + tolerance:
+                note += "  <-- REGRESSION"
+                regressions.append(name)
+        print(f"{name:40s} {seconds * 1e3:12.4f} ms  {note}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan-cycle benchmarks")
+    parser.add_argument("--full", action="store_true", help="include 1000 symbols and 100k/1M candles")
+    parser.add_argument("--save", action="store_true", help="store these timings as the baseline")
+    parser.add_argument("--payload", help="recorded history-candles JSON response to time as well")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown vs baseline (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    elif not args.save:
+        print(f"No baseline at {BASELINE_PATH}, so regressions can't be detected.\n"
+              "Record one on this machine first (e.g. on the commit before your change):\n"
+              "    python benchmark.py --save", file=sys.stderr)
+        sys.exit(2)
+
+    results = run(args.full, args.payload)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {BASELINE_PATH}")
+    else:
+        missing = [name for name in results if not baseline.get(name)]
+        if missing:
+            print(f"\nNo baseline for {', '.join(missing)}; run with --save to record them")
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,192 @@
+from collections import deque
+import clock
+import metrics
+from candles import Candles
+from delta_api import COLUMNS, REQUEST_TIMEOUT, fetch_candle_rows, fetch_many, resolution_seconds
+
+
+class CandleCache:
+    """
+    In-memory ring buffer of recent candles per (symbol, resolution).
+
+    The first update for a key downloads `limit` candles. After that only the
+    range from the last stored candle onwards is requested and merged in, so
+    a steady-state update transfers and parses two candles instead of `limit`.
+
+    If a `CandleStore` is given, newly closed candles are appended to it.
+    When a refresh starts after the range the store covers (the bot was
+    down for longer than the window), the missing range is backfilled
+    first so the store has no hole.
+    """
+
+    def __init__(self, fetch=fetch_candle_rows, store=None):
+        self.fetch = fetch
+        self.store = store
+        self._buffers = {}
+        self._stored_until = {}  # (symbol, resolution) -> end of the range the store covers
+
+    def update(self, symbol, resolution, limit=100, timeout=REQUEST_TIMEOUT):
+        """
+        Fetches any new candles for `symbol` and returns the cached window
+        as `Candles`, oldest first.
+        """
+        self.refresh(symbol, resolution, limit, timeout)
+        return self.candles(symbol, resolution)
+
+    def refresh(self, symbol, resolution, limit=100, timeout=REQUEST_TIMEOUT):
+        """Same as `update` without building the series; see `rows`."""
+        key = (symbol, resolution)
+        buf = self._buffers.get(key)
+        end = int(clock.time())
+        full_start = end - resolution_seconds(resolution) * limit
+
+        if buf is not None and buf.maxlen == limit and buf and buf[-1][0] >= full_start:
+            # Re-request the last stored candle too, it may still have been forming.
+            start = buf[-1][0]
+        else:
+            # Cold start, resized window, or a gap longer than the window.
+            buf = deque(maxlen=limit)
+            start = full_start
+
+        rows = self.fetch(symbol, resolution, start, end, timeout)
+        merge_rows(buf, rows)
+        self._buffers[key] = buf
+        if self.store is not None:
+            try:
+                self._fill_store_gap(symbol, resolution, start, timeout)
+                self.store.append(symbol, resolution, rows, now=end)
+                self._stored_until[key] = end
+            except Exception as e:
+                # Retried from the same point on the next refresh
+                print(f"Error storing candles for {symbol}: {e}")
+
+    def _fill_store_gap(self, symbol, resolution, start, timeout):
+        # Backfills the store up to `start` if it stops before it
+        key = (symbol, resolution)
+        covered = self._stored_until.get(key)
+        if covered is None:
+            last = self.store.last_time(symbol, resolution)
+            if last is None:
+                return
+            covered = last + resolution_seconds(resolution)
+        if covered < start:
+            self.store.backfill(symbol, resolution, covered, end=start,
+                                fetch=lambda *args: self.fetch(*args, timeout))
+
+    def add_bar(self, symbol, resolution, bar):
+        """
+        Merges one closed bar built outside the REST path (e.g. from the trade
+        stream). Returns the updated window, or None if the key is still cold.
+        """
+        buf = self._buffers.get((symbol, resolution))
+        if not buf:
+            return None
+        merge_rows(buf, [bar])
+        if self.store is not None:
+            try:
+                self.store.append(symbol, resolution, [bar])
+            except OSError as e:
+                print(f"Error storing candles for {symbol}: {e}")
+        return self.candles(symbol, resolution)
+
+    def load(self, symbol, resolution, limit=100):
+        """
+        Seeds the window for `symbol` with the last `limit` candles from the
+        store (warm start), so the next refresh only fetches newer ones.
+        Returns the number of candles loaded.
+        """
+        if self.store is None:
+            return 0
+        data = self.store.read(symbol, resolution)
+        start = max(0, len(data["time"]) - limit)
+        columns = [data[column][start:].tolist() for column in COLUMNS]
+        buf = deque(zip(*columns), maxlen=limit)
+        if buf:
+            self._buffers[(symbol, resolution)] = buf
+        return len(buf)
+
+    def rows(self, symbol, resolution):
+        """Cached candles as (time, open, high, low, close, volume) tuples, oldest first."""
+        return list(self._buffers.get((symbol, resolution)) or ())
+
+    def candles(self, symbol, resolution):
+        return Candles.from_tuples(self.rows(symbol, resolution))
+
+    def frame(self, symbol, resolution):
+        """Cached window as a DataFrame, for analysis."""
+        import pandas as pd
+
+        buf = self._buffers.get((symbol, resolution))
+        df = pd.DataFrame(list(buf or ()), columns=COLUMNS)
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        return df
+
+    def clear(self, symbol=None, resolution=None):
+        if symbol is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop((symbol, resolution), None)
+
+
+def poll_until_closed(fetch, keys, on_result, give_up_at, interval=1, max_workers=16, deadline=None, on_round=None):
+    """
+    Fetches every key, then re-fetches those not done yet every `interval`
+    seconds until all are done or `give_up_at` (epoch) passes. Used from a
+    candle close on, to pick up each closed candle as soon as the exchange
+    publishes it instead of after a fixed delay.
+
+    Args:
+        fetch: `fetch(key)`, e.g. a cache update
+        on_result: `on_result(key, result)`, called as each fetch lands (see
+            `fetch_many`); returns True once the key is done, e.g. its
+            closed candle was published and evaluated
+        deadline: seconds one round of fetches may take
+        on_round: optional `on_round()`, called after each round of
+            fetches, e.g. to evaluate the keys the round settled together
+
+    Returns:
+        Keys still not done, in their original order.
+    """
+    pending = list(keys)
+    while True:
+        done = set()
+
+        def check(key, result):
+            try:
+                if on_result(key, result):
+                    done.add(key)
+            except Exception:
+                # Logged by fetch_many; re-polling wouldn't make it evaluate
+                done.add(key)
+                raise
+
+        remaining = give_up_at - clock.time()
+        fetch_many(fetch, pending, max_workers=max_workers,
+                   deadline=max(0.1, min(deadline or remaining, remaining)), on_result=check)
+        if on_round is not None:
+            try:
+                on_round()
+            except Exception as e:
+                metrics.ERRORS.inc(stage="evaluate")
+                print(f"Error evaluating the polled candles: {e}")
+        pending = [key for key in pending if key not in done]
+        if not pending or clock.time() + interval > give_up_at:
+            return pending
+        clock.sleep(interval)
+
+
+def merge_rows(buf, rows):
+    """
+    Merges API candle dicts into a time-ordered deque of tuples. A candle
+    with the same timestamp as the newest stored one replaces it; older
+    candles are ignored.
+    """
+    for row in sorted(rows, key=lambda r: r["time"]):
+        t = int(row["time"])
+        candle = (t, row["open"], row["high"], row["low"], row["close"], row["volume"])
+        if buf and t < buf[-1][0]:
+            continue
+        if buf and t == buf[-1][0]:
+            buf[-1] = candle
+        else:
+            buf.append(candle)
@@ -0,0 +1,308 @@
+"""
+Local market-data daemon shared by the bots.
+
+    python candle_service.py                    # socket at $MARKET_DATA_SOCKET or /tmp/delta-candles.sock
+    python candle_service.py --base 5m          # also serve multiples of 5m, aggregated from the 5m series
+    MARKET_DATA_SOCKET=/tmp/delta-candles.sock python main.py
+
+The daemon owns the upstream candle requests. Every consumer (the root bot,
+the PDL bot, any other strategy process) asks it for candles over a Unix
+socket with the history endpoint's (symbol, resolution, start, end) and
+gets the same rows back, so `ServiceClient.fetch` drops in as a
+`CandleCache` fetch:
+
+- Each (symbol, resolution) has one in-memory window in the daemon,
+  refreshed incrementally like the bots' own caches.
+- Requests for a series within `max_age` seconds of its last refresh are
+  answered from memory, and requests arriving while a refresh is in flight
+  wait for it. However many processes poll a close, the exchange sees one
+  request per series per probe.
+- With `--base`, resolutions that are multiples of it are aggregated from
+  the base series (see `resample.BarAggregator`), so 5m, 15m and 1h of a
+  symbol cost one upstream series.
+- Ranges the window does not cover (backfills, old history) are passed
+  straight through.
+
+Closed candles are still written to the candle store by the root bot, so
+the store keeps a single writer.
+
+Protocol: one JSON object per line each way. Request
+{"symbol", "resolution", "start", "end"} (or {"op": "stats"}); response
+{"result": [candle dicts]} or {"error": message}.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import clock
+import metrics
+from candle_cache import CandleCache
+from candle_store import MAX_CANDLES_PER_REQUEST
+from delta_api import COLUMNS, REQUEST_TIMEOUT, fetch_candle_rows, resolution_seconds
+from resample import BarAggregator
+
+DEFAULT_SOCKET = "/tmp/delta-candles.sock"
+
+REQUESTS = metrics.counter("candle_service_requests_total", "Candle requests answered by the service", ["resolution"])
+UPSTREAM = metrics.counter("candle_service_upstream_total", "Upstream candle requests made by the service", ["resolution"])
+
+
+class ServiceError(Exception):
+    """The service answered with an error, e.g. its upstream request failed."""
+
+
+class _Series:
+    __slots__ = ("lock", "limit", "fetched_at")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limit = 0
+        self.fetched_at = None
+
+
+class CandleService:
+    """
+    Candle windows shared by every consumer, refreshed at most once per
+    `max_age` seconds per series (see the module docstring).
+
+    Args:
+        fetch: upstream `fetch(symbol, resolution, start, end, timeout)`
+        base: resolution multiples of which are aggregated from it, or None
+        max_age: seconds a refreshed window answers requests without
+            another upstream request
+        day_offset: start of daily buckets, see `BarAggregator`
+    """
+
+    def __init__(self, fetch=fetch_candle_rows, base=None, max_age=0.5, day_offset=0, timeout=REQUEST_TIMEOUT):
+        self.fetch = fetch
+        self.base = base
+        self.max_age = max_age
+        self.day_offset = day_offset
+        self.timeout = timeout
+        self.cache = CandleCache(fetch=self._fetch_upstream)
+        self._series = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.upstream = 0
+
+    def _fetch_upstream(self, symbol, resolution, start, end, timeout):
+        UPSTREAM.inc(resolution=resolution)
+        with self._lock:
+            self.upstream += 1
+        return self.fetch(symbol, resolution, start, end, timeout)
+
+    def candles(self, symbol, resolution, start, end):
+        """Candle dicts of `symbol` opening between `start` and `end`, like the history endpoint."""
+        REQUESTS.inc(resolution=resolution)
+        with self._lock:
+            self.requests += 1
+        sec = resolution_seconds(resolution)
+        if self.base and resolution != self.base and sec % resolution_seconds(self.base) == 0:
+            rows = self._aggregated(symbol, resolution, start, end)
+        else:
+            rows = self._rows(symbol, resolution, start, end)
+        if rows is None:
+            return self._fetch_upstream(symbol, resolution, start, end, self.timeout)
+        return [dict(zip(COLUMNS, row)) for row in rows if start <= row[0] <= end]
+
+    def _rows(self, symbol, resolution, start, end):
+        # Cached tuples from `start` to now, or None if the range isn't cacheable
+        sec = resolution_seconds(resolution)
+        now = clock.time()
+        needed = int(now - start) // sec + 2
+        if end < now - sec or needed > MAX_CANDLES_PER_REQUEST:
+            return None
+
+        with self._lock:
+            series = self._series.setdefault((symbol, resolution), _Series())
+        with series.lock:
+            # The window only grows, so consumers asking for less share it
+            limit = max(series.limit, needed)
+            stale = series.fetched_at is None or time.monotonic() - series.fetched_at >= self.max_age
+            if stale or limit > series.limit:
+                self.cache.refresh(symbol, resolution, limit=limit, timeout=self.timeout)
+                series.limit, series.fetched_at = limit, time.monotonic()
+            return self.cache.rows(symbol, resolution)
+
+    def _aggregated(self, symbol, resolution, start, end):
+        aggregator = BarAggregator(self.base, [resolution], self.day_offset)
+        # Base candles from the start of the bucket `start` falls in
+        rows = self._rows(symbol, self.base, aggregator.bucket(resolution, start), end)
+        if rows is None:
+            return None
+
+        # Only closed base candles go through the aggregator, so a bar it
+        # reports closed really is
+        now = clock.time()
+        closed = [row for row in rows if row[0] + aggregator.base_sec <= now]
+        out = []
+        for row in closed:
+            out.extend(bar for _, bar, complete in aggregator.add(row) if complete)
+
+        # The bar still forming: its closed base candles plus the forming
+        # one, like the endpoint's last candle
+        current = aggregator.forming[resolution]
+        current = list(current) if current is not None else None
+        complete = aggregator.complete[resolution]
+        for row in rows[len(closed):]:
+            bucket = aggregator.bucket(resolution, row[0])
+            if current is not None and current[0] != bucket:
+                # Base candles for the rest of that bucket never came (gap)
+                if complete:
+                    out.append(tuple(current))
+                current = None
+            if current is None:
+                current = [bucket, row[1], row[2], row[3], row[4], row[5]]
+                complete = row[0] == bucket
+            else:
+                current[2] = max(current[2], row[2])
+                current[3] = min(current[3], row[3])
+                current[4] = row[4]
+                current[5] += row[5]
+        if current is not None and complete:
+            out.append(tuple(current))
+        return out
+
+    def stats(self):
+        """Requests answered and made upstream since start; their ratio is the fan-out."""
+        return {"requests": self.requests, "upstream": self.upstream, "series": len(self._series)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("op") == "stats":
+                    reply = {"result": service.stats()}
+                else:
+                    rows = service.candles(request["symbol"], request["resolution"],
+                                           int(request["start"]), int(request["end"]))
+                    reply = {"result": rows}
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            try:
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+                self.wfile.flush()
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, path=DEFAULT_SOCKET):
+    """Answers requests on the Unix socket `path` until interrupted."""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            raise RuntimeError(f"Another candle service is listening on {path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Left behind by a service that didn't shut down cleanly
+            os.unlink(path)
+        finally:
+            probe.close()
+
+    server = _Server(path, _Handler)
+    server.service = service
+    print(f"Candle service listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+class ServiceClient:
+    """
+    `fetch(symbol, resolution, start, end, timeout)` through the candle
+    service, for `CandleCache(fetch=...)`. Each thread keeps its own
+    connection.
+
+    While no service is listening, requests go to `fallback` (the direct
+    upstream fetch by default) so a bot keeps running without the daemon.
+    Errors the service reports, and timeouts, are raised as-is instead, so
+    an upstream outage isn't doubled by every consumer retrying directly.
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET, fallback=fetch_candle_rows, timeout=REQUEST_TIMEOUT):
+        self.path = path
+        self.fallback = fallback
+        self.timeout = timeout
+        self._local = threading.local()
+        self._direct = False
+
+    def fetch(self, symbol, resolution, start, end, timeout=None):
+        request = {"symbol": symbol, "resolution": resolution, "start": int(start), "end": int(end)}
+        try:
+            reply = self._call(request, timeout or self.timeout)
+        except TimeoutError:
+            raise
+        except OSError as e:
+            if self.fallback is None:
+                raise
+            if not self._direct:
+                print(f"Candle service at {self.path} unavailable ({e}), fetching directly")
+                self._direct = True
+            return self.fallback(symbol, resolution, start, end, timeout or self.timeout)
+
+        if self._direct:
+            print(f"Candle service at {self.path} is back")
+            self._direct = False
+        if "error" in reply:
+            raise ServiceError(reply["error"])
+        return reply["result"]
+
+    def stats(self):
+        return self._call({"op": "stats"}, self.timeout)["result"]
+
+    def _call(self, request, timeout):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            conn = self._local.conn = (sock, sock.makefile("rwb"))
+        sock, stream = conn
+        try:
+            # The service's own upstream request has `timeout`, plus retries
+            sock.settimeout(timeout * 3)
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                raise ConnectionResetError("candle service closed the connection")
+        except OSError:
+            self._local.conn = None
+            sock.close()
+            raise
+        return json.loads(line)
+
+
+def candle_fetch(path):
+    """The fetch a bot's `CandleCache` should use: via the service at `path` if set, else direct."""
+    return ServiceClient(path).fetch if path else fetch_candle_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared candle service for the bots")
+    parser.add_argument("--socket", default=os.getenv("MARKET_DATA_SOCKET") or DEFAULT_SOCKET)
+    parser.add_argument("--base", help="serve multiples of this resolution aggregated from it, e.g. 5m")
+    parser.add_argument("--max-age", type=float, default=0.5,
+                        help="seconds a refreshed series answers requests from memory")
+    parser.add_argument("--day-offset", type=int, default=0, help="start of daily buckets, seconds after 00:00 UTC")
+    args = parser.parse_args()
+
+    serve(CandleService(base=args.base, max_age=args.max_age, day_offset=args.day_offset), args.socket)
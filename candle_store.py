@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import numpy as np
+from delta_api import COLUMNS, fetch_candle_rows, resolution_seconds
+
+MAX_CANDLES_PER_REQUEST = 2000  # history endpoint window per request
+
+DTYPES = {
+    "time": np.int64,  # candle open, epoch seconds
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+}
+
+
+class CandleStore:
+    """
+    On-disk candle history, one directory per symbol/resolution and one flat
+    binary file per column. Columns are read back as read-only memory maps
+    (no parsing, no copy) and appends just write the new bytes at the end of
+    each file. Only closed candles are stored, in strictly increasing time.
+
+    Layout: <root>/<symbol>/<resolution>/<column>.bin
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, symbol, resolution):
+        return os.path.join(self.root, symbol, resolution)
+
+    def _file(self, symbol, resolution, column):
+        return os.path.join(self._dir(symbol, resolution), f"{column}.bin")
+
+    def keys(self):
+        if not os.path.isdir(self.root):
+            return
+        for symbol in sorted(os.listdir(self.root)):
+            for resolution in sorted(os.listdir(os.path.join(self.root, symbol))):
+                yield symbol, resolution
+
+    def count(self, symbol, resolution):
+        """Number of complete candles stored (a torn append is ignored)."""
+        sizes = []
+        for column in COLUMNS:
+            path = self._file(symbol, resolution, column)
+            sizes.append(os.path.getsize(path) // 8 if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def read(self, symbol, resolution, start=None, end=None):
+        """
+        Returns a dict of column -> NumPy array for candles with
+        start <= time < end (epoch seconds). Arrays are views into
+        read-only memory maps of the column files.
+        """
+        n = self.count(symbol, resolution)
+        if n == 0:
+            return {column: np.empty(0, dtype=DTYPES[column]) for column in COLUMNS}
+
+        arrays = {
+            column: np.memmap(self._file(symbol, resolution, column), dtype=DTYPES[column], mode="r", shape=(n,))
+            for column in COLUMNS
+        }
+        lo = 0 if start is None else int(np.searchsorted(arrays["time"], start, side="left"))
+        hi = n if end is None else int(np.searchsorted(arrays["time"], end, side="left"))
+        return {column: a[lo:hi] for column, a in arrays.items()}
+
+    def read_frame(self, symbol, resolution, start=None, end=None):
+        """Same as `read`, as a DataFrame shaped like `fetch_candles` output."""
+        import pandas as pd
+
+        df = pd.DataFrame(self.read(symbol, resolution, start, end))
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        return df
+
+    def last_time(self, symbol, resolution):
+        n = self.count(symbol, resolution)
+        if n == 0:
+            return None
+        times = np.memmap(self._file(symbol, resolution, "time"), dtype=np.int64, mode="r", shape=(n,))
+        return int(times[-1])
+
+    def append(self, symbol, resolution, rows, now=None):
+        """
+        Appends API candle dicts. Candles that are still forming at `now`
+        or not newer than the last stored candle are skipped.
+
+        Returns:
+            Number of candles written.
+        """
+        if not rows:
+            return 0
+        sec = resolution_seconds(resolution)
+        now = int(time.time()) if now is None else now
+        last = self.last_time(symbol, resolution)
+
+        fresh = {}
+        for row in rows:
+            t = int(row["time"])
+            if t + sec <= now and (last is None or t > last):
+                fresh[t] = row
+        if not fresh:
+            return 0
+
+        ordered = [fresh[t] for t in sorted(fresh)]
+        os.makedirs(self._dir(symbol, resolution), exist_ok=True)
+        n = self.count(symbol, resolution)
+        for column in COLUMNS:
+            values = np.array([row[column] for row in ordered], dtype=DTYPES[column])
+            with open(self._file(symbol, resolution, column), "r+b" if n else "wb") as f:
+                # Truncate any partial tail left by an interrupted append
+                f.truncate(n * 8)
+                f.seek(n * 8)
+                f.write(values.tobytes())
+        return len(ordered)
+
+    def backfill(self, symbol, resolution, start, end=None, page_size=MAX_CANDLES_PER_REQUEST, fetch=fetch_candle_rows):
+        """
+        Fills the store from `start` (or the last stored candle) up to `end`
+        with paginated history requests of at most `page_size` candles.
+
+        Returns:
+            Number of candles written.
+        """
+        sec = resolution_seconds(resolution)
+        end = int(time.time()) if end is None else end
+        last = self.last_time(symbol, resolution)
+        page_start = start if last is None else max(start, last + sec)
+
+        written = 0
+        while page_start < end:
+            page_end = min(page_start + page_size * sec, end)
+            rows = fetch(symbol, resolution, page_start, page_end)
+            written += self.append(symbol, resolution, rows)
+            page_start = page_end
+        return written
+
+
+if __name__ == "__main__":
+    from config import CANDLE_STORE_DIR
+
+    if len(sys.argv) != 4:
+        print("Usage: python candle_store.py SYMBOL RESOLUTION DAYS")
+        sys.exit(1)
+    symbol, resolution, days = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    store = CandleStore(CANDLE_STORE_DIR)
+    n = store.backfill(symbol, resolution, int(time.time()) - days * 86400)
+    print(f"{symbol} {resolution}: wrote {n} candles, {store.count(symbol, resolution)} stored")
@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+import numpy as np
+
+FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+
+def format_time(t):
+    """Epoch seconds -> 'YYYY-MM-DD HH:MM:SS' (UTC), as pandas prints candle times."""
+    return datetime.fromtimestamp(int(t), timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def close_published(last_time, close_time, now, settle=5):
+    """
+    True once the candle closing at `close_time` can be
+    evaluated, judged from the open time of the newest candle the endpoint
+    returned (`last_time`, None if none):
+
+    - a candle opening at or after `close_time` means the exchange has rolled
+      over, so the closed one is final (or had no trades);
+    - otherwise, once `settle` seconds have passed since the close (for late
+      trades to land), the newest candle is final whether it is the closed
+      one or older: a thin symbol with no trades in the period (or none in
+      the whole window, `last_time` None) has nothing more to wait for.
+    """
+    if last_time is not None and last_time >= close_time:
+        return True
+    return now >= close_time + settle
+
+
+class Candle:
+    """
+    One candle. Fields are read as attributes or with `c["close"]`, so it can
+    be passed wherever a pandas row was used.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"Candle({format_time(self.time)} O={self.open} H={self.high} L={self.low} C={self.close} V={self.volume})"
+
+
+class Candles:
+    """
+    A candle series stored as one NumPy array per field, sorted by time, with
+    `time` as int64 epoch seconds. Built straight from the API rows with no
+    pandas involved; slices are views, `c[i]` is a `Candle`.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, time, open, high, low, close, volume):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_rows(cls, rows):
+        """From API candle dicts (any order, e.g. the `result` list)."""
+        rows = sorted(rows, key=lambda r: r["time"])
+        return cls(
+            np.array([r["time"] for r in rows], dtype=np.int64),
+            *(np.array([r[field] for r in rows], dtype=np.float64) for field in FIELDS[1:])
+        )
+
+    @classmethod
+    def from_tuples(cls, rows):
+        """From (time, open, high, low, close, volume) tuples sorted by time."""
+        if not rows:
+            return cls.empty_series()
+        data = np.array(rows, dtype=np.float64)
+        return cls(data[:, 0].astype(np.int64), data[:, 1], data[:, 2], data[:, 3], data[:, 4], data[:, 5])
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """From a dict of field -> array, e.g. `CandleStore.read`."""
+        return cls(*(np.asarray(arrays[field]) for field in FIELDS))
+
+    @classmethod
+    def empty_series(cls):
+        return cls(np.empty(0, dtype=np.int64), *(np.empty(0) for _ in FIELDS[1:]))
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def empty(self):
+        return len(self.time) == 0
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Candles(*(getattr(self, field)[key] for field in FIELDS))
+        if isinstance(key, str):
+            return getattr(self, key)
+        return Candle(int(self.time[key]), *(float(getattr(self, field)[key]) for field in FIELDS[1:]))
+
+    def closed(self, seconds, now):
+        """The candles of `seconds` length that had closed by `now`; drops a forming last candle."""
+        return self[:int(np.searchsorted(self.time, now - seconds, side="right"))]
+
+    def published(self, close_time, now, settle=5):
+        """`close_published` for the newest candle of this series."""
+        return close_published(int(self.time[-1]) if len(self.time) else None, close_time, now, settle)
+
+    @property
+    def iloc(self):
+        # Positional access, same as indexing; lets code written against
+        # DataFrames (`candles.iloc[-2]`) take Candles unchanged.
+        return self
+
+    def to_frame(self):
+        """pandas DataFrame shaped like `fetch_candles` output, for analysis."""
+        import pandas as pd
+
+        df = pd.DataFrame({field: getattr(self, field) for field in FIELDS})
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        return df
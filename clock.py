@@ -0,0 +1,83 @@
+"""
+The time source of the live loops.
+
+Both bots read the time and sleep through this module instead of calling
+`time` directly, so a replay can install a `VirtualClock` and run the
+unchanged loops over recorded candles far faster than real time.
+"""
+import time as _time
+from datetime import datetime
+
+
+class SystemClock:
+    def time(self):
+        return _time.time()
+
+    def sleep(self, seconds):
+        _time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """`event.wait(timeout)`; returns True if the event was set."""
+        return event.wait(timeout)
+
+
+class ReplayFinished(BaseException):
+    """
+    Raised by `VirtualClock` when time passes its `end`. A BaseException so
+    the bots' catch-all error handlers let it through and the loop stops.
+    """
+
+
+class VirtualClock:
+    """
+    Simulated time starting at `start` (epoch seconds). Sleeping moves the
+    clock forward instantly; once it would pass `end`, `ReplayFinished` is
+    raised out of the sleeping loop.
+    """
+
+    def __init__(self, start, end=None):
+        self.now = float(start)
+        self.end = end
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        target = self.now + max(0, seconds)
+        if self.end is not None and target > self.end:
+            self.now = self.end
+            raise ReplayFinished()
+        self.now = target
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+        self.sleep(timeout)
+        return event.is_set()
+
+
+_clock = SystemClock()
+
+
+def install(clock):
+    """Makes `clock` the process-wide time source. Returns the previous one."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def time():
+    return _clock.time()
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
+
+
+def wait(event, timeout):
+    return _clock.wait(event, timeout)
+
+
+def now():
+    """Local datetime, like `datetime.now()`."""
+    return datetime.fromtimestamp(_clock.time())
@@ -1,5 +1,68 @@
+import os
+
 SYMBOLS = ["BTCUSD", "ETHUSD", "SOLUSD", "AVAXUSD", "XRPUSD"]
 TIMEFRAME = "15m"
 EMA_PERIOD = 5
 
+# The level C1 must sweep: the lowest low / highest high of the
+# SWEEP_LOOKBACK candles before it (1 = the previous candle), or, with
+# SWEEP_PIVOT > 0, the last confirmed fractal swing low / high with
+# SWEEP_PIVOT candles on each side (see swings.py).
+SWEEP_LOOKBACK = 1
+SWEEP_PIVOT = 0
+
 CHECK_INTERVAL = 60*15  # seconds
+
+# Timeframes scanned in one process, e.g. ["5m", "15m", "1h"]
+TIMEFRAMES = [TIMEFRAME]
+# If set (e.g. "5m"), only this resolution is fetched and every timeframe in
+# TIMEFRAMES is aggregated from it locally: one API series per symbol.
+BASE_TIMEFRAME = os.getenv("BASE_TIMEFRAME") or None
+# Also alert when a closed candle is fully detached from the EMA (high below
+# or low above it), besides liquidity sweep signals
+EMA_DETACH_ALERTS = os.getenv("EMA_DETACH_ALERTS", "").lower() in ("1", "true", "yes")
+# From each candle close, the candles are requested every CLOSE_POLL_INTERVAL
+# seconds until the closed one is published: as soon as the next candle
+# appears, or CLOSE_BUFFER seconds after the close if none does (no trades
+# yet), whatever the newest candle then is, so thin symbols with no trades in
+# the period settle too. Series whose fetches keep failing until
+# CLOSE_POLL_TIMEOUT are reported missed.
+CLOSE_BUFFER = 5
+CLOSE_POLL_INTERVAL = 1
+CLOSE_POLL_TIMEOUT = 30
+
+# Live data source: "poll" (REST after each close) or "stream" (trade feed,
+# bars built in-process). Point STREAM_URL at `python stream.py` to test offline.
+LIVE_MODE = os.getenv("LIVE_MODE", "poll")
+STREAM_URL = os.getenv("STREAM_URL", "wss://socket.india.delta.exchange")
+
+# Candle fetching
+CANDLE_LIMIT = 100    # candles kept in memory per symbol
+FETCH_WORKERS = 16    # concurrent candle requests per cycle
+REQUEST_TIMEOUT = 10  # seconds per candle request
+CYCLE_DEADLINE = 20   # seconds allowed for fetching all symbols in one cycle
+# Send a duplicate candle request when one takes longer than the host's p95
+# latency; the first answer wins. Trims tail latency at the cost of extra requests.
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "").lower() in ("1", "true", "yes")
+# Unix socket of a shared candle service (`python candle_service.py`). When
+# set, candles are requested through it so both bots share one upstream
+# request per series; if it isn't running, they are fetched directly.
+MARKET_DATA_SOCKET = os.getenv("MARKET_DATA_SOCKET") or None
+
+# Universe mode: scan every live perpetual listed by the products endpoint
+# instead of SYMBOLS. SYMBOLS become the first priority tier, then symbols
+# are tiered by 24h turnover. Fetches start tier by tier and are evaluated
+# as they arrive; whatever misses CYCLE_DEADLINE is skipped and reported.
+SCAN_UNIVERSE = os.getenv("SCAN_UNIVERSE", "").lower() in ("1", "true", "yes")
+UNIVERSE_TIERS = [50]        # sizes of the turnover tiers after SYMBOLS; the rest is the last tier
+UNIVERSE_REFRESH = 3600      # seconds between product list refreshes
+UNIVERSE_FIXTURE = os.getenv("UNIVERSE_FIXTURE") or None  # e.g. fixtures/universe.json, for offline runs
+
+# On-disk candle history (see candle_store.py). Closed candles seen by the
+# live loop are appended here; backtests and warm starts read from it.
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", "data/candles")
+
+# Alerted signals are remembered here so restarts don't re-send them
+DEDUPE_PATH = os.getenv("DEDUPE_PATH", "data/signals.json")
+DEDUPE_TTL = 2 * 24 * 3600  # seconds a sent signal is remembered
+DEDUPE_MAX = 10000          # max remembered signals
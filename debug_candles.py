@@ -1,54 +1,59 @@
-import requests
-import pandas as pd
-from datetime import datetime
+"""
+Shows which of the latest candles from the history endpoint are closed, and
+how long after a close the exchange publishes the closed candle.
+
+    python debug_candles.py                  # BTCUSD 15m
+    python debug_candles.py ETHUSD 5m --watch
+
+A candle is closed once its open time plus the resolution has passed; the
+bots judge it the same way (`Candles.closed`, `close_published`), so
+whether the last row is forming never depends on its position.
+`--watch` waits for the next close and probes every `--interval` seconds
+until the next candle appears, which marks the closed one as final.
+"""
+import argparse
 import time
+from candles import format_time
+from delta_api import fetch_candle_series, resolution_seconds
+
+
+def show(symbol, resolution, count=3):
+    sec = resolution_seconds(resolution)
+    now = time.time()
+    candles = fetch_candle_series(symbol, resolution, limit=count + 1)
+    print(f"Now: {format_time(now)} UTC")
+    for c in (candles[-count:] if len(candles) else []):
+        state = "closed" if c.time + sec <= now else f"forming, closes in {c.time + sec - now:.0f}s"
+        print(f"  {format_time(c.time)}  C={c.close}  {state}")
+
+
+def watch(symbol, resolution, interval, timeout):
+    sec = resolution_seconds(resolution)
+    close_time = (int(time.time()) // sec + 1) * sec
+    print(f"Waiting for the {format_time(close_time)} close...")
+    time.sleep(max(0, close_time - time.time()))
+    while time.time() < close_time + timeout:
+        started = time.time()
+        candles = fetch_candle_series(symbol, resolution, limit=3)
+        last = int(candles.time[-1]) if len(candles) else None
+        newest = format_time(last) if last is not None else "none"
+        print(f"  +{started - close_time:5.2f}s  newest candle {newest}")
+        if last is not None and last >= close_time:
+            print(f"Next candle published {time.time() - close_time:.2f}s after the close")
+            return
+        time.sleep(max(0, interval - (time.time() - started)))
+    print(f"Not published within {timeout}s")
+
 
-def fetch_candles(symbol, resolution):
-    base_url = "https://cdn.india.deltaex.org/v2/history/candles"
-    end_time = int(time.time())
-    # Resolution usually int minutes for calculation, but string for API?
-    # Actually Delta API expects "15m" etc.
-    res_min = 15
-    start_time = end_time - (res_min * 60 * 5) # Last 5 candles
-    
-    params = {
-        "symbol": symbol,
-        "resolution": resolution, # "15m"
-        "start": start_time,
-        "end": end_time
-    }
-    
-    response = requests.get(base_url, params=params)
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        data = response.json().get("result")
-        if not data:
-             print("No data in result key!")
-             print(response.json())
-             return None
-        df = pd.DataFrame(data)
-        # Convert timestamp (seconds) to datetime
-        df["time"] = pd.to_datetime(df["time"], unit="s")
-        return df
-    else:
-        print("API Error:", response.text)
-    return None
-
-now = datetime.now()
-print(f"Current System Time: {now}")
-
-df = fetch_candles("BTCUSD", "15m")
-if df is not None:
-    print("\nLast 3 Candles from API:")
-    print(df.tail(3)[["time", "close"]])
-    
-    last_candle_time = df.iloc[-1]["time"]
-    print(f"\niloc[-1] Time: {last_candle_time}")
-    
-    # Check if iloc[-1] is the just-closed candle or forming
-    # If now is 14:16, and iloc[-1] is 14:00 (Close 14:15), then iloc[-1] is the JUST CLOSED candle.
-    # If iloc[-1] is 14:15 (Open), then it is the FORMING candle.
-    
-    diff_min = (now - last_candle_time).total_seconds() / 60
-    print(f"Difference from Now (min): {diff_min:.2f}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closed vs forming candles from the history endpoint")
+    parser.add_argument("symbol", nargs="?", default="BTCUSD")
+    parser.add_argument("resolution", nargs="?", default="15m")
+    parser.add_argument("--watch", action="store_true", help="measure the publish delay at the next close")
+    parser.add_argument("--interval", type=float, default=1, help="seconds between probes")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to keep probing")
+    args = parser.parse_args()
 
+    show(args.symbol, args.resolution)
+    if args.watch:
+        watch(args.symbol, args.resolution, args.interval, args.timeout)
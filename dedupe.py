@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import clock
+
+
+class SignalDedupe:
+    """
+    Remembers which signals were already alerted so they're sent only once,
+    including across restarts.
+
+    Keys are small tuples such as (symbol, timeframe, candle_epoch). Entries
+    expire after `ttl` seconds and the oldest are evicted beyond
+    `max_entries`, so memory stays flat however long the process runs. If
+    `path` is set, the entries are reloaded from and saved to that JSON file.
+    """
+
+    def __init__(self, ttl=2 * 86400, max_entries=10000, path=None, clock=clock.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> expiry, oldest first
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._evict(self.clock())
+            return key in self._entries
+
+    def add(self, key):
+        """
+        Records `key`. Returns True if it was new (i.e. the alert should be
+        sent), False if it was already recorded.
+        """
+        with self._lock:
+            now = self.clock()
+            self._evict(now)
+            if key in self._entries:
+                return False
+            self._entries[key] = now + self.ttl
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path:
+                self._save()
+            return True
+
+    def _evict(self, now):
+        # Entries share one TTL, so expiries are in insertion order
+        while self._entries:
+            key, expiry = next(iter(self._entries.items()))
+            if expiry > now:
+                break
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                rows = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Could not load signal history from {self.path}: {e}")
+            return
+        now = self.clock()
+        for *key, expiry in rows:
+            if expiry > now:
+                self._entries[tuple(key)] = expiry
+
+    def _save(self):
+        # Write-then-rename so a crash never leaves a truncated file
+        tmp = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump([[*key, expiry] for key, expiry in self._entries.items()], f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not save signal history to {self.path}: {e}")
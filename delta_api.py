@@ -1,21 +1,49 @@
 import requests
-import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+import metrics
+from candles import Candles
+from market_data import MarketDataClient
 
 BASE_URL = "https://cdn.india.deltaex.org/v2/history/candles"
 
-def fetch_candles(symbol, resolution, limit=100):
-    end = int(time.time())
+REQUEST_TIMEOUT = 10  # seconds, per HTTP request
+POOL_SIZE = 32        # max keep-alive connections to the candles host
+
+COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+FETCH_SECONDS = metrics.histogram("candle_fetch_seconds", "HTTP round-trip of one candle request", ["symbol"])
+PARSE_SECONDS = metrics.histogram("candle_parse_seconds", "JSON decode of one candle response")
+DEADLINE_MISSES = metrics.counter("fetch_deadline_missed_total", "Symbols dropped from a cycle by the fetch deadline")
+
+# One keep-alive session shared by every fetch (and every fetch thread),
+# so each cycle reuses open TLS connections instead of reconnecting.
+session = requests.Session()
+session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+
+# Retries, per-host circuit breaker and optional hedging on top of the session.
+# Set `client.hedge = True` to send a duplicate request when one is slower
+# than the host's p95.
+client = MarketDataClient(session, timeout=REQUEST_TIMEOUT)
+
 
+def resolution_seconds(resolution):
     if resolution.endswith("m"):
-        sec = int(resolution[:-1]) * 60
+        return int(resolution[:-1]) * 60
     elif resolution.endswith("h"):
-        sec = int(resolution[:-1]) * 3600
-    else:
-        raise ValueError("Unsupported resolution")
+        return int(resolution[:-1]) * 3600
+    elif resolution.endswith("d"):
+        return int(resolution[:-1]) * 86400
+    raise ValueError("Unsupported resolution")
 
-    start = end - (sec * limit)
 
+def fetch_candle_rows(symbol, resolution, start, end, timeout=REQUEST_TIMEOUT):
+    """
+    Fetches raw candles between `start` and `end` (epoch seconds).
+
+    Returns:
+        List of candle dicts exactly as returned by the API (unsorted).
+    """
     params = {
         "symbol": symbol,
         "resolution": resolution,
@@ -23,12 +51,91 @@ def fetch_candles(symbol, resolution, limit=100):
         "end": end
     }
 
-    r = requests.get(BASE_URL, params=params)
-    data = r.json()["result"]
+    with FETCH_SECONDS.time(symbol=symbol):
+        r = client.get(BASE_URL, params=params, timeout=timeout)
+    with PARSE_SECONDS.time():
+        return r.json()["result"]
+
+
+def fetch_candle_series(symbol, resolution, limit=100, timeout=REQUEST_TIMEOUT):
+    """
+    Last `limit` candles as a `Candles` series, parsed straight from the
+    response without pandas.
+    """
+    end = int(time.time())
+    start = end - (resolution_seconds(resolution) * limit)
+    return Candles.from_rows(fetch_candle_rows(symbol, resolution, start, end, timeout))
+
 
-    df = pd.DataFrame(
-        data,
-        columns=["time", "open", "high", "low", "close", "volume"]
-    )
+def fetch_candles(symbol, resolution, limit=100, timeout=REQUEST_TIMEOUT):
+    import pandas as pd
+
+    end = int(time.time())
+    start = end - (resolution_seconds(resolution) * limit)
+
+    data = fetch_candle_rows(symbol, resolution, start, end, timeout)
+
+    df = pd.DataFrame(data, columns=COLUMNS)
     df["time"] = pd.to_datetime(df["time"], unit="s")
     return df.sort_values("time")
+
+
+def fetch_many(fetch, symbols, max_workers=16, deadline=None, on_result=None):
+    """
+    Runs `fetch(symbol)` for many symbols concurrently.
+
+    Args:
+        fetch: Callable taking a symbol and returning its result
+        symbols: Symbols to fetch. Requests start in this order, so put
+            the most important first.
+        max_workers: Max requests in flight at once
+        deadline: Seconds the whole batch may take. Symbols not fetched
+            by then are left out of the result.
+        on_result: Optional `on_result(symbol, result)`, called in the
+            calling thread as each fetch succeeds, so fast symbols are
+            processed without waiting for slow ones. An exception it
+            raises is logged and counted, and only skips that symbol.
+
+    Returns:
+        Dict of symbol -> result for every symbol fetched successfully.
+    """
+    results = {}
+    if not symbols:
+        return results
+
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(symbols)))
+    futures = {pool.submit(fetch, symbol): symbol for symbol in symbols}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            pending.discard(future)
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                metrics.ERRORS.inc(stage="fetch")
+                print(f"Error fetching {symbol}: {e}")
+                continue
+            if on_result is not None:
+                try:
+                    on_result(symbol, results[symbol])
+                except Exception as e:
+                    # One symbol failing to evaluate doesn't stop the others
+                    metrics.ERRORS.inc(stage="evaluate")
+                    print(f"Error evaluating {symbol}: {e}")
+                if deadline is not None and time.monotonic() - started > deadline:
+                    # Slow callbacks count against the deadline too
+                    break
+    except TimeoutError:
+        pass
+    finally:
+        # Don't block the cycle on stragglers; their threads end at the request timeout.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if pending:
+        DEADLINE_MISSES.inc(len(pending))
+        missed = sorted(str(futures[f]) for f in pending)
+        print(f"Fetch deadline of {deadline}s hit, skipped: {', '.join(missed)}")
+
+    return results
@@ -1,2 +1,84 @@
 def ema(series, period):
     return series.ewm(span=period, adjust=False).mean()
+
+
+class IncrementalIndicator:
+    """
+    Indicator state that is seeded once from history and then advanced one
+    closed candle at a time, instead of recomputing over the whole window.
+
+    Subclasses implement `_step(prev_value, x)`; `value` is the indicator at
+    the last applied input and `previous` the value one input earlier.
+    """
+    __slots__ = ("value", "previous", "last_time")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.previous = None
+        self.last_time = None
+
+    def _step(self, prev_value, x):
+        raise NotImplementedError
+
+    def update(self, x, time=None):
+        """Applies one new closed-candle input. O(1)."""
+        self.previous = self.value
+        self.value = self._step(self.value, x)
+        self.last_time = time
+        return self.value
+
+    def revise(self, x):
+        """Replaces the most recent input, e.g. when that candle was re-published."""
+        self.value = self._step(self.previous, x)
+        return self.value
+
+    def seed(self, values, times=None):
+        self.reset()
+        if times is None:
+            times = [None] * len(values)
+        for t, x in zip(times, values):
+            self.update(x, t)
+        return self.value
+
+    def sync(self, times, values):
+        """
+        Brings the state up to date with a sorted window of inputs, such as
+        the cached candles. Only inputs at or after `last_time` are applied,
+        so the steady-state cost is one or two steps. If the window no
+        longer contains `last_time` the state is re-seeded from it.
+        """
+        i = len(times)
+        if self.last_time is not None:
+            while i > 0 and times[i - 1] > self.last_time:
+                i -= 1
+
+        if self.last_time is None or i == 0 or times[i - 1] != self.last_time:
+            return self.seed(values, times)
+
+        self.revise(values[i - 1])
+        for j in range(i, len(times)):
+            self.update(values[j], times[j])
+        return self.value
+
+
+class EMAState(IncrementalIndicator):
+    """
+    Streaming EMA matching `ema(series, period)`, i.e. pandas
+    `ewm(span=period, adjust=False).mean()`.
+    """
+    __slots__ = ("period", "alpha", "_old_wt")
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._old_wt = 1.0 - self.alpha
+        super().__init__()
+
+    def _step(self, prev_value, x):
+        if prev_value is None:
+            return x
+        # Same operation order as pandas' ewm kernel, so results match exactly
+        return (self._old_wt * prev_value + self.alpha * x) / (self._old_wt + self.alpha)
@@ -0,0 +1,102 @@
+"""
+Streaming indicator state for the live check.
+
+Each (symbol, timeframe) the bot evaluates keeps a `SeriesState`: the EMA
+as an `EMAState` and the sweep's swing levels as `swings.RollingExtreme` /
+`swings.PivotState`, seeded once from the cached window and then advanced
+by the candles that closed since the last check. `SeriesState.fields` hands
+the live rule kernel the trailing candles together with those values, so
+the kernel never recomputes an indicator over the window; its conditions
+only look a few candles back.
+"""
+from collections import deque
+import numpy as np
+from config import EMA_PERIOD, SWEEP_LOOKBACK, SWEEP_PIVOT
+from indicators import EMAState, IncrementalIndicator
+from swings import PivotState, RollingExtreme
+
+# Columns `SeriesState.fields` adds to the candle fields
+STATE_FIELDS = ("ema", "swing_low", "swing_high")
+
+
+class SeriesState(IncrementalIndicator):
+    """
+    Indicator state of one candle series. Inputs are (high, low, close)
+    tuples of closed candles; `value` is a dict of `STATE_FIELDS`, and the
+    last `keep` values are kept for `fields`.
+
+    The swing levels are those of `strategy.liquidity_sweep_rule` before
+    its shift: the lowest low / highest high of the last `lookback`
+    candles, or with `pivot` > 0 the last confirmed fractal swing low /
+    high.
+    """
+    __slots__ = ("ema", "swing_low", "swing_high", "recent")
+
+    def __init__(self, ema_period=EMA_PERIOD, lookback=SWEEP_LOOKBACK, pivot=SWEEP_PIVOT, keep=3):
+        self.ema = EMAState(ema_period)
+        if pivot:
+            self.swing_low, self.swing_high = PivotState(pivot, high=False), PivotState(pivot, high=True)
+        else:
+            self.swing_low, self.swing_high = RollingExtreme(lookback), RollingExtreme(lookback, high=True)
+        self.recent = deque(maxlen=keep)
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        for state in (self.ema, self.swing_low, self.swing_high):
+            state.reset()
+        self.recent.clear()
+
+    def _outputs(self):
+        return {"ema": self.ema.value, "swing_low": self.swing_low.value, "swing_high": self.swing_high.value}
+
+    def update(self, x, time=None):
+        high, low, close = x
+        self.ema.update(close, time)
+        self.swing_low.update(low, time)
+        self.swing_high.update(high, time)
+        self.previous = self.value
+        self.value = self._outputs()
+        self.last_time = time
+        self.recent.append(self.value)
+        return self.value
+
+    def revise(self, x):
+        high, low, close = x
+        self.ema.revise(close)
+        self.swing_low.revise(low)
+        self.swing_high.revise(high)
+        self.value = self._outputs()
+        self.recent[-1] = self.value
+        return self.value
+
+    def sync_candles(self, candles):
+        """
+        `sync` with a `Candles` window of closed candles. Only the candles
+        from `last_time` on are converted and applied; the whole window
+        only on the first call or after a gap.
+        """
+        times = candles.time
+        start = 0
+        if self.last_time is not None:
+            i = int(np.searchsorted(times, self.last_time))
+            if i < len(times) and times[i] == self.last_time:
+                start = i
+        columns = (candles.high[start:].tolist(), candles.low[start:].tolist(), candles.close[start:].tolist())
+        return self.sync(times[start:].tolist(), list(zip(*columns)))
+
+    def fields(self, candles, length):
+        """
+        {field: array} of the last `length` candles of `candles` (which must
+        have been synced), candle fields and `STATE_FIELDS` alike; values
+        older than the kept ones are NaN.
+        """
+        data = {name: getattr(candles, name)[-length:] for name in ("open", "high", "low", "close")}
+        n = len(data["close"])
+        recent = list(self.recent)[-n:]
+        for name in STATE_FIELDS:
+            column = np.full(n, np.nan)
+            if recent:
+                column[n - len(recent):] = [np.nan if v[name] is None else v[name] for v in recent]
+            data[name] = column
+        return data
@@ -1,100 +1,356 @@
+import os
+import socket
+
+if __name__ == "__main__":
+    # Bind the web port before importing anything heavy so the platform sees
+    # the service listening at once; requests wait in the backlog until the
+    # server below starts accepting. Render assigns the port via PORT.
+    listener = socket.create_server(("0.0.0.0", int(os.environ.get("PORT", 5000))), backlog=128)
+
 import time
 from datetime import datetime
 import threading
-import os
-from flask import Flask
 from config import *
-from delta_api import fetch_candles
-from indicators import ema
-from strategy import check_liquidity_sweep_signal, check_ema_detach
+import clock
+from candle_cache import CandleCache, poll_until_closed
+from candle_service import candle_fetch
+from candles import close_published, format_time
+from dedupe import SignalDedupe
+import delta_api
+from delta_api import resolution_seconds
+from candle_store import CandleStore, MAX_CANDLES_PER_REQUEST
+from rules import compile_rules, field, stack
+from strategy import liquidity_sweep_rule, ema_detach_rule
+from live_state import SeriesState
 from notifier import send_alert
+from resample import MultiTimeframeSeries
+from scheduler import CandleScheduler
+from stream import StreamRunner
+from universe import Universe
+import metrics
+
+def create_app():
+    # Flask Web Server for Render. Imported here so the bot thread can start
+    # its warm start while Flask loads.
+    from flask import Flask, Response, jsonify
+
+    app = Flask(__name__)
 
-# Flask Web Server for Render
-app = Flask(__name__)
+    @app.route('/')
+    def home():
+        return "Delta EMA Bot is Running!"
 
-@app.route('/')
-def home():
-    return "Delta EMA Bot is Running!"
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
-last_signal = {}
+    @app.route('/health')
+    def health():
+        # Unhealthy once no cycle has completed for two of the longest candles
+        now = clock.time()
+        last = LAST_CYCLE.get()
+        max_gap = 2 * max(resolution_seconds(tf) for tf in TIMEFRAMES) + CLOSE_POLL_TIMEOUT
+        healthy = (now - (last or STARTED_AT)) < max_gap
+        body = {
+            "status": "ok" if healthy else "stale",
+            "last_cycle": datetime.fromtimestamp(last).isoformat() if last else None,
+            "seconds_since_last_cycle": round(now - last, 1) if last else None,
+            "schedule_lag_seconds": SCHEDULE_LAG.get(),
+            "symbols": len(SYMBOLS) if universe is None else sum(len(tier) for tier in universe.tiers),
+            "missed_last_cycle": missed_last_cycle,
+            "uptime_seconds": round(now - STARTED_AT, 1),
+        }
+        return jsonify(body), 200 if healthy else 503
 
-def get_sleep_time():
-    now = datetime.now()
-    minutes = now.minute
-    seconds = now.second
-    # 15 minute interval
-    next_interval = ((minutes // 15) + 1) * 15
-    if next_interval == 60:
-        sleep_min = 60 - minutes
+    return app
+
+STARTED_AT = clock.time()
+CYCLE_SECONDS = metrics.histogram("scan_cycle_seconds", "Duration of one full scan cycle")
+EVALUATE_SECONDS = metrics.histogram("evaluate_seconds", "Indicator + signal time per symbol", ["timeframe"])
+CANDLES_PROCESSED = metrics.counter("candles_processed_total", "Closed candles evaluated", ["timeframe"])
+SIGNALS = metrics.counter("signals_total", "Signals emitted (before dedupe)", ["timeframe", "signal"])
+LAST_CYCLE = metrics.gauge("last_cycle_timestamp_seconds", "Unix time the last scan cycle completed")
+SCHEDULE_LAG = metrics.gauge("schedule_lag_seconds", "How late the last cycle started vs its target instant")
+PUBLISH_DELAY = metrics.histogram("close_publish_seconds", "Candle close to closed candle seen", ["timeframe"],
+                                  buckets=(0.5, 1, 2, 3, 5, 10, 20, 30, 60))
+MISSED = metrics.gauge("missed_symbols", "Symbols skipped in the last cycle (deadline or fetch error)")
+
+sent_signals = SignalDedupe(ttl=DEDUPE_TTL, max_entries=DEDUPE_MAX, path=DEDUPE_PATH)
+candle_cache = CandleCache(fetch=candle_fetch(MARKET_DATA_SOCKET), store=CandleStore(CANDLE_STORE_DIR))
+# Every live rule is evaluated in one pass over a window's trailing candles.
+# The EMA and swing levels come from each series' streaming state instead
+# of the window, so the kernel only reads the last few candles.
+rules = compile_rules(
+    [liquidity_sweep_rule(field("ema"), levels=(field("swing_low"), field("swing_high")))]
+    + ([ema_detach_rule(field("ema"))] if EMA_DETACH_ALERTS else [])
+)
+# Trailing candles the kernel reads
+live_window = rules.history
+live_state = {}  # (symbol, timeframe) -> SeriesState
+# Cycles start right at each close and poll until the candle is published
+scheduler = CandleScheduler(TIMEFRAMES, buffer=0)
+series = {}  # symbol -> MultiTimeframeSeries, when BASE_TIMEFRAME is set
+universe = Universe(SYMBOLS, UNIVERSE_TIERS, UNIVERSE_REFRESH, fallback=SYMBOLS, fixture=UNIVERSE_FIXTURE,
+                    clock=clock.time) if SCAN_UNIVERSE else None
+missed_last_cycle = []
+delta_api.client.hedge = HEDGE_REQUESTS
+
+def scan_symbols():
+    """Symbols to scan, highest priority first."""
+    return universe.symbols() if universe is not None else SYMBOLS
+
+def scan(timeframes, at=None):
+    """Evaluates the candles of `timeframes` that closed at or before `at` (default: now)."""
+    at = clock.time() if at is None else at
+    if BASE_TIMEFRAME:
+        scan_aggregated(timeframes, at)
     else:
-        sleep_min = next_interval - minutes
-    
-    sleep_sec = (sleep_min * 60) - seconds + 5 # 5 seconds buffer
-    return sleep_sec
+        scan_direct(timeframes, at)
 
-def run_bot():
-    print("Bot started...")
-    while True:
+def scan_aggregated(timeframes, at):
+    # One base series per symbol; every timeframe is built from it locally.
+    # Enough base candles are kept to fill CANDLE_LIMIT bars of the largest
+    # timeframe (capped at what one request returns).
+    limit = base_limit()
+    base_sec = resolution_seconds(BASE_TIMEFRAME)
+    boundary = int(at) // base_sec * base_sec
+
+    settled = []
+
+    def on_fetched(symbol, _):
+        rows = candle_cache.rows(symbol, BASE_TIMEFRAME)
+        if not close_published(rows[-1][0] if rows else None, boundary, clock.time(), CLOSE_BUFFER):
+            return False
+        # Symbols without trades in the period settle without a candle to time
+        if boundary == at and rows and rows[-1][0] >= boundary - base_sec:
+            PUBLISH_DELAY.observe(clock.time() - boundary, timeframe=BASE_TIMEFRAME)
+        s = series.get(symbol)
+        if s is None:
+            s = series[symbol] = MultiTimeframeSeries(BASE_TIMEFRAME, TIMEFRAMES, limit=CANDLE_LIMIT)
+        # Base bars closed by the boundary only, never the forming one
+        updated = s.feed(rows, boundary)
+        for timeframe in timeframes:
+            if timeframe in updated:
+                settled.append((symbol, timeframe, s.candles(timeframe)))
+        return True
+
+    missed = poll_until_closed(
+        lambda symbol: candle_cache.refresh(symbol, BASE_TIMEFRAME, limit=limit, timeout=REQUEST_TIMEOUT),
+        scan_symbols(),
+        on_fetched,
+        give_up_at=at + CLOSE_POLL_TIMEOUT,
+        interval=CLOSE_POLL_INTERVAL,
+        max_workers=FETCH_WORKERS,
+        deadline=CYCLE_DEADLINE,
+        on_round=lambda: evaluate_settled(settled)
+    )
+    report_missed(missed)
+
+def base_limit():
+    # Enough base candles to fill CANDLE_LIMIT bars of the largest timeframe
+    largest = max(resolution_seconds(tf) for tf in TIMEFRAMES)
+    return min(MAX_CANDLES_PER_REQUEST, CANDLE_LIMIT * largest // resolution_seconds(BASE_TIMEFRAME))
+
+def scan_direct(timeframes, at):
+    # Fetch every (symbol, timeframe) in parallel so a cycle costs ~one round-trip.
+    # The cache only requests candles newer than the ones it holds. Each
+    # series is evaluated as soon as the candle closing at its last boundary
+    # up to `at` is published (judged by candle timestamps, see
+    # `close_published`); the series settled by one round of requests are
+    # evaluated together, and the rest are re-requested every
+    # CLOSE_POLL_INTERVAL seconds. Only candles closed by the boundary are
+    # evaluated, never the forming one.
+    settled = []
+
+    def on_fetched(job, candles):
+        symbol, timeframe = job
+        sec = resolution_seconds(timeframe)
+        boundary = int(at) // sec * sec
+        if not candles.published(boundary, clock.time(), CLOSE_BUFFER):
+            return False
+        if boundary == at and len(candles) and candles.time[-1] >= boundary - sec:
+            PUBLISH_DELAY.observe(clock.time() - boundary, timeframe=timeframe)
+        settled.append((symbol, timeframe, candles.closed(sec, boundary)))
+        return True
+
+    missed = poll_until_closed(
+        lambda job: candle_cache.update(job[0], job[1], limit=CANDLE_LIMIT, timeout=REQUEST_TIMEOUT),
+        [(symbol, timeframe) for symbol in scan_symbols() for timeframe in timeframes],
+        on_fetched,
+        give_up_at=at + CLOSE_POLL_TIMEOUT,
+        interval=CLOSE_POLL_INTERVAL,
+        max_workers=FETCH_WORKERS,
+        deadline=CYCLE_DEADLINE,
+        on_round=lambda: evaluate_settled(settled)
+    )
+    report_missed(sorted({symbol for symbol, _ in missed}))
+
+def report_missed(symbols):
+    global missed_last_cycle
+    missed_last_cycle = symbols
+    MISSED.set(len(symbols))
+    if symbols and universe is not None:
+        tiers = sorted({universe.tier_of(s) for s in symbols} - {None})
+        print(f"Missed {len(symbols)} symbols this cycle (tiers {tiers}): {', '.join(symbols)}")
+
+def evaluate_settled(settled):
+    # Evaluates the series a poll round settled and empties the list
+    batch, settled[:] = list(settled), []
+    evaluate(batch)
+
+def evaluate(batch):
+    """
+    Evaluates a batch of (symbol, timeframe, closed candles) in one kernel
+    pass: each series' streaming state is synced, the trailing fields of
+    all of them are stacked, and the signals are read back per row.
+    """
+    # Need at least a few candles for history
+    batch = [item for item in batch if len(item[2]) >= 15]
+    if not batch:
+        return
+
+    started = time.perf_counter()
+    data = []
+    for symbol, timeframe, candles in batch:
+        state = live_state.get((symbol, timeframe))
+        if state is None:
+            state = live_state[(symbol, timeframe)] = SeriesState(keep=live_window)
+        # Seeded from the window once, then O(1) per newly closed candle
+        state.sync_candles(candles)
+        data.append(state.fields(candles, live_window))
+    result = rules.latest(stack(data, rules.fields(), live_window))
+    # The pass is shared; each series is charged its share of it
+    share = (time.perf_counter() - started) / len(batch)
+
+    for row, (symbol, timeframe, candles) in enumerate(batch):
+        EVALUATE_SECONDS.observe(share, timeframe=timeframe)
         try:
-            sleep_seconds = get_sleep_time()
-            print(f"Sleeping for {sleep_seconds} seconds until next candle close...")
-            time.sleep(sleep_seconds)
-
-            for symbol in SYMBOLS:
-                df = fetch_candles(symbol, TIMEFRAME)
-
-                df["ema5"] = ema(df["close"], EMA_PERIOD)
-
-                # Need at least a few candles for history
-                if len(df) < 15:
-                    continue
-
-                # C2 is the LATEST CLOSED candle (iloc[-1])
-                # C1 is the candle BEFORE it (iloc[-2])
-                c1 = df.iloc[-2]
-                c2 = df.iloc[-1]
-                
-                # Extract EMA values for the respective candles
-                ema_c1 = c1["ema5"]
-                ema_c2 = c2["ema5"]
-
-                # Get recent 10 lows and highs BEFORE C1
-                # C1 is at index -2. So we want slice from -12 to -2
-                recent_data = df.iloc[-12:-2]
-                recent_lows = recent_data["low"].tolist()
-                recent_highs = recent_data["high"].tolist()
-
-                print(f"{symbol} | C2: {c2['time']} C={c2['close']} EMA={round(ema_c2, 2)} | C1: {c1['time']} C={c1['close']} EMA={round(ema_c1, 2)}")
-                
-                signal = check_liquidity_sweep_signal(c1, c2, ema_c1, ema_c2, recent_lows, recent_highs)
-
-                if signal:
-                    key = f"{symbol}_{c2['time']}"
-                    if key not in last_signal:
-                        message = f"""
+            signal = report_signal(symbol, timeframe, candles, result, row)
+        except Exception as e:
+            # One series failing to alert doesn't stop the others
+            metrics.ERRORS.inc(stage="evaluate")
+            print(f"Error evaluating {symbol} {timeframe}: {e}")
+            continue
+        CANDLES_PROCESSED.inc(timeframe=timeframe)
+        if signal:
+            SIGNALS.inc(timeframe=timeframe, signal=signal)
+
+def report_signal(symbol, timeframe, candles, result, row):
+    # C2 is the LATEST CLOSED candle ([-1])
+    # C1 is the candle BEFORE it ([-2])
+    c1 = candles[-2]
+    c2 = candles[-1]
+
+    # EMA values for the respective candles
+    ema_c1, ema_c2 = result.value("sweep", "ema")[row, -2:]
+    c2_time = format_time(c2.time)
+
+    print(f"{symbol} {timeframe} | C2: {c2_time} C={c2['close']} EMA={round(ema_c2, 2)} | C1: {format_time(c1.time)} C={c1['close']} EMA={round(ema_c1, 2)}")
+
+    signal = result.signal("sweep")[row, -1]
+
+    if signal:
+        key = (symbol, timeframe, c2.time)
+        if sent_signals.add(key):
+            message = f"""
 🚨 LIQUIDITY SWEEP SIGNAL
 
 Symbol: {symbol}
 Type: {signal}
-Timeframe: {TIMEFRAME}
+Timeframe: {timeframe}
 Close: {c2['close']}
 EMA5: {round(ema_c2, 2)}
-Time: {c2['time']}
+Time: {c2_time}
 """
-                        send_alert(message)
-                        last_signal[key] = True
+            # Signals on the same candle are merged into one Telegram message
+            send_alert(message, group=f"{timeframe}_{c2_time}")
 
-        except Exception as e:
-            print("Error:", e)
-            time.sleep(30)
+    if EMA_DETACH_ALERTS:
+        detach = result.signal("ema_detach")[row, -1]
+        if detach:
+            SIGNALS.inc(timeframe=timeframe, signal=detach)
+        if detach and sent_signals.add((symbol, timeframe, c2.time, detach)):
+            message = f"""
+📏 EMA DETACH
+
+Symbol: {symbol}
+Type: {detach}
+Timeframe: {timeframe}
+Close: {c2['close']}
+EMA5: {round(ema_c2, 2)}
+Time: {c2_time}
+"""
+            send_alert(message, group=f"{timeframe}_{c2_time}")
+
+    return signal
+
+def on_candle_close(timeframes, close_time):
+    SCHEDULE_LAG.set(round(clock.time() - close_time, 3))
+    run_cycle(timeframes, close_time)
+
+def run_cycle(timeframes, at=None):
+    try:
+        with CYCLE_SECONDS.time():
+            scan(timeframes, at)
+    except Exception as e:
+        metrics.ERRORS.inc(stage="cycle")
+        print("Error:", e)
+    LAST_CYCLE.set(clock.time())
+
+def on_stream_bar(symbol, timeframe, bar):
+    candles = candle_cache.add_bar(symbol, timeframe, bar)
+    if candles is None:
+        # No history yet for this symbol, seed it from REST (closed candles only)
+        candles = candle_cache.update(symbol, timeframe, limit=CANDLE_LIMIT, timeout=REQUEST_TIMEOUT)
+        candles = candles.closed(resolution_seconds(timeframe), clock.time())
+    evaluate([(symbol, timeframe, candles)])
+    LAST_CYCLE.set(clock.time())
+
+def on_stream_gap(symbol, timeframe):
+    # The stream had no complete bar for this close, use the REST candles
+    candles = candle_cache.update(symbol, timeframe, limit=CANDLE_LIMIT, timeout=REQUEST_TIMEOUT)
+    evaluate([(symbol, timeframe, candles.closed(resolution_seconds(timeframe), clock.time()))])
+    LAST_CYCLE.set(clock.time())
+
+def warm_start():
+    """
+    Seeds the candle windows from the on-disk store and scans the latest
+    closed candle right away instead of sleeping until the next close. Only
+    the candles after the stored ones are fetched, and signals alerted
+    before the restart are in the persisted dedupe store, so they are not
+    sent again. Indicators are computed from the seeded windows.
+    """
+    started = time.perf_counter()
+    if BASE_TIMEFRAME:
+        keys, limit = [(symbol, BASE_TIMEFRAME) for symbol in scan_symbols()], base_limit()
+    else:
+        keys, limit = [(symbol, tf) for symbol in scan_symbols() for tf in TIMEFRAMES], CANDLE_LIMIT
+    loaded = sum(candle_cache.load(symbol, resolution, limit) for symbol, resolution in keys)
+    print(f"Warm start: {loaded} stored candles loaded for {len(keys)} series in {time.perf_counter() - started:.2f}s")
+    run_cycle(TIMEFRAMES)
+
+def run_bot():
+    print("Bot started...")
+    warm_start()
+    if LIVE_MODE == "stream":
+        # Bars are built from the trade feed and evaluated the moment they
+        # close; REST polling takes over while the feed is down. The
+        # subscription follows the universe as it is refreshed.
+        StreamRunner(STREAM_URL, scan_symbols, TIMEFRAMES, on_stream_bar, on_stream_gap, poll_buffer=CLOSE_BUFFER).run()
+    else:
+        # Wakes at each close of every configured timeframe and polls until
+        # the closed candles are published; timeframes closing together are
+        # scanned in one cycle.
+        scheduler.run(on_candle_close)
 
 if __name__ == "__main__":
     # Start the bot in a background thread
     t = threading.Thread(target=run_bot)
     t.daemon = True
     t.start()
-    
-    # Start the Flask web server
-    # Render assigns specific port via os.environ.get("PORT")
-    port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
+
+    # Start the Flask web server on the socket bound at the top
+    from werkzeug.serving import make_server
+
+    host, port = listener.getsockname()[:2]
+    make_server(host, port, create_app(), threaded=True, fd=listener.fileno()).serve_forever()
@@ -0,0 +1,211 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import metrics
+
+RETRIES = metrics.counter("http_retries_total", "Market-data requests retried", ["host"])
+HEDGES = metrics.counter("http_hedged_total", "Hedged duplicate requests sent", ["host"])
+BREAKER_TRIPS = metrics.counter("circuit_breaker_trips_total", "Times a host's circuit breaker opened", ["host"])
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a host whose breaker is open."""
+
+
+class RetryableStatus(Exception):
+    """5xx or 429 response, worth another attempt."""
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker. After `threshold` consecutive failures the host is
+    skipped for `reset_after` seconds; then one trial request is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold=5, reset_after=30, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        """
+        Ends a half-open trial without an outcome, when it failed for a
+        reason other than the host, so the next call is the trial.
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        """Returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            was_open = self.opened_at is not None
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+                self._trial = False
+                return not was_open
+            return False
+
+
+class LatencyTracker:
+    """Recent request latencies, for the hedging threshold."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def quantile(self, q):
+        """None until `min_samples` latencies have been seen."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MarketDataClient:
+    """
+    GETs from the market-data hosts with bounded latency.
+
+    - Each attempt has a `timeout`, and all attempts of one call together
+      stay within `total_timeout`.
+    - Connection errors, timeouts, 5xx and 429 are retried up to `retries`
+      times with jittered exponential backoff; other 4xx are not.
+    - Every host has a `CircuitBreaker`. While it is open, calls fail at
+      once with `CircuitOpen` instead of each waiting out a timeout.
+    - With `hedge` on, an attempt still running after the host's p95
+      latency gets a duplicate request, and whichever answers first wins.
+    """
+
+    def __init__(self, session, timeout=10, total_timeout=20, retries=2, backoff=0.25,
+                 hedge=False, hedge_quantile=0.95, breaker_threshold=5, breaker_reset=30,
+                 hedge_workers=8, clock=time.monotonic):
+        self.session = session
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.hedge_workers = hedge_workers
+        self.clock = clock
+        self._breakers = {}
+        self._latency = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset, self.clock)
+                self._latency[host] = LatencyTracker()
+            return self._breakers[host]
+
+    def get(self, url, params=None, timeout=None):
+        """
+        Returns the successful response. Raises `CircuitOpen`, or the last
+        error once retries or `total_timeout` run out.
+        """
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        timeout = timeout or self.timeout
+        give_up_at = self.clock() + self.total_timeout
+
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise CircuitOpen(f"{host} is failing, skipped for up to {self.breaker_reset}s")
+            remaining = give_up_at - self.clock()
+            try:
+                r = self._get(host, url, params, max(0.1, min(timeout, remaining)))
+                if r.status_code >= 500 or r.status_code == 429:
+                    raise RetryableStatus(f"HTTP {r.status_code} from {host}")
+            except (RetryableStatus, OSError):
+                # requests' ConnectionError and Timeout are OSErrors
+                if breaker.record_failure():
+                    BREAKER_TRIPS.inc(host=host)
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                if attempt == self.retries or self.clock() + delay >= give_up_at:
+                    raise
+                RETRIES.inc(host=host)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Not the host's failure, but a half-open trial must not stay taken
+                breaker.release()
+                raise
+
+            breaker.record_success()
+            # Other 4xx are the request's fault, not the host's
+            r.raise_for_status()
+            return r
+
+    def _get(self, host, url, params, timeout):
+        latency = self._latency[host]
+        threshold = latency.quantile(self.hedge_quantile) if self.hedge else None
+        if threshold is None or threshold >= timeout:
+            return self._timed_get(latency, url, params, timeout)
+
+        pool = self._hedge_pool()
+        primary = pool.submit(self._timed_get, latency, url, params, timeout)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        HEDGES.inc(host=host)
+        backup = pool.submit(self._timed_get, latency, url, params, timeout - threshold)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+        raise error
+
+    def _timed_get(self, latency, url, params, timeout):
+        started = time.perf_counter()
+        r = self.session.get(url, params=params, timeout=timeout)
+        latency.add(time.perf_counter() - started)
+        return r
+
+    def _hedge_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix="hedge")
+            return self._pool
@@ -1,23 +1,24 @@
-import asyncio
-from telegram import Bot
 import os
 from dotenv import load_dotenv
+from alert_worker import NotifierWorker
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-async def _send_async(msg):
-    if not BOT_TOKEN or not CHAT_ID:
-        print("Error: Bot token or Chat ID not found in environment variables.")
-        return
-        
-    bot = Bot(token=BOT_TOKEN)
-    await bot.send_message(chat_id=CHAT_ID, text=msg)
+# One long-lived worker for the process; alerts are queued, never awaited
+_worker = NotifierWorker(BOT_TOKEN, CHAT_ID)
 
-def send_alert(msg):
+def send_alert(msg, group=None):
+    """
+    Queues an alert. Alerts sharing a `group` (e.g. the same candle) that are
+    queued together are merged into one Telegram message.
+    """
     try:
-        asyncio.run(_send_async(msg))
+        _worker.send(msg, group)
     except Exception as e:
         print(f"Failed to send alert: {e}")
+
+def flush(timeout=30):
+    _worker.flush(timeout)
@@ -0,0 +1,221 @@
+"""
+Parameter sweep for the liquidity sweep strategy.
+
+Evaluates many (ema_period, wick_ratio, body_ratio, lookback, pivot) sets over the
+stored candle history of many symbols on a process pool and prints the sets
+ranked by average forward return per signal.
+
+    python optimizer.py                       # full grid over config.SYMBOLS
+    python optimizer.py BTCUSD ETHUSD --random 200 --horizon 8
+    python optimizer.py --ema 3,5,8 --wick 0.2,0.3 --csv results.csv
+
+Each symbol's OHLC arrays are copied once into shared memory; workers attach
+to them at start-up, so a task only carries its parameter set.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+import numpy as np
+import pandas as pd
+from config import SYMBOLS, TIMEFRAME, EMA_PERIOD, CANDLE_STORE_DIR
+from backtest import sweep_signal_masks, WICK_RATIO, BODY_RATIO, LOOKBACK, PIVOT
+
+# Default search space; the live values are always included
+SPACE = {
+    "ema_period": [3, 5, 8, 13, 21],
+    "wick_ratio": [0.2, 0.3, 0.4, 0.5],
+    "body_ratio": [0.2, 0.3, 0.4, 0.5],
+    "lookback": [1, 3, 5, 10],
+    "pivot": [0],
+}
+LIVE_PARAMS = {"ema_period": EMA_PERIOD, "wick_ratio": WICK_RATIO, "body_ratio": BODY_RATIO, "lookback": LOOKBACK, "pivot": PIVOT}
+
+HORIZON = 4      # candles after C2 at which a signal's return is measured
+MIN_SIGNALS = 20  # sets with fewer signals are ranked last
+
+ROWS = ("open", "high", "low", "close")
+
+
+def grid(space):
+    """Every combination of the values in `space`."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_sample(space, n, seed=0):
+    """`n` distinct combinations drawn uniformly from the grid of `space`."""
+    sets = grid(space)
+    rng = np.random.default_rng(seed)
+    return [sets[i] for i in sorted(rng.choice(len(sets), size=min(n, len(sets)), replace=False))]
+
+
+def forward_returns(c, horizon):
+    """Return from each close to the close `horizon` candles later (NaN past the end)."""
+    out = np.full(len(c), np.nan)
+    if len(c) > horizon:
+        out[:-horizon] = c[horizon:] / c[:-horizon] - 1
+    return out
+
+
+def score(o, h, l, c, e, params, horizon):
+    """Signal count, wins and summed forward return of one parameter set on one symbol."""
+    buy, sell = sweep_signal_masks(o, h, l, c, e, params["wick_ratio"], params["body_ratio"], params["lookback"],
+                                   params["pivot"])
+    side = buy.astype(np.int8) - sell.astype(np.int8)
+    ret = forward_returns(c, horizon) * side
+    taken = (side != 0) & ~np.isnan(ret)
+    returns = ret[taken]
+    return int(taken.sum()), int((returns > 0).sum()), float(returns.sum())
+
+
+# --- Shared memory -------------------------------------------------------------
+
+def share(arrays):
+    """
+    Copies {symbol: (4, n) OHLC array} into one shared memory block per symbol.
+
+    Returns:
+        (blocks, layout): the SharedMemory objects (keep them alive, unlink
+        when done) and {symbol: (name, n)} for `attach`.
+    """
+    blocks, layout = [], {}
+    for symbol, data in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        blocks.append(shm)
+        layout[symbol] = (shm.name, data.shape[1])
+    return blocks, layout
+
+
+# Per-worker state: attached arrays and EMAs already computed
+_shared = {}
+_emas = {}
+_horizon = HORIZON
+
+
+def attach(layout, horizon):
+    """Pool initializer: maps every symbol's block without copying it."""
+    global _horizon
+    _horizon = horizon
+    for symbol, (name, n) in layout.items():
+        # Workers share the parent's resource tracker, so the parent's
+        # unlink is the only cleanup needed
+        shm = shared_memory.SharedMemory(name)
+        _shared[symbol] = (shm, np.ndarray((len(ROWS), n), dtype=np.float64, buffer=shm.buf))
+
+
+def _ema(symbol, close, period):
+    key = (symbol, period)
+    if key not in _emas:
+        _emas[key] = pd.Series(close).ewm(span=period, adjust=False).mean().to_numpy()
+    return _emas[key]
+
+
+def evaluate(task):
+    """Worker: one parameter set over every shared symbol."""
+    i, params = task
+    rows = []
+    for symbol, (_, data) in _shared.items():
+        o, h, l, c = data
+        signals, wins, total = score(o, h, l, c, _ema(symbol, c, params["ema_period"]), params, _horizon)
+        rows.append((i, symbol, signals, wins, total))
+    return rows
+
+
+def optimize(arrays, param_sets, horizon=HORIZON, workers=None, min_signals=MIN_SIGNALS):
+    """
+    Scores `param_sets` over {symbol: (4, n) OHLC array} on a process pool.
+
+    Returns:
+        (ranked, per_symbol) DataFrames. `ranked` has one row per parameter
+        set, best first: sets with at least `min_signals` signals ordered by
+        average return per signal.
+    """
+    blocks, layout = share(arrays)
+    try:
+        tasks = list(enumerate(param_sets))
+        workers = workers or os.cpu_count()
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with Pool(workers, initializer=attach, initargs=(layout, horizon)) as pool:
+            rows = [row for result in pool.imap_unordered(evaluate, tasks, chunksize) for row in result]
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    per_symbol = pd.DataFrame(rows, columns=["set", "symbol", "signals", "wins", "total_return"])
+    totals = per_symbol.groupby("set")[["signals", "wins", "total_return"]].sum()
+    ranked = pd.DataFrame(param_sets).join(totals)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ranked["win_rate"] = ranked["wins"] / ranked["signals"]
+        ranked["avg_return"] = ranked["total_return"] / ranked["signals"]
+    ranked["enough"] = ranked["signals"] >= min_signals
+    ranked = ranked.sort_values(["enough", "avg_return"], ascending=False, na_position="last")
+    return ranked.drop(columns=["wins", "enough"]).reset_index(names="set"), per_symbol
+
+
+def load_arrays(store, symbols, resolution, start=None):
+    """{symbol: (4, n) OHLC array} for every symbol with candles in `store`."""
+    arrays = {}
+    for symbol in symbols:
+        data = store.read(symbol, resolution, start)
+        if len(data["close"]):
+            arrays[symbol] = np.vstack([data[row] for row in ROWS]).astype(np.float64)
+    return arrays
+
+
+def parse_values(text, cast):
+    return [cast(v) for v in text.split(",")]
+
+
+if __name__ == "__main__":
+    from candle_store import CandleStore
+
+    parser = argparse.ArgumentParser(description="Liquidity sweep parameter sweep")
+    parser.add_argument("symbols", nargs="*", help="symbols to test (default: config.SYMBOLS)")
+    parser.add_argument("--days", type=int, default=365, help="history to backfill and test")
+    parser.add_argument("--ema", help="comma-separated EMA periods")
+    parser.add_argument("--wick", help="comma-separated wick ratios")
+    parser.add_argument("--body", help="comma-separated body ratios")
+    parser.add_argument("--lookback", help="comma-separated sweep lookbacks")
+    parser.add_argument("--pivot", help="comma-separated fractal pivot widths (0 = use the lookback)")
+    parser.add_argument("--random", type=int, help="test this many random sets instead of the full grid")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="candles after C2 to measure the return at")
+    parser.add_argument("--min-signals", type=int, default=MIN_SIGNALS, help="rank sets with fewer signals last")
+    parser.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=20, help="rows to print")
+    parser.add_argument("--csv", help="also write the full ranked table here")
+    args = parser.parse_args()
+
+    space = dict(SPACE)
+    for name, text, cast in (("ema_period", args.ema, int), ("wick_ratio", args.wick, float),
+                             ("body_ratio", args.body, float), ("lookback", args.lookback, int), ("pivot", args.pivot, int)):
+        if text:
+            space[name] = parse_values(text, cast)
+    param_sets = random_sample(space, args.random) if args.random else grid(space)
+    if LIVE_PARAMS not in param_sets:
+        param_sets.append(LIVE_PARAMS)
+
+    store = CandleStore(CANDLE_STORE_DIR)
+    symbols = args.symbols or SYMBOLS
+    start = int(time.time()) - args.days * 86400
+    for symbol in symbols:
+        # Only the candles missing from the local store are downloaded
+        store.backfill(symbol, TIMEFRAME, start)
+    arrays = load_arrays(store, symbols, TIMEFRAME, start)
+    if not arrays:
+        sys.exit("No candles to test")
+
+    started = time.perf_counter()
+    ranked, _ = optimize(arrays, param_sets, args.horizon, args.workers, args.min_signals)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(param_sets)} parameter sets x {len(arrays)} symbols in {elapsed:.1f}s (horizon {args.horizon} candles)")
+    print(ranked.head(args.top).to_string(index=False))
+    live = ranked[(ranked[list(LIVE_PARAMS)] == pd.Series(LIVE_PARAMS)).all(axis=1)]
+    print(f"\nLive parameters rank {live.index[0] + 1} of {len(ranked)}")
+    if args.csv:
+        ranked.to_csv(args.csv, index=False)
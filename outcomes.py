@@ -0,0 +1,211 @@
+"""
+Resolves signals into trades: which of stop or target is touched first.
+
+    python outcomes.py                   # sweep signals over config.SYMBOLS
+    python outcomes.py BTCUSD --rr 1 --max-bars 32
+
+Entry is the close of the signal candle. Every later candle is checked for
+a touch of the stop or the target; if one candle touches both, the stop is
+assumed to have come first. The first touch for all trades at once is found
+by binary search over a sparse table of range minima, so resolving costs
+O(n log n) for the table plus O(log n) vectorized steps, not a loop per
+candle.
+"""
+import sys
+import numpy as np
+import pandas as pd
+
+RISK_REWARD = 2  # strategy.md: target 1:1 minimum, 1:2 ideal
+
+
+class MinTable:
+    """Sparse table over `values` answering min(values[lo..hi]) for arrays of ranges in O(1)."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        levels = [values]
+        width = 1
+        while 2 * width <= n:
+            prev = levels[-1]
+            levels.append(np.minimum(prev[:len(prev) - width], prev[width:]))
+            width *= 2
+        # Pad every level to n so one fancy index reads any level
+        self.table = np.full((len(levels), max(n, 1)), np.inf)
+        for k, level in enumerate(levels):
+            self.table[k, :len(level)] = level
+
+    def query(self, lo, hi):
+        """Minimum over the inclusive ranges [lo, hi] (arrays, lo <= hi)."""
+        k = np.log2(hi - lo + 1).astype(np.int64)
+        return np.minimum(self.table[k, lo], self.table[k, hi - (1 << k) + 1])
+
+
+def first_touch(table, start, end, level):
+    """
+    For each i, the first index j in [start[i], end[i]] whose value is at or
+    below level[i], or -1 if there is none. Ranges with start > end are -1.
+    """
+    result = np.full(len(start), -1, dtype=np.int64)
+    valid = start <= end
+    if not valid.any():
+        return result
+    start, end, level = start[valid], end[valid], level[valid]
+    found = table.query(start, end) <= level
+    lo, hi = start.copy(), end.copy()
+    # The running minimum only falls as j grows, so "touched by j" is monotonic
+    for _ in range(int(np.max(end - start)).bit_length()):
+        mid = (lo + hi) // 2
+        hit = table.query(start, mid) <= level
+        hi = np.where(hit, mid, hi)
+        lo = np.where(hit, lo, mid + 1)
+    result[np.flatnonzero(valid)] = np.where(found, lo, -1)
+    return result
+
+
+def resolve(high, low, close, entry_index, side, stop, target, max_bars=None, tables=None):
+    """
+    Resolves trades entered at `close[entry_index]`.
+
+    Args:
+        high, low, close: candle arrays of one symbol
+        entry_index: signal candle position of each trade
+        side: 1 for long, -1 for short
+        stop, target: price levels of each trade
+        max_bars: close the trade at the close of this many candles after
+            entry if neither level was touched (None: hold to the data end)
+        tables: (MinTable(low), MinTable(-high)), to reuse across calls
+
+    Returns:
+        DataFrame with one row per trade: entry, exit_index, exit_price,
+        outcome ("target", "stop", "timeout" or "open" when the data ends
+        first), r (result in multiples of the risk), bars (held) and mae_r
+        (worst excursion against the trade, in R).
+    """
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    entry_index = np.asarray(entry_index, dtype=np.int64)
+    side = np.asarray(side, dtype=np.int64)
+    stop = np.asarray(stop, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    low_table, neg_high_table = tables or (MinTable(low), MinTable(-high))
+
+    n = len(close)
+    entry = close[entry_index]
+    risk = (entry - stop) * side
+    start = entry_index + 1
+    horizon = n - 1 if max_bars is None else np.minimum(entry_index + max_bars, n - 1)
+    end = np.broadcast_to(horizon, entry_index.shape).astype(np.int64)
+
+    long = side > 0
+    # Longs stop out on a low at/below the stop, shorts on a high at/above it
+    # (the -high table turns "high >= x" into "-high <= -x")
+    stop_hit = np.where(
+        long,
+        first_touch(low_table, start, end, np.where(long, stop, -np.inf)),
+        first_touch(neg_high_table, start, end, np.where(long, -np.inf, -stop)),
+    )
+    target_hit = np.where(
+        long,
+        first_touch(neg_high_table, start, end, np.where(long, -target, -np.inf)),
+        first_touch(low_table, start, end, np.where(long, -np.inf, target)),
+    )
+
+    stopped = (stop_hit >= 0) & ((target_hit < 0) | (stop_hit <= target_hit))
+    won = ~stopped & (target_hit >= 0)
+    exit_index = np.where(stopped, stop_hit, np.where(won, target_hit, end))
+    exit_price = np.where(stopped, stop, np.where(won, target, close[np.maximum(exit_index, 0)]))
+    data_ended = True if max_bars is None else entry_index + max_bars > n - 1
+    outcome = np.where(stopped, "stop", np.where(won, "target", np.where(data_ended, "open", "timeout")))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (exit_price - entry) * side / risk
+        # Worst price between entry and exit, against the trade
+        held = np.maximum(exit_index, start)
+        worst_low = low_table.query(np.minimum(start, n - 1), np.minimum(held, n - 1))
+        worst_high = -neg_high_table.query(np.minimum(start, n - 1), np.minimum(held, n - 1))
+        mae = np.where(long, entry - worst_low, worst_high - entry) / risk
+    no_bars = start > n - 1
+    return pd.DataFrame({
+        "entry_index": entry_index,
+        "side": side,
+        "entry": entry,
+        "stop": stop,
+        "target": target,
+        "exit_index": np.where(no_bars, entry_index, exit_index),
+        "exit_price": np.where(no_bars, entry, exit_price),
+        "outcome": np.where(no_bars, "open", outcome),
+        "r": np.where(no_bars, 0.0, r),
+        "bars": np.where(no_bars, 0, exit_index - entry_index),
+        "mae_r": np.where(no_bars, 0.0, np.maximum(mae, 0)),
+    })
+
+
+def summarize(trades):
+    """
+    Per-symbol statistics of closed trades (`open` ones are left out):
+    trades, win rate, expectancy and total in R, average candles held and
+    max drawdown of the cumulative R curve in exit order.
+    """
+    closed = trades[trades["outcome"] != "open"].sort_values(["symbol", "exit_index"])
+
+    def stats(t):
+        equity = t["r"].cumsum()
+        return pd.Series({
+            "trades": len(t),
+            "win_rate": (t["r"] > 0).mean(),
+            "expectancy_r": t["r"].mean(),
+            "total_r": t["r"].sum(),
+            "avg_bars": t["bars"].mean(),
+            "avg_mae_r": t["mae_r"].mean(),
+            "max_drawdown_r": (equity.cummax().clip(lower=0) - equity).max(),
+        })
+
+    return closed.groupby("symbol")[["r", "bars", "mae_r"]].apply(stats)
+
+
+def sweep_trades(df, risk_reward=RISK_REWARD, max_bars=None, **params):
+    """
+    Liquidity sweep signals of `backtest.backtest_sweep(df, **params)` as
+    trades: stop at the sweep candle's (C1) low for BUY / high for SELL,
+    target `risk_reward` times the risk from the C2 close.
+    """
+    from backtest import backtest_sweep
+
+    signals = backtest_sweep(df, **params)
+    idx = signals["index"].to_numpy(dtype=np.int64)
+    side = np.where(signals["signal"].to_numpy() == "BUY", 1, -1)
+    high, low, close = (df[col].to_numpy(dtype=float) for col in ("high", "low", "close"))
+    stop = np.where(side > 0, low[idx - 1], high[idx - 1])
+    target = close[idx] + risk_reward * (close[idx] - stop)
+    valid = (close[idx] - stop) * side > 0
+    trades = resolve(high, low, close, idx[valid], side[valid], stop[valid], target[valid], max_bars)
+    trades.insert(1, "time", df["time"].to_numpy()[idx[valid]])
+    return trades
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from candle_store import CandleStore
+    from config import SYMBOLS, TIMEFRAME, CANDLE_STORE_DIR
+
+    parser = argparse.ArgumentParser(description="Liquidity sweep trade outcomes")
+    parser.add_argument("symbols", nargs="*", help="symbols (default: config.SYMBOLS)")
+    parser.add_argument("--days", type=int, default=365, help="history to backfill and test")
+    parser.add_argument("--rr", type=float, default=RISK_REWARD, help="target as a multiple of the risk")
+    parser.add_argument("--max-bars", type=int, help="close trades after this many candles")
+    args = parser.parse_args()
+
+    store = CandleStore(CANDLE_STORE_DIR)
+    start = int(time.time()) - args.days * 86400
+    frames = []
+    for symbol in args.symbols or SYMBOLS:
+        # Only the candles missing from the local store are downloaded
+        store.backfill(symbol, TIMEFRAME, start)
+        df = store.read_frame(symbol, TIMEFRAME, start)
+        trades = sweep_trades(df, args.rr, args.max_bars)
+        trades.insert(0, "symbol", symbol)
+        frames.append(trades)
+    if not frames:
+        sys.exit("No candles")
+    print(summarize(pd.concat(frames, ignore_index=True)).to_string())
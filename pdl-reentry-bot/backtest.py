@@ -0,0 +1,180 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import config
+
+# The candle store and resampling are shared with the root EMA bot
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resample import resample_frame
+
+BAR_SECONDS = 15 * 60
+DAY_SECONDS = 86400
+TRAP_LOOKBACK = 5  # candles before c_last searched for a 2A trap (range(3, 8) live)
+
+
+def to_epoch(times):
+    """Datetime column -> int64 epoch seconds, whatever the datetime unit."""
+    return ((times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+def daily_levels(df, day_offset=config.DAY_START_OFFSET, bar_seconds=BAR_SECONDS):
+    """
+    Computes the PDH/PDL that `Strategy` would hold when each 15m candle closes.
+
+    The 15m history is resampled into exchange days (shifted by `day_offset`).
+    A candle closing during day D sees the high/low of day D-1, which is what
+    `update_levels` picks (`iloc[-2]`) from the live daily fetch. The first
+    day is dropped if the history starts part-way through it.
+
+    Returns:
+        (pdh, pdl) float arrays aligned with `df`, NaN where unknown.
+    """
+    t = to_epoch(df["time"])
+    daily = resample_frame(df, "1d", day_offset)
+    per_day = daily[["high", "low"]].astype(float).set_index((to_epoch(daily["time"]) - day_offset) // DAY_SECONDS)
+    if len(t) and (t[0] - day_offset) % DAY_SECONDS != 0:
+        per_day = per_day.iloc[1:]
+
+    eval_day = (t + bar_seconds - day_offset) // DAY_SECONDS
+    prev = per_day.reindex(eval_day - 1)
+    return prev["high"].to_numpy(), prev["low"].to_numpy()
+
+
+def pdl_signal_masks(o, h, l, c, pdh, pdl, trap_lookback=TRAP_LOOKBACK):
+    """
+    Evaluates `Strategy.check_signal` for every candle at once, with each
+    position k treated as the just-closed candle (c_last) and k-1 as c_prev.
+
+    Returns:
+        (signal, setup, trap_offset) arrays: signal is 1 (BUY), -1 (SELL) or
+        0; setup is "2A"/"2B"/""; trap_offset is how many candles before
+        c_last the 2A trap closed (0 if not 2A).
+    """
+    n = len(c)
+    signal = np.zeros(n, dtype=np.int8)
+    setup = np.full(n, "", dtype=object)
+    trap_offset = np.zeros(n, dtype=np.int64)
+    if n < 2:
+        return signal, setup, trap_offset
+
+    def shifted(a, j):
+        out = np.full(n, np.nan)
+        out[j:] = a[:n - j]
+        return out
+
+    # Nearest trap wins, like the live loop which walks back from c_prev
+    buy_trap = np.zeros(n, dtype=np.int64)
+    sell_trap = np.zeros(n, dtype=np.int64)
+    for j in range(trap_lookback, 0, -1):
+        past = shifted(c, j)
+        buy_trap[past < pdl] = j
+        sell_trap[past > pdh] = j
+
+    o_prev, h_prev, l_prev, c_prev = shifted(o, 1), shifted(h, 1), shifted(l, 1), shifted(c, 1)
+
+    buy_2a = (c > pdl) & (buy_trap > 0)
+    buy_2b = (l_prev < pdl) & (c_prev > pdl) & (c > o)
+    sell_2a = (c < pdh) & (sell_trap > 0)
+    sell_2b = (h_prev > pdh) & (c_prev < pdh) & (c < o)
+
+    # Apply in reverse priority so the live check order wins
+    for mask, side, name, trap in (
+        (sell_2b, -1, "2B", None),
+        (sell_2a, -1, "2A", sell_trap),
+        (buy_2b, 1, "2B", None),
+        (buy_2a, 1, "2A", buy_trap),
+    ):
+        signal[mask] = side
+        setup[mask] = name
+        trap_offset[mask] = trap[mask] if trap is not None else 0
+
+    signal[0] = 0
+    setup[0] = ""
+    trap_offset[0] = 0
+    return signal, setup, trap_offset
+
+
+def backtest_pdl(df, day_offset=config.DAY_START_OFFSET, trap_lookback=TRAP_LOOKBACK):
+    """
+    Runs the PDL/PDH re-entry strategy over a full 15m history.
+
+    Args:
+        df: DataFrame with time/open/high/low/close columns, sorted by time
+
+    Returns:
+        DataFrame of signals with columns index, time, signal, setup,
+        trap_index, pdh, pdl.
+    """
+    df = df.reset_index(drop=True)
+    pdh, pdl = daily_levels(df, day_offset)
+    signal, setup, trap_offset = pdl_signal_masks(
+        df["open"].to_numpy(dtype=float),
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        df["close"].to_numpy(dtype=float),
+        pdh,
+        pdl,
+        trap_lookback
+    )
+
+    idx = np.flatnonzero(signal)
+    return pd.DataFrame({
+        "index": idx,
+        "time": df["time"].to_numpy()[idx],
+        "signal": np.where(signal[idx] > 0, "BUY", "SELL"),
+        "setup": setup[idx],
+        "trap_index": np.where(trap_offset[idx] > 0, idx - trap_offset[idx], -1),
+        "pdh": pdh[idx],
+        "pdl": pdl[idx],
+    })
+
+
+def pdl_trades(df, risk_reward=config.RISK_REWARD, max_bars=None, day_offset=config.DAY_START_OFFSET):
+    """
+    `backtest_pdl` signals resolved into trades (see the root `outcomes.py`).
+
+    Entry is the c_last close. The stop is the extreme of the sweep: the
+    lowest low (BUY) / highest high (SELL) from the 2A trap candle, or from
+    c_prev for 2B, through c_last. The target is `risk_reward` times the risk.
+    """
+    from outcomes import MinTable, resolve
+
+    df = df.reset_index(drop=True)
+    signals = backtest_pdl(df, day_offset)
+    idx = signals["index"].to_numpy(dtype=np.int64)
+    side = np.where(signals["signal"].to_numpy() == "BUY", 1, -1)
+    first = np.where(signals["trap_index"].to_numpy() >= 0, signals["trap_index"].to_numpy(), idx - 1)
+
+    high, low, close = (df[col].to_numpy(dtype=float) for col in ("high", "low", "close"))
+    tables = (MinTable(low), MinTable(-high))
+    stop = np.where(side > 0, tables[0].query(first, idx), -tables[1].query(first, idx))
+    target = close[idx] + risk_reward * (close[idx] - stop)
+    valid = (close[idx] - stop) * side > 0
+    trades = resolve(high, low, close, idx[valid], side[valid], stop[valid], target[valid], max_bars, tables)
+    trades.insert(1, "time", df["time"].to_numpy()[idx[valid]])
+    trades.insert(2, "setup", signals["setup"].to_numpy()[valid])
+    return trades
+
+
+if __name__ == "__main__":
+    import time
+    from candle_store import CandleStore
+    from outcomes import summarize
+
+    BACKTEST_DAYS = 365
+
+    store = CandleStore(config.CANDLE_STORE_DIR)
+    symbols = sys.argv[1:] or [config.SYMBOL]
+    for symbol in symbols:
+        # Only the candles missing from the local store are downloaded
+        store.backfill(symbol, config.TIMEFRAME_15M, int(time.time()) - BACKTEST_DAYS * 86400)
+        df = store.read_frame(symbol, config.TIMEFRAME_15M)
+        if df.empty:
+            continue
+        signals = backtest_pdl(df)
+        print(f"{symbol}: {len(df)} candles, {len(signals)} signals")
+        print(signals.tail(10).to_string(index=False))
+        trades = pdl_trades(df)
+        trades.insert(0, "symbol", symbol)
+        print(summarize(trades).to_string())
@@ -7,14 +7,45 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'), encodin
 BASE_URL = "https://api.delta.exchange"
 SYMBOL = "BTCUSD" 
 TRADING_SYMBOL = "BTCUSD" 
+# Comma-separated list; more than one symbol runs the multi-symbol scanner
+SYMBOLS = [s.strip() for s in os.getenv("SYMBOLS", SYMBOL).split(",") if s.strip()]
 
 # Timeframes
 TIMEFRAME_15M = "15m"
 TIMEFRAME_1D = "1d"
 
+# Start of the exchange's daily candle, in seconds after 00:00 UTC.
+# Used when daily levels are derived from intraday candles.
+DAY_START_OFFSET = 0
+
+# Shared candle service socket, see MARKET_DATA_SOCKET in the root config.py
+MARKET_DATA_SOCKET = os.getenv("MARKET_DATA_SOCKET") or None
+
+# Local candle history shared with the root bot (see ../candle_store.py)
+CANDLE_STORE_DIR = os.getenv(
+    "CANDLE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "candles")
+)
+
+# Live data source: "poll" (REST from each 15m close) or "stream" (trade
+# feed, bars built in-process). Point STREAM_URL at `python ../stream.py` to test offline.
+LIVE_MODE = os.getenv("LIVE_MODE", "poll")
+STREAM_URL = os.getenv("STREAM_URL", "wss://socket.india.delta.exchange")
+
+# From each 15m close, candles are requested every CLOSE_POLL_INTERVAL
+# seconds until the closed one is published: as soon as the next candle
+# appears, or CLOSE_SETTLE seconds after the close if none does (also when
+# the period had no trades at all).
+CLOSE_POLL_INTERVAL = 1
+CLOSE_POLL_TIMEOUT = 60
+CLOSE_SETTLE = 5
+
 # Telegram
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# Alerted signals are remembered here so restarts don't re-send them
+DEDUPE_PATH = os.getenv("DEDUPE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "signals.json"))
+
 # Strategy Config
 RISK_REWARD = 2
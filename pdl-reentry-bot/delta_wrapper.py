@@ -1,8 +1,15 @@
-import requests
-import pandas as pd
+import os
+import sys
 import time
 import config
 
+# The incremental candle cache is shared with the root EMA bot
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from candle_cache import CandleCache
+from candle_service import candle_fetch
+from delta_api import client
+from candles import Candles
+
 # Use the specific endpoint that was working for the user
 BASE_URL = "https://cdn.india.deltaex.org/v2/history/candles"
 
@@ -11,6 +18,8 @@ def fetch_candles(symbol, resolution, limit=100):
     Fetches candles from Delta Exchange.
     resolution: '1m', '15m', '1h', '1d' etc.
     """
+    import pandas as pd
+
     end = int(time.time())
 
     # Calculate start time based on resolution and limit
@@ -34,8 +43,7 @@ def fetch_candles(symbol, resolution, limit=100):
     }
 
     try:
-        r = requests.get(BASE_URL, params=params, timeout=10)
-        r.raise_for_status()
+        r = client.get(BASE_URL, params=params, timeout=10)
         data = r.json().get("result", [])
         
         if not data:
@@ -50,3 +58,49 @@ def fetch_candles(symbol, resolution, limit=100):
     except Exception as e:
         print(f"Error fetching candles: {e}")
         return pd.DataFrame()
+
+
+# Through the shared candle service when one is configured
+_cache = CandleCache(fetch=candle_fetch(config.MARKET_DATA_SOCKET))
+
+def fetch_candles_cached(symbol, resolution, limit=100):
+    """
+    Same candles as `fetch_candles`, as an array-backed `Candles` series.
+    Keeps the last `limit` candles in memory and only requests candles
+    newer than the last one it holds.
+    """
+    try:
+        return _cache.update(symbol, resolution, limit=limit, timeout=10)
+    except Exception as e:
+        print(f"Error fetching candles: {e}")
+        _cache.clear(symbol, resolution)
+        return Candles.empty_series()
+
+def refresh_cached(symbol, resolution, limit=100):
+    """
+    Fetches new candles into the cache without building a series (see
+    `cached_rows`). Raises on errors, for use with `delta_api.fetch_many`.
+    """
+    _cache.refresh(symbol, resolution, limit=limit, timeout=10)
+
+def add_bar(symbol, resolution, bar):
+    """
+    Merges a closed bar built from the trade stream into the cache.
+    Returns the cached window (last row = that bar), or an empty series
+    if nothing is cached for this symbol yet.
+    """
+    candles = _cache.add_bar(symbol, resolution, bar)
+    return Candles.empty_series() if candles is None else candles
+
+def cached_rows(symbol, resolution):
+    """Cached candles as (time, open, high, low, close, volume) tuples."""
+    return _cache.rows(symbol, resolution)
+
+def cached_candles(symbol, resolution):
+    """The cached window as `Candles`, without fetching."""
+    return _cache.candles(symbol, resolution)
+
+def last_cached_time(symbol, resolution):
+    """Open time of the newest cached candle, or None."""
+    rows = _cache.rows(symbol, resolution)
+    return rows[-1][0] if rows else None
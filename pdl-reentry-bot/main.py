@@ -1,8 +1,12 @@
-import time
-import pandas as pd
-from datetime import datetime
+import numpy as np
 import config
 import delta_wrapper
+import clock
+from candle_cache import poll_until_closed
+from candles import close_published, format_time
+from dedupe import SignalDedupe
+from resample import MultiTimeframeSeries
+from multi_strategy import MultiStrategy, BAR_SECONDS, reason
 from strategy import Strategy
 import notifier
 import signal
@@ -12,71 +16,206 @@ import sys
 running = True
 strategy = Strategy()
 last_processed_time = None
+sent_signals = SignalDedupe(path=config.DEDUPE_PATH)
+daily_series = MultiTimeframeSeries(config.TIMEFRAME_15M, [config.TIMEFRAME_1D], limit=5, day_offset=config.DAY_START_OFFSET)
+
+# Enough 15m candles to cover all of yesterday from any time today
+CANDLE_LIMIT_15M = 200
 
 def signal_handler(sig, frame):
     global running
     print("\nShutting down bot...")
     running = False
 
-def run_bot():
+def update_levels(now):
+    # Daily candles are aggregated locally from the cached 15m candles, so
+    # only one series is fetched from the API.
+    daily_series.feed(delta_wrapper.cached_rows(config.SYMBOL, config.TIMEFRAME_15M), now)
+    daily_candles = daily_series.candles(config.TIMEFRAME_1D)
+    if not daily_candles.empty:
+        strategy.update_levels(daily_candles, includes_forming=False)
+    else:
+        print("Warning: No complete daily candle yet.")
+
+def process_candles(candles_15m):
+    """
+    Runs the strategy once per newly closed 15m candle and sends any alert.
+    candles_15m: closed candles only (see `Candles.closed`).
+    """
     global last_processed_time
-    print(f"[{datetime.now()}] PDL/PDH Re-entry Bot Started for {config.SYMBOL}")
-    notifier.send_alert(f"🚀 PDL/PDH Bot Started on {config.SYMBOL}")
 
+    if candles_15m.empty:
+        return
+    last_completed_time = candles_15m[-1]["time"]
+
+    # Only run logic if we have a NEW closed candle
+    if last_processed_time == last_completed_time:
+        return
+
+    sig_type, reason = strategy.check_signal(candles_15m, includes_forming=False)
+
+    print(f"[{format_time(last_completed_time)}] Context: {strategy.get_context()} | Result: {sig_type} ({reason})")
+
+    if sig_type and sent_signals.add((config.SYMBOL, last_completed_time, sig_type)):
+        # Construct Alert Message
+        msg = (
+            f"🚨 **{sig_type} SIGNAL** 🚨\n"
+            f"Symbol: {config.SYMBOL}\n"
+            f"Time: {format_time(last_completed_time)}\n"
+            f"Reason: {reason}\n"
+            f"Levels: PDH={strategy.pdh}, PDL={strategy.pdl}\n"
+        )
+        print(">>> SENDING ALERT <<<")
+        notifier.send_alert(msg)
+
+    last_processed_time = last_completed_time
+
+def wait_for_close():
+    """Sleeps until the next 15m close and returns its time, or None once stopped."""
+    close_time = (int(clock.time()) // BAR_SECONDS + 1) * BAR_SECONDS
     while running:
+        remaining = close_time - clock.time()
+        if remaining <= 0:
+            return close_time
+        # Wakes up at least every minute to notice a shutdown
+        clock.sleep(min(remaining, 60))
+    return None
+
+def poll_closed(symbols, close_time, fetch, last_time):
+    """
+    Requests the 15m candles of `symbols` from `close_time` on until the
+    candle closing then is published for each (see `close_published`).
+    `last_time(symbol, result)` is the newest candle's open time.
+    Returns the symbols whose fetches kept failing until CLOSE_POLL_TIMEOUT.
+    """
+    def published(symbol, result):
+        return close_published(last_time(symbol, result), close_time, clock.time(), config.CLOSE_SETTLE)
+
+    missed = poll_until_closed(fetch, symbols, published, give_up_at=close_time + config.CLOSE_POLL_TIMEOUT,
+                               interval=config.CLOSE_POLL_INTERVAL)
+    if missed:
+        print(f"Warning: candle closing at {format_time(close_time)} not published for {', '.join(missed)}")
+    return missed
+
+def run_bot():
+    print(f"[{clock.now()}] PDL/PDH Re-entry Bot Started for {config.SYMBOL}")
+    notifier.send_alert(f"🚀 PDL/PDH Bot Started on {config.SYMBOL}")
+
+    # The latest close is checked right away, then each one as it happens
+    close_time = int(clock.time()) // BAR_SECONDS * BAR_SECONDS
+    while running and close_time is not None:
         try:
-            # 1. Update Daily Levels (PDH/PDL)
-            # Fetch daily candles
-            daily_candles = delta_wrapper.fetch_candles(config.SYMBOL, config.TIMEFRAME_1D, limit=5)
-            if not daily_candles.empty:
-                strategy.update_levels(daily_candles)
-            else:
-                print("Warning: Could not fetch daily candles.")
-
-            # 2. Check 15m Signals
-            # Fetch 15m candles
-            candles_15m = delta_wrapper.fetch_candles(config.SYMBOL, config.TIMEFRAME_15M, limit=20)
-            
-            if not candles_15m.empty:
-                # Get the last COMPLETED candle time (2nd to last in list usually)
-                last_completed_candle = candles_15m.iloc[-2]
-                last_completed_time = last_completed_candle["time"]
-
-                # Only run logic if we have a NEW closed candle
-                if last_processed_time != last_completed_time:
-                    
-                    sig_type, reason = strategy.check_signal(candles_15m)
-                    
-                    print(f"[{last_completed_time}] Context: {strategy.get_context()} | Result: {sig_type} ({reason})")
-                    
-                    if sig_type:
-                        # Construct Alert Message
-                        msg = (
-                            f"🚨 **{sig_type} SIGNAL** 🚨\n"
-                            f"Symbol: {config.SYMBOL}\n"
-                            f"Time: {last_completed_time}\n"
-                            f"Reason: {reason}\n"
-                            f"Levels: PDH={strategy.pdh}, PDL={strategy.pdl}\n"
-                        )
-                        print(">>> SENDING ALERT <<<")
-                        notifier.send_alert(msg)
-                    
-                    last_processed_time = last_completed_time
-                else:
-                    # Just heartbeat or wait
-                    pass
-            else:
-                print("Warning: Could not fetch 15m candles.")
+            # 1. Fetch 15m candles until the one closing now is published
+            missed = poll_closed(
+                [config.SYMBOL], close_time,
+                lambda symbol: delta_wrapper.fetch_candles_cached(symbol, config.TIMEFRAME_15M, limit=CANDLE_LIMIT_15M),
+                lambda symbol, candles: int(candles.time[-1]) if len(candles) else None
+            )
+            if not missed:
+                # 2. Update Daily Levels (PDH/PDL)
+                update_levels(close_time)
 
+                # 3. Check 15m Signals on the candles closed by now
+                candles_15m = delta_wrapper.cached_candles(config.SYMBOL, config.TIMEFRAME_15M)
+                process_candles(candles_15m.closed(BAR_SECONDS, close_time))
+
+        except Exception as e:
+            print(f"Error in main loop: {e}")
+            notifier.send_alert(f"⚠️ Bot Error: {e}")
+
+        close_time = wait_for_close()
+
+def on_stream_bar(symbol, resolution, bar):
+    candles_15m = delta_wrapper.add_bar(symbol, resolution, bar)
+    if candles_15m.empty:
+        # No history yet, seed it from REST (that window ends with the forming candle)
+        candles_15m = delta_wrapper.fetch_candles_cached(symbol, resolution, limit=CANDLE_LIMIT_15M)
+    now = clock.time()
+    update_levels(now)
+    process_candles(candles_15m.closed(BAR_SECONDS, now))
+
+def on_stream_gap(symbol, resolution):
+    candles_15m = delta_wrapper.fetch_candles_cached(symbol, resolution, limit=CANDLE_LIMIT_15M)
+    now = clock.time()
+    update_levels(now)
+    process_candles(candles_15m.closed(BAR_SECONDS, now))
+
+def run_stream():
+    from stream import StreamRunner
+
+    print(f"[{clock.now()}] PDL/PDH Re-entry Bot Started for {config.SYMBOL} (stream mode)")
+    notifier.send_alert(f"🚀 PDL/PDH Bot Started on {config.SYMBOL}")
+    StreamRunner(config.STREAM_URL, [config.SYMBOL], [config.TIMEFRAME_15M], on_stream_bar, on_stream_gap).run()
+
+def process_multi(scanner, now, alert_history=True):
+    """
+    Feeds every symbol's newly closed 15m candles to the array-backed
+    scanner, one candle time at a time, and alerts on signals. With
+    `alert_history=False` only the latest candle time can alert (start-up
+    replay of the cached history).
+    """
+    # Closed candles not processed yet, grouped by candle time
+    pending = {}
+    for i, symbol in enumerate(scanner.symbols):
+        for row in delta_wrapper.cached_rows(symbol, config.TIMEFRAME_15M):
+            if row[0] + BAR_SECONDS <= now and row[0] > scanner.last_time[i]:
+                pending.setdefault(row[0], []).append((i, row))
+
+    n = len(scanner.symbols)
+    for t in sorted(pending):
+        o, h, l, c = (np.full(n, np.nan) for _ in range(4))
+        for i, row in pending[t]:
+            o[i], h[i], l[i], c[i] = row[1], row[2], row[3], row[4]
+        sig, setup, trap_time = scanner.on_candle(np.full(n, t), o, h, l, c)
+
+        if not alert_history and t != max(pending):
+            continue
+        for i in np.flatnonzero(sig):
+            symbol = scanner.symbols[i]
+            sig_type = "BUY" if sig[i] > 0 else "SELL"
+            candle_time = format_time(t)
+            print(f"[{candle_time}] {symbol} Context: {scanner.get_context(i)} | Result: {sig_type} ({setup[i]})")
+            if not sent_signals.add((symbol, int(t), sig_type)):
+                continue
+            msg = (
+                f"🚨 **{sig_type} SIGNAL** 🚨\n"
+                f"Symbol: {symbol}\n"
+                f"Time: {candle_time}\n"
+                f"Reason: {reason(setup[i], sig[i], trap_time[i], t)}\n"
+                f"Levels: PDH={scanner.pdh[i]}, PDL={scanner.pdl[i]}\n"
+            )
+            notifier.send_alert(msg, group=t)
+
+def run_multi():
+    print(f"[{clock.now()}] PDL/PDH Re-entry Bot Started for {len(config.SYMBOLS)} symbols")
+    notifier.send_alert(f"🚀 PDL/PDH Bot Started on {', '.join(config.SYMBOLS)}")
+    scanner = MultiStrategy(config.SYMBOLS)
+    first_pass = True
+
+    close_time = int(clock.time()) // BAR_SECONDS * BAR_SECONDS
+    while running and close_time is not None:
+        try:
+            poll_closed(
+                config.SYMBOLS, close_time,
+                lambda symbol: delta_wrapper.refresh_cached(symbol, config.TIMEFRAME_15M, limit=CANDLE_LIMIT_15M),
+                lambda symbol, _: delta_wrapper.last_cached_time(symbol, config.TIMEFRAME_15M)
+            )
+            # Symbols that missed this close catch up after a later one
+            process_multi(scanner, close_time, alert_history=not first_pass)
+            first_pass = False
         except Exception as e:
             print(f"Error in main loop: {e}")
             notifier.send_alert(f"⚠️ Bot Error: {e}")
 
-        # Sleep to avoid spamming API
-        # We need to run every few seconds to catch the candle close, but for 15m candles, 
-        # checking every 30-60s is usually fine.
-        time.sleep(60)
+        close_time = wait_for_close()
 
 if __name__ == "__main__":
     signal.signal(signal.SIGINT, signal_handler)
-    run_bot()
+    if len(config.SYMBOLS) > 1:
+        run_multi()
+    elif config.LIVE_MODE == "stream":
+        run_stream()
+    else:
+        run_bot()
+    # Deliver anything still queued before exiting
+    notifier.flush()
@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+import numpy as np
+import config
+
+BAR_SECONDS = 15 * 60
+DAY_SECONDS = 86400
+TRAP_LOOKBACK = 5  # candles before c_last searched for a 2A trap, as in Strategy
+
+
+class MultiStrategy:
+    """
+    The PDL/PDH re-entry rules of `Strategy` for a whole universe of symbols.
+
+    All per-symbol state lives in parallel NumPy arrays (struct-of-arrays):
+    the levels, the running high/low of the current day, and the last few
+    closes needed for trap detection. `on_candle` takes one just-closed 15m
+    candle per symbol and, in one vectorized pass, rolls every symbol's
+    daily levels if its day ended and evaluates the re-entry rules.
+    """
+
+    def __init__(self, symbols, day_offset=config.DAY_START_OFFSET, trap_lookback=TRAP_LOOKBACK):
+        self.symbols = list(symbols)
+        self.day_offset = day_offset
+        self.trap_lookback = trap_lookback
+        n = len(self.symbols)
+
+        self.pdh = np.full(n, np.nan)
+        self.pdl = np.full(n, np.nan)
+        self.last_day_ts = np.full(n, -1, dtype=np.int64)
+
+        # Day being accumulated
+        self.day = np.full(n, -1, dtype=np.int64)
+        self.day_high = np.full(n, np.nan)
+        self.day_low = np.full(n, np.nan)
+        self.day_complete = np.zeros(n, dtype=bool)
+
+        # Previous candle and the closes before it, oldest first
+        self.prev_high = np.full(n, np.nan)
+        self.prev_low = np.full(n, np.nan)
+        self.closes = np.full((n, trap_lookback), np.nan)
+        self.times = np.full((n, trap_lookback), -1, dtype=np.int64)
+        self.last_time = np.full(n, -1, dtype=np.int64)
+
+    def update_levels(self, mask, day_ts, highs, lows):
+        """Sets PDH/PDL for the symbols in `mask` in one pass."""
+        self.pdh[mask] = highs[mask]
+        self.pdl[mask] = lows[mask]
+        self.last_day_ts[mask] = day_ts[mask]
+
+    def _roll_days(self, mask):
+        # Finished days become the new levels (NaN if the day was partial)
+        complete = mask & self.day_complete
+        self.update_levels(mask, self.day * DAY_SECONDS + self.day_offset,
+                           np.where(complete, self.day_high, np.nan),
+                           np.where(complete, self.day_low, np.nan))
+        self.day[mask] = -1
+
+    def on_candle(self, times, o, h, l, c):
+        """
+        Processes one just-closed candle per symbol (arrays aligned with
+        `symbols`; NaN close = no new candle for that symbol).
+
+        Returns:
+            (signal, setup, trap_time): signal is 1 (BUY), -1 (SELL) or 0,
+            setup is "2A"/"2B"/"", trap_time is the epoch of the 2A trap
+            candle (-1 otherwise).
+        """
+        times = np.asarray(times, dtype=np.int64)
+        valid = ~np.isnan(c) & (times > self.last_time)
+        day = (times - self.day_offset) // DAY_SECONDS
+
+        # A candle from a later day before the previous one completed (gap)
+        self._roll_days(valid & (self.day >= 0) & (day != self.day))
+
+        # Accumulate this candle into its day
+        new_day = valid & (self.day != day)
+        self.day[new_day] = day[new_day]
+        self.day_high[new_day] = h[new_day]
+        self.day_low[new_day] = l[new_day]
+        self.day_complete[new_day] = (times[new_day] - self.day_offset) % DAY_SECONDS == 0
+        cont = valid & ~new_day
+        self.day_high[cont] = np.maximum(self.day_high[cont], h[cont])
+        self.day_low[cont] = np.minimum(self.day_low[cont], l[cont])
+
+        # The candle closing at midnight already sees its own day as "previous"
+        self._roll_days(valid & ((times + BAR_SECONDS - self.day_offset) % DAY_SECONDS == 0))
+
+        signal, setup, trap_time = self._evaluate(valid, o, c)
+        self._push(valid, times, h, l, c)
+        return signal, setup, trap_time
+
+    def _evaluate(self, valid, o, c):
+        n = len(self.symbols)
+        pdh, pdl = self.pdh, self.pdl
+        c_prev = self.closes[:, -1]
+
+        # Nearest trap wins, like the live loop which walks back from c_prev
+        buy_trap = np.full(n, -1, dtype=np.int64)
+        sell_trap = np.full(n, -1, dtype=np.int64)
+        for j in range(self.trap_lookback):
+            past, t = self.closes[:, j], self.times[:, j]
+            buy_trap = np.where(past < pdl, t, buy_trap)
+            sell_trap = np.where(past > pdh, t, sell_trap)
+
+        with np.errstate(invalid="ignore"):
+            buy_2a = (c > pdl) & (buy_trap >= 0)
+            buy_2b = (self.prev_low < pdl) & (c_prev > pdl) & (c > o)
+            sell_2a = (c < pdh) & (sell_trap >= 0)
+            sell_2b = (self.prev_high > pdh) & (c_prev < pdh) & (c < o)
+
+        signal = np.zeros(n, dtype=np.int8)
+        setup = np.full(n, "", dtype=object)
+        trap_time = np.full(n, -1, dtype=np.int64)
+        # Apply in reverse priority so Strategy's check order wins
+        for mask, side, name, trap in (
+            (sell_2b, -1, "2B", None),
+            (sell_2a, -1, "2A", sell_trap),
+            (buy_2b, 1, "2B", None),
+            (buy_2a, 1, "2A", buy_trap),
+        ):
+            mask = mask & valid
+            signal[mask] = side
+            setup[mask] = name
+            trap_time[mask] = trap[mask] if trap is not None else -1
+        return signal, setup, trap_time
+
+    def _push(self, valid, times, h, l, c):
+        self.closes[valid] = np.column_stack([self.closes[valid, 1:], c[valid]])
+        self.times[valid] = np.column_stack([self.times[valid, 1:], times[valid]])
+        self.prev_high[valid] = h[valid]
+        self.prev_low[valid] = l[valid]
+        self.last_time[valid] = times[valid]
+
+    def get_context(self, i):
+        return f"PDH: {self.pdh[i]}, PDL: {self.pdl[i]}"
+
+
+def reason(setup, side, trap_time, candle_time):
+    """Alert text matching the reasons `Strategy.check_signal` gives."""
+    fmt = lambda t: datetime.fromtimestamp(int(t), timezone.utc).strftime('%H:%M')
+    prev_time = candle_time - BAR_SECONDS
+    if setup == "2A" and side > 0:
+        return f"Trap at {fmt(trap_time)} (Close < PDL), Re-entry at {fmt(candle_time)} (Close > PDL)"
+    if setup == "2A":
+        return f"Trap at {fmt(trap_time)} (Close > PDH), Re-entry at {fmt(candle_time)} (Close < PDH)"
+    if side > 0:
+        return f"2B Setup: Sweep at {fmt(prev_time)}, Confirmed Green at {fmt(candle_time)}"
+    return f"2B Setup: Sweep at {fmt(prev_time)}, Confirmed Red at {fmt(candle_time)}"
@@ -1,16 +1,27 @@
-import pandas as pd
+from datetime import datetime, timezone
 import config
 
+
+def _as_datetime(t):
+    """Candle time as a datetime; `Candles` hold int epoch seconds, DataFrames Timestamps."""
+    if isinstance(t, datetime):
+        return t
+    return datetime.fromtimestamp(int(t), timezone.utc)
+
+
 class Strategy:
     def __init__(self):
         self.pdh = None
         self.pdl = None
         self.last_day_ts = None
 
-    def update_levels(self, daily_candles):
+    def update_levels(self, daily_candles, includes_forming=True):
         """
         Updates PDH and PDL based on the last closed daily candle.
         Assumes daily_candles is sorted by time.
+
+        includes_forming: False if every row is a closed day (daily bars
+        aggregated locally from 15m candles).
         """
         if daily_candles.empty:
             return
@@ -24,26 +35,33 @@ class Strategy:
         # -1 is typically the current incomplete candle (if fetching up to 'now')
         # -2 is yesterday (completed)
         
-        if len(daily_candles) < 2:
+        if includes_forming and len(daily_candles) < 2:
             return
 
-        prev_day = daily_candles.iloc[-2]
+        prev_day = daily_candles.iloc[-2 if includes_forming else -1]
         
         # Only update if we haven't processed this day yet or levels are unset
         if self.last_day_ts != prev_day["time"]:
             self.pdh = prev_day["high"]
             self.pdl = prev_day["low"]
             self.last_day_ts = prev_day["time"]
-            print(f"[Strategy] Updated Levels | PDH: {self.pdh}, PDL: {self.pdl} (Date: {prev_day['time'].date()})")
+            print(f"[Strategy] Updated Levels | PDH: {self.pdh}, PDL: {self.pdl} (Date: {_as_datetime(prev_day['time']).date()})")
 
-    def check_signal(self, candles_15m):
+    def check_signal(self, candles_15m, includes_forming=True):
         """
         Checks for Buy/Sell signals based on 15m candles and PDH/PDL.
+
+        includes_forming: True if the last row is the still-open candle (REST
+        polling), False if the last row is the candle that just closed
+        (streamed bars).
         """
         if self.pdh is None or self.pdl is None:
             return None, "Levels not set"
 
-        if len(candles_15m) < 3:
+        # Number of rows after the just-closed candle
+        skip = 1 if includes_forming else 0
+
+        if len(candles_15m) < 2 + skip:
             return None, "Not enough data"
 
         # Candles:
@@ -56,8 +74,8 @@ class Strategy:
         
         # Let's focus on the last completed candle (-2) completing the setup.
         
-        c_last = candles_15m.iloc[-2] # The candle that just closed
-        c_prev = candles_15m.iloc[-3] # The candle before that
+        c_last = candles_15m.iloc[-1 - skip] # The candle that just closed
+        c_prev = candles_15m.iloc[-2 - skip] # The candle before that
         
         # We also might need to look slightly further back for the Trap candle if it wasn't immediately previous.
         # Strategy: "A subsequent candle (same day) Closes back..."
@@ -88,7 +106,7 @@ class Strategy:
         if cond_2a_buy:
              # Look for Condition 1 (Trap) in recent candles BEFORE c_last
              # Iterate back from c_prev
-             for i in range(3, 8): # Check last few candles
+             for i in range(2 + skip, 7 + skip): # Check last few candles
                  if i > len(candles_15m): break
                  c_historical = candles_15m.iloc[-i]
                  
@@ -97,7 +115,7 @@ class Strategy:
                      # Valid Trap found!
                      # Verify it wasn't invalidated in between? (Strategy doesn't specify, but implies immediate re-entry is better)
                      # For now, if we found a trap and now we re-entered, it's a valid 2A signal.
-                     return "BUY", f"Trap at {c_historical['time'].strftime('%H:%M')} (Close < PDL), Re-entry at {c_last['time'].strftime('%H:%M')} (Close > PDL)"
+                     return "BUY", f"Trap at {_as_datetime(c_historical['time']).strftime('%H:%M')} (Close < PDL), Re-entry at {_as_datetime(c_last['time']).strftime('%H:%M')} (Close > PDL)"
 
         # 2B Check: Rejection + Confirmation
         # Setup: c_prev swept PDL but closed > PDL. c_last is GREEN.
@@ -135,7 +153,7 @@ class Strategy:
             
             # I will implement 2B as a standalone valid path: Sweep (Low < PDL), Close > PDL, Next Green.
             
-            return "BUY", f"2B Setup: Sweep at {c_prev['time'].strftime('%H:%M')}, Confirmed Green at {c_last['time'].strftime('%H:%M')}"
+            return "BUY", f"2B Setup: Sweep at {_as_datetime(c_prev['time']).strftime('%H:%M')}, Confirmed Green at {_as_datetime(c_last['time']).strftime('%H:%M')}"
 
         # --- SELL LOGIC (Buyer Trap) ---
         # 1. Trap: Candle Closed > PDH
@@ -144,11 +162,11 @@ class Strategy:
         # 2A Check: c_last closed < PDH
         if c_last["close"] < self.pdh:
              # Check for recent Close > PDH
-             for i in range(3, 8):
+             for i in range(2 + skip, 7 + skip):
                  if i > len(candles_15m): break
                  c_historical = candles_15m.iloc[-i]
                  if c_historical["close"] > self.pdh:
-                     return "SELL", f"Trap at {c_historical['time'].strftime('%H:%M')} (Close > PDH), Re-entry at {c_last['time'].strftime('%H:%M')} (Close < PDH)"
+                     return "SELL", f"Trap at {_as_datetime(c_historical['time']).strftime('%H:%M')} (Close > PDH), Re-entry at {_as_datetime(c_last['time']).strftime('%H:%M')} (Close < PDH)"
 
         # 2B Check: Sweep PDH (High > PDH), Close < PDH, Next Red
         c_prev_sweep_sell = c_prev["high"] > self.pdh
@@ -156,7 +174,7 @@ class Strategy:
         c_last_red = c_last["close"] < c_last["open"]
         
         if c_prev_sweep_sell and c_prev_reject_sell and c_last_red:
-            return "SELL", f"2B Setup: Sweep at {c_prev['time'].strftime('%H:%M')}, Confirmed Red at {c_last['time'].strftime('%H:%M')}"
+            return "SELL", f"2B Setup: Sweep at {_as_datetime(c_prev['time']).strftime('%H:%M')}, Confirmed Red at {_as_datetime(c_last['time']).strftime('%H:%M')}"
 
         return None, "No Signal"
 
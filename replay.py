@@ -0,0 +1,227 @@
+"""
+Replays stored candles through a bot's unchanged live loop on a virtual clock.
+
+    python replay.py ema                      # last 7 stored days, config.SYMBOLS
+    python replay.py pdl BTCUSD --days 30 --compare
+    python replay.py ema --recording week.json --verbose
+
+The bot's `run_bot` runs as in production, except that:
+- the history endpoint is served from the candle store (or a recording), as
+  it looked at the virtual time of each request;
+- `clock` is a `VirtualClock`, so every sleep returns at once;
+- alerts are recorded instead of sent, and dedupe state is kept in memory.
+
+A week of 15m candles replays in seconds. `--compare` lists where the live
+loop's alerts differ from the vectorized backtest on the same candles.
+
+The root bot and the PDL bot share module names (main, config, ...), so each
+run replays one of them.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import numpy as np
+import clock
+from candles import Candles, format_time
+from candle_cache import CandleCache
+from dedupe import SignalDedupe
+from delta_api import resolution_seconds
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+PDL_DIR = os.path.join(ROOT_DIR, "pdl-reentry-bot")
+WARMUP_SECONDS = 3 * 86400  # history served from before the replay starts
+
+
+class ReplayFeed:
+    """
+    Stands in for `fetch_candle_rows` over {(symbol, resolution): Candles}.
+
+    Returns what the endpoint would have at request time: candles up to
+    `end`, with the one still forming at `end` flattened to its open (its
+    later prices haven't happened yet).
+    """
+
+    def __init__(self, series):
+        self.series = series
+
+    def fetch(self, symbol, resolution, start, end, timeout=None):
+        candles = self.series.get((symbol, resolution))
+        if candles is None:
+            return []
+        lo = int(np.searchsorted(candles.time, start, side="left"))
+        hi = int(np.searchsorted(candles.time, end, side="right"))
+        rows = [
+            {"time": int(candles.time[i]), "open": float(candles.open[i]), "high": float(candles.high[i]),
+             "low": float(candles.low[i]), "close": float(candles.close[i]), "volume": float(candles.volume[i])}
+            for i in range(lo, hi)
+        ]
+        if rows and rows[-1]["time"] + resolution_seconds(resolution) > end:
+            o = rows[-1]["open"]
+            rows[-1].update(high=o, low=o, close=o, volume=0.0)
+        return rows
+
+
+def run_loop(run, start, end, verbose):
+    """Runs `run()` on a VirtualClock from `start` until it sleeps past `end`."""
+    previous = clock.install(clock.VirtualClock(start, end))
+    try:
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+            run()
+    except clock.ReplayFinished:
+        pass
+    finally:
+        clock.install(previous)
+
+
+def recorder(alerts):
+    def send_alert(msg, group=None):
+        alerts.append({"at": clock.time(), "message": msg, "group": group})
+    return send_alert
+
+
+def replay_ema(series, symbols, start, end, verbose=False):
+    """Runs the root bot's `run_bot` (poll mode) over `series`. Returns the alerts."""
+    import main
+
+    main.SYMBOLS = list(symbols)
+    main.LIVE_MODE = "poll"
+    main.universe = None
+    main.candle_cache = CandleCache(fetch=ReplayFeed(series).fetch)
+    main.sent_signals = SignalDedupe(ttl=main.DEDUPE_TTL, max_entries=main.DEDUPE_MAX)
+    main.series.clear()
+    main.live_state.clear()
+    main.scheduler = main.CandleScheduler(main.TIMEFRAMES, buffer=0)
+    alerts = []
+    main.send_alert = recorder(alerts)
+    run_loop(main.run_bot, start, end, verbose)
+    return alerts
+
+
+def replay_pdl(series, symbols, start, end, verbose=False):
+    """Runs the PDL bot's loop (`run_multi` for several symbols) over `series`. Returns the alerts."""
+    if PDL_DIR not in sys.path:
+        sys.path.insert(0, PDL_DIR)
+    import config
+    import delta_wrapper
+    import main
+
+    config.SYMBOL = symbols[0]
+    config.SYMBOLS = list(symbols)
+    delta_wrapper._cache = CandleCache(fetch=ReplayFeed(series).fetch)
+    main.sent_signals = SignalDedupe()
+    alerts = []
+    main.notifier.send_alert = recorder(alerts)
+    run_loop(main.run_multi if len(symbols) > 1 else main.run_bot, start, end, verbose)
+    return alerts
+
+
+def alert_signals(alerts):
+    """(symbol, candle time, side) of every signal alert; start-up and error messages are skipped."""
+    out = set()
+    for alert in alerts:
+        msg = alert["message"]
+        symbol = re.search(r"Symbol: (\S+)", msg)
+        when = re.search(r"Time: ([\d-]+ [\d:]+)", msg)
+        side = re.search(r"\b(BUY|SELL)\b", msg)
+        if symbol and when and side:
+            out.add((symbol.group(1), when.group(1), side.group(1)))
+    return out
+
+
+def backtest_signals(bot, series, symbols, timeframe, start, end):
+    """Same (symbol, time, side) set from the vectorized backtest of `bot`."""
+    import backtest
+
+    out = set()
+    for symbol in symbols:
+        candles = series[(symbol, timeframe)]
+        if bot == "ema":
+            signals = backtest.backtest_sweep(candles.to_frame())
+        else:
+            signals = backtest.backtest_pdl(candles.to_frame())
+        for t, side in zip(signals["time"], signals["signal"]):
+            epoch = int(np.datetime64(t, "s").astype(np.int64))
+            if start <= epoch + resolution_seconds(timeframe) <= end:
+                out.add((symbol, format_time(epoch), side))
+    return out
+
+
+def load_series(symbols, timeframe, store_dir=None, recording=None):
+    """
+    {(symbol, timeframe): Candles} from a recording (JSON object of symbol ->
+    list of API candle dicts) or the candle store.
+    """
+    series = {}
+    if recording:
+        with open(recording) as f:
+            rows = json.load(f)
+        for symbol in symbols:
+            if symbol in rows:
+                series[(symbol, timeframe)] = Candles.from_rows(rows[symbol])
+    else:
+        from candle_store import CandleStore
+
+        store = CandleStore(store_dir)
+        for symbol in symbols:
+            data = store.read(symbol, timeframe)
+            if len(data["time"]):
+                series[(symbol, timeframe)] = Candles.from_arrays(data)
+    return series
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay stored candles through a bot's live loop")
+    parser.add_argument("bot", choices=["ema", "pdl"], help="root EMA sweep bot or the PDL/PDH re-entry bot")
+    parser.add_argument("symbols", nargs="*", help="symbols to replay (default: the bot's configured symbols)")
+    parser.add_argument("--days", type=float, default=7, help="length of the replay")
+    parser.add_argument("--end", type=int, help="replay end, epoch seconds (default: last stored candle close)")
+    parser.add_argument("--store", default=os.path.join(ROOT_DIR, "data", "candles"), help="candle store directory")
+    parser.add_argument("--recording", help="JSON of symbol -> API candle list, instead of the store")
+    parser.add_argument("--compare", action="store_true", help="diff the alerts against the vectorized backtest")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own output")
+    args = parser.parse_args()
+
+    if args.bot == "pdl":
+        sys.path.insert(0, PDL_DIR)
+    import config
+
+    timeframe = config.TIMEFRAME if args.bot == "ema" else config.TIMEFRAME_15M
+    symbols = args.symbols or config.SYMBOLS
+    series = load_series(symbols, timeframe, args.store, args.recording)
+    symbols = [s for s in symbols if (s, timeframe) in series]
+    if not symbols:
+        sys.exit("No candles to replay")
+
+    # Both ends on candle closes, so the first cycle sees the candle closing at
+    # `start` and the last one the candle closing at `end`
+    sec = resolution_seconds(timeframe)
+    end = (args.end or max(int(c.time[-1]) + sec for c in series.values())) // sec * sec
+    start = int(end - args.days * 86400) // sec * sec
+    # Only the warm-up history and the replay window are served
+    series = {key: c[int(np.searchsorted(c.time, start - WARMUP_SECONDS)):int(np.searchsorted(c.time, end))]
+              for key, c in series.items()}
+
+    replay = replay_ema if args.bot == "ema" else replay_pdl
+    import time
+    started = time.perf_counter()
+    # One PDL poll interval past `end` lets both loops act on its close
+    alerts = replay(series, symbols, start, end + 60, args.verbose)
+    elapsed = time.perf_counter() - started
+
+    print(f"Replayed {args.days:g} days of {', '.join(symbols)} in {elapsed:.1f}s "
+          f"({args.days * 86400 / max(elapsed, 1e-9):,.0f}x real time)")
+    for alert in alerts:
+        print(f"--- {format_time(alert['at'])}\n{alert['message'].strip()}")
+
+    if args.compare:
+        live = alert_signals(alerts)
+        historical = backtest_signals(args.bot, series, symbols, timeframe, start, end)
+        print(f"\n{len(live)} live signals, {len(historical)} backtest signals, {len(live & historical)} in both")
+        for name, diff in (("live only", live - historical), ("backtest only", historical - live)):
+            for row in sorted(diff, key=lambda r: r[1]):
+                print(f"  {name}: {' '.join(row)}")
@@ -0,0 +1,124 @@
+from collections import deque
+from candles import Candles
+from delta_api import resolution_seconds
+
+DAY_SECONDS = 86400
+
+
+class BarAggregator:
+    """
+    Derives higher-timeframe bars (e.g. 15m, 1h, 1d) from closed base bars
+    (e.g. 5m) as they arrive, one O(1) update per base bar per timeframe.
+
+    Bars are (time, open, high, low, close, volume) tuples with `time` the
+    bar open in epoch seconds. Intraday buckets are aligned to the epoch;
+    daily and longer buckets start `day_offset` seconds after 00:00 UTC so
+    they line up with the exchange's daily candle.
+    """
+
+    def __init__(self, base, targets, day_offset=0):
+        self.base_sec = resolution_seconds(base)
+        self.targets = {}
+        for target in targets:
+            sec = resolution_seconds(target)
+            if sec % self.base_sec:
+                raise ValueError(f"{target} is not a multiple of {base}")
+            self.targets[target] = (sec, day_offset if sec >= DAY_SECONDS else 0)
+        self.forming = {target: None for target in self.targets}
+        self.complete = {target: False for target in self.targets}
+
+    def bucket(self, target, t):
+        sec, offset = self.targets[target]
+        return (t - offset) // sec * sec + offset
+
+    def add(self, bar):
+        """
+        Adds one closed base bar. Returns a list of (target, bar, complete)
+        for every higher-timeframe bar it closed. `complete` is False when
+        the bar is missing base bars at its start (history began mid-bucket).
+        """
+        t = int(bar[0])
+        closed = []
+        for target, (sec, _) in self.targets.items():
+            start = self.bucket(target, t)
+            current = self.forming[target]
+
+            if current is not None and current[0] != start:
+                # Base bars for the rest of that bucket never came (gap)
+                closed.append((target, tuple(current), self.complete[target]))
+                current = None
+
+            if current is None:
+                current = [start, bar[1], bar[2], bar[3], bar[4], bar[5]]
+                self.complete[target] = t == start
+            else:
+                if bar[2] > current[2]:
+                    current[2] = bar[2]
+                if bar[3] < current[3]:
+                    current[3] = bar[3]
+                current[4] = bar[4]
+                current[5] += bar[5]
+
+            if t + self.base_sec >= start + sec:
+                closed.append((target, tuple(current), self.complete[target]))
+                current = None
+            self.forming[target] = current
+        return closed
+
+
+class MultiTimeframeSeries:
+    """
+    One symbol's base-resolution feed plus the last `limit` bars of every
+    derived timeframe. The base timeframe itself may be listed in `targets`.
+    """
+
+    def __init__(self, base, targets, limit=100, day_offset=0):
+        self.base = base
+        self.aggregator = BarAggregator(base, targets, day_offset)
+        self.bars = {target: deque(maxlen=limit) for target in targets}
+        self.last_time = None
+
+    def feed(self, rows, now):
+        """
+        Feeds base bars (tuples, sorted by time); bars still forming at `now`
+        and bars already fed are skipped.
+
+        Returns:
+            Set of timeframes that got a new closed bar.
+        """
+        updated = set()
+        for row in rows:
+            t = int(row[0])
+            if t + self.aggregator.base_sec > now:
+                break
+            if self.last_time is not None and t <= self.last_time:
+                continue
+            self.last_time = t
+            for target, bar, complete in self.aggregator.add(row):
+                if complete or self.bars[target]:
+                    self.bars[target].append(bar)
+                    updated.add(target)
+        return updated
+
+    def candles(self, timeframe):
+        return Candles.from_tuples(list(self.bars[timeframe]))
+
+
+def resample_frame(df, target, day_offset=0):
+    """
+    Batch equivalent for history: aggregates a candle DataFrame (time column
+    as datetimes) into `target` bars with the same bucket alignment.
+    """
+    import pandas as pd
+
+    sec = resolution_seconds(target)
+    offset = pd.Timedelta(seconds=day_offset if sec >= DAY_SECONDS else 0)
+    buckets = (df["time"] - offset).dt.floor(f"{sec}s") + offset
+    out = df.groupby(buckets).agg(
+        open=("open", "first"),
+        high=("high", "max"),
+        low=("low", "min"),
+        close=("close", "last"),
+        volume=("volume", "sum"),
+    )
+    return out.rename_axis("time").reset_index()
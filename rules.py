@@ -0,0 +1,350 @@
+"""
+Declarative strategy conditions, compiled to array kernels.
+
+A strategy is a `Rule`: named signals, each a condition built from candle
+fields, indicators and shifted candles with ordinary operators:
+
+    c2, c1 = Bar(0), Bar(1)          # latest candle and the one before
+    e = ema(close, 5)
+    buy = (c1.close < e.shift(1)) & (c2.close > e) & (abs(c2.close - c2.open) > 0)
+    CROSS = Rule("cross", {"BUY": buy})
+
+`compile_rules` turns any number of rules into one `Kernel`. Sub-expressions
+shared by several conditions or rules (the EMA, C1's range, ...) are
+computed once, and every node is one NumPy operation over a whole array of
+candles, or a (symbols x candles) array for many symbols at once:
+
+- `Kernel.run(data)` evaluates every candle, for history scans;
+- `Kernel.latest(data)` evaluates only the trailing candles the conditions
+  need for the last one to come out as in `run`, for the live check.
+
+Before the first candle, or in the left padding of `stack`ed symbols with
+shorter histories, values are NaN. Comparisons with NaN are false, so a
+signal never fires without the candles its condition refers to.
+"""
+import math
+import numpy as np
+import swings
+
+FIELDS = ("open", "high", "low", "close", "volume")
+# Longest series whose EMA is computed with the NumPy loop; longer ones use
+# pandas' ewm kernel, which has the same operation order
+EMA_LOOP_MAX = 512
+
+
+class Expr:
+    """A node of a condition. Built with the helpers below and operators, not directly."""
+    __slots__ = ("op", "args", "param", "key")
+
+    def __init__(self, op, args=(), param=None):
+        self.op = op
+        self.args = tuple(args)
+        self.param = param
+        # Structural identity: equal sub-expressions are computed once
+        self.key = (op, tuple(a.key for a in self.args), param)
+
+    def shift(self, n=1):
+        """The value `n` candles earlier."""
+        if n == 0:
+            return self
+        return Expr("shift", (self,), int(n))
+
+    def __add__(self, other): return Expr("add", (self, lift(other)))
+    def __radd__(self, other): return Expr("add", (lift(other), self))
+    def __sub__(self, other): return Expr("sub", (self, lift(other)))
+    def __rsub__(self, other): return Expr("sub", (lift(other), self))
+    def __mul__(self, other): return Expr("mul", (self, lift(other)))
+    def __rmul__(self, other): return Expr("mul", (lift(other), self))
+    def __truediv__(self, other): return Expr("div", (self, lift(other)))
+    def __rtruediv__(self, other): return Expr("div", (lift(other), self))
+    def __neg__(self): return Expr("neg", (self,))
+    def __abs__(self): return Expr("abs", (self,))
+    def __lt__(self, other): return Expr("lt", (self, lift(other)))
+    def __le__(self, other): return Expr("le", (self, lift(other)))
+    def __gt__(self, other): return Expr("gt", (self, lift(other)))
+    def __ge__(self, other): return Expr("ge", (self, lift(other)))
+    def __and__(self, other): return Expr("and", (self, lift(other)))
+    def __rand__(self, other): return Expr("and", (lift(other), self))
+    def __or__(self, other): return Expr("or", (self, lift(other)))
+    def __ror__(self, other): return Expr("or", (lift(other), self))
+    def __invert__(self): return Expr("not", (self,))
+
+    def __bool__(self):
+        raise TypeError("Conditions are combined with & | ~, not and/or/not or chained comparisons")
+
+    def __repr__(self):
+        if self.op == "field":
+            return self.param
+        if self.op == "const":
+            return repr(self.param)
+        inner = ", ".join([repr(a) for a in self.args] + ([repr(self.param)] if self.param is not None else []))
+        return f"{self.op}({inner})"
+
+
+def lift(value):
+    return value if isinstance(value, Expr) else Expr("const", param=float(value))
+
+
+def field(name):
+    """A column of the input data, e.g. "close" or a precomputed "ema"."""
+    return Expr("field", param=name)
+
+
+open_, high, low, close, volume = (field(name) for name in FIELDS)
+
+
+class Bar:
+    """The candle `offset` candles before the latest: `Bar(1).low` is the previous low."""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+
+    def __getattr__(self, name):
+        if name not in FIELDS:
+            raise AttributeError(name)
+        return field(name).shift(self.offset)
+
+
+def ema(x, period):
+    """EMA like `indicators.ema` (pandas `ewm(span=period, adjust=False)`)."""
+    return Expr("ema", (lift(x),), int(period))
+
+
+def lowest(x, n):
+    """Minimum of the last `n` values, NaN ignored (fewer values near the start)."""
+    return x if n == 1 else Expr("lowest", (lift(x),), int(n))
+
+
+def highest(x, n):
+    """Maximum of the last `n` values, NaN ignored."""
+    return x if n == 1 else Expr("highest", (lift(x),), int(n))
+
+
+def pivot_high(x=None, k=2):
+    """Level of the last confirmed fractal pivot high of `x` (default: high), see `swings.last_pivot`."""
+    return Expr("pivot_high", (high if x is None else lift(x),), int(k))
+
+
+def pivot_low(x=None, k=2):
+    """Level of the last confirmed fractal pivot low of `x` (default: low)."""
+    return Expr("pivot_low", (low if x is None else lift(x),), int(k))
+
+
+def minimum(a, b):
+    return Expr("min", (lift(a), lift(b)))
+
+
+def maximum(a, b):
+    return Expr("max", (lift(a), lift(b)))
+
+
+class Rule:
+    """
+    A strategy: {label: condition}, checked in order, so when several
+    conditions hold on one candle the first label wins. `values` are
+    extra expressions to report with the result (e.g. the EMA).
+    """
+
+    def __init__(self, name, signals, values=None):
+        self.name = name
+        self.signals = dict(signals)
+        self.values = dict(values or {})
+
+
+def _shifted(x, n):
+    out = np.full(x.shape, np.nan)
+    if n < x.shape[-1]:
+        out[..., n:] = x[..., :x.shape[-1] - n]
+    return out
+
+
+def _ema(x, period):
+    alpha = 2.0 / (period + 1)
+    old_wt = 1.0 - alpha
+    if x.shape[-1] > EMA_LOOP_MAX:
+        import pandas as pd
+
+        frame = pd.DataFrame(np.atleast_2d(x).T)
+        return frame.ewm(span=period, adjust=False).mean().to_numpy().T.reshape(x.shape)
+    if x.ndim == 1:
+        # One symbol (the live check): plain floats beat per-step array ops
+        valid = np.flatnonzero(~np.isnan(x))
+        if not len(valid):
+            return np.full(x.shape, np.nan)
+        values = x.tolist()
+        out = values[:valid[0] + 1]
+        value = out[-1]
+        for cur in values[valid[0] + 1:]:
+            value = (old_wt * value + alpha * cur) / (old_wt + alpha)
+            out.append(value)
+        return np.array(out)
+    out = np.empty(x.shape)
+    value = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        cur = x[..., t]
+        # Same operation order as EMAState and pandas' kernel; NaN until the
+        # first value, which seeds the average
+        value = np.where(np.isnan(value), cur, (old_wt * value + alpha * cur) / (old_wt + alpha))
+        out[..., t] = value
+    return out
+
+
+def ema_warmup(period):
+    """Candles after which the seed's weight in the EMA is below float precision."""
+    return math.ceil(math.log(np.finfo(float).eps) / math.log(1 - 2.0 / (period + 1)))
+
+
+_BINARY = {
+    "add": np.add, "sub": np.subtract, "mul": np.multiply, "div": np.divide,
+    "lt": np.less, "le": np.less_equal, "gt": np.greater, "ge": np.greater_equal,
+    "and": np.logical_and, "or": np.logical_or, "min": np.minimum, "max": np.maximum,
+}
+_UNARY = {"neg": np.negative, "abs": np.abs, "not": np.logical_not}
+
+
+class Result:
+    """Output of a `Kernel` run: per-candle signals and values of every rule."""
+
+    def __init__(self, kernel, env):
+        self.kernel = kernel
+        self.env = env
+
+    def mask(self, rule, label):
+        """Boolean array: `label` of `rule` fired (and no earlier label of it did)."""
+        masks = self.masks(rule)
+        return masks[label]
+
+    def masks(self, rule):
+        out = {}
+        taken = None
+        for label, expr in self.kernel.rules[rule].signals.items():
+            hit = self.env[self.kernel.index[expr.key]].astype(bool)
+            if taken is not None:
+                hit = hit & ~taken
+            taken = hit if taken is None else taken | hit
+            out[label] = hit
+        return out
+
+    def signal(self, rule):
+        """Object array of the label that fired at each candle, or None."""
+        out = None
+        for label, hit in self.masks(rule).items():
+            if out is None:
+                out = np.full(hit.shape, None, dtype=object)
+            out[hit] = label
+        return out
+
+    def value(self, rule, name):
+        return self.env[self.kernel.index[self.kernel.rules[rule].values[name].key]]
+
+
+class Kernel:
+    """Compiled rules: their expression nodes, deduplicated, in evaluation order."""
+
+    def __init__(self, rules):
+        self.rules = {rule.name: rule for rule in rules}
+        self.nodes = []
+        self.index = {}  # node key -> position in self.nodes
+        self.history = 1
+        for rule in self.rules.values():
+            for expr in list(rule.signals.values()) + list(rule.values.values()):
+                self._add(expr)
+                self.history = max(self.history, self._history(expr))
+        self._arg_index = [tuple(self.index[a.key] for a in node.args) for node in self.nodes]
+
+    def _add(self, expr):
+        if expr.key in self.index:
+            return
+        for arg in expr.args:
+            self._add(arg)
+        self.index[expr.key] = len(self.nodes)
+        self.nodes.append(expr)
+
+    def _history(self, expr, memo=None):
+        # Candles needed for the last value of `expr` to be exact
+        memo = {} if memo is None else memo
+        if expr.key not in memo:
+            below = max((self._history(a, memo) for a in expr.args), default=1)
+            if expr.op == "shift":
+                below += expr.param
+            elif expr.op in ("lowest", "highest"):
+                below += expr.param - 1
+            elif expr.op == "ema":
+                below += ema_warmup(expr.param)
+            elif expr.op in ("pivot_high", "pivot_low"):
+                # The last pivot may be anywhere in the window
+                below = math.inf
+            memo[expr.key] = below
+        return memo[expr.key]
+
+    def fields(self):
+        return sorted({node.param for node in self.nodes if node.op == "field"})
+
+    def run(self, data):
+        """
+        Evaluates every candle.
+
+        Args:
+            data: mapping (or `Candles`) of field name -> array, 1-d for one
+                symbol or (symbols x candles), see `stack`
+
+        Returns:
+            Result
+        """
+        env = []
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for node, args in zip(self.nodes, self._arg_index):
+                op = node.op
+                if op == "field":
+                    value = np.asarray(data[node.param], dtype=np.float64)
+                elif op == "const":
+                    value = node.param
+                elif op == "shift":
+                    value = _shifted(env[args[0]], node.param)
+                elif op == "ema":
+                    value = _ema(env[args[0]], node.param)
+                elif op == "lowest":
+                    value = swings.rolling_min(env[args[0]], node.param)
+                elif op == "highest":
+                    value = swings.rolling_max(env[args[0]], node.param)
+                elif op in ("pivot_high", "pivot_low"):
+                    value = swings.last_pivot(env[args[0]], node.param, high=op == "pivot_high")
+                elif op in _UNARY:
+                    value = _UNARY[op](env[args[0]])
+                else:
+                    value = _BINARY[op](env[args[0]], env[args[1]])
+                env.append(value)
+        return Result(self, env)
+
+    def latest(self, data):
+        """
+        Like `run`, on only the last `history` candles (all of them for
+        rules using pivots); read the results at `[..., -1]` (or a few
+        candles back, within what the rules shift by).
+        """
+        if math.isinf(self.history):
+            return self.run(data)
+        return self.run({name: np.asarray(data[name])[..., -self.history:] for name in self.fields()})
+
+
+def compile_rules(rules):
+    return Kernel(rules)
+
+
+def stack(series, fields=FIELDS, length=None):
+    """
+    Right-aligns the series of several symbols (mappings or `Candles`) into
+    {field: (symbols x length)} arrays, NaN-padded on the left, so one
+    kernel pass evaluates all of them with their latest candles in the last
+    column. `length` defaults to the longest series.
+    """
+    length = length or max((len(s[fields[0]]) for s in series), default=0)
+    out = {}
+    for name in fields:
+        arr = np.full((len(series), length), np.nan)
+        for i, s in enumerate(series):
+            values = np.asarray(s[name], dtype=np.float64)[-length:]
+            if len(values):
+                arr[i, length - len(values):] = values
+        out[name] = arr
+    return out
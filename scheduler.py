@@ -0,0 +1,87 @@
+import threading
+from datetime import datetime
+import clock
+from delta_api import resolution_seconds
+
+
+def next_close(resolution, now):
+    """Epoch time of the next candle close for `resolution` strictly after `now`."""
+    sec = resolution_seconds(resolution)
+    return (int(now) // sec + 1) * sec
+
+
+class CandleScheduler:
+    """
+    Wakes up just after candle closes for several timeframes at once.
+
+    Every target instant is computed from the epoch grid (close + buffer), not
+    from when the previous run finished, so slow cycles never push later runs
+    back. Timeframes that close on the same instant (e.g. 5m, 15m and 1h at
+    the top of the hour) are coalesced into a single dispatch.
+    """
+
+    def __init__(self, timeframes, buffer=5, clock=clock.time):
+        self.timeframes = list(timeframes)
+        self.buffer = buffer
+        self.clock = clock
+        self._stop = threading.Event()
+
+    def next_run(self, after):
+        """
+        Returns (close_time, timeframes) for the first close whose run instant
+        (close_time + buffer) is after `after`.
+        """
+        base = after - self.buffer
+        closes = {tf: next_close(tf, base) for tf in self.timeframes}
+        close_time = min(closes.values())
+        due = [tf for tf in self.timeframes if closes[tf] == close_time]
+        return close_time, due
+
+    def last_run(self, now, since):
+        """
+        Catch-up run after an overrun: returns (close_time, timeframes) with
+        every timeframe that had a close in (`since`, `now` - buffer], and
+        the latest of those closes. A 1h close missed before a later 5m one
+        is still due; each timeframe evaluates its own latest close.
+        """
+        base = now - self.buffer
+        closes = {tf: int(base) // resolution_seconds(tf) * resolution_seconds(tf) for tf in self.timeframes}
+        due = [tf for tf in self.timeframes if closes[tf] > since]
+        return max(closes[tf] for tf in due), due
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_until(self, at):
+        """Sleeps until the absolute time `at`. Returns False if stopped."""
+        while not self._stop.is_set():
+            remaining = at - self.clock()
+            if remaining <= 0:
+                return True
+            # Re-check the clock periodically in case the host clock jumps
+            clock.wait(self._stop, min(remaining, 60))
+        return False
+
+    def run(self, callback):
+        """
+        Calls `callback(timeframes, close_time)` after every candle close
+        until `stop()` is called.
+        """
+        close_time, due = self.next_run(self.clock())
+        while True:
+            run_at = close_time + self.buffer
+            print(f"Next run at {datetime.fromtimestamp(run_at)} for {', '.join(due)}")
+            if not self.wait_until(run_at):
+                return
+
+            callback(due, close_time)
+
+            last_close = close_time
+            close_time, due = self.next_run(run_at)
+            now = self.clock()
+            if close_time + self.buffer < now:
+                # The callback overran one or more closes: run once for every
+                # timeframe that closed meanwhile instead of replaying each
+                # missed run.
+                print(f"Run for {datetime.fromtimestamp(close_time)} overran, catching up")
+                close_time, due = self.last_run(now, since=last_close)
@@ -1,3 +1,7 @@
+from config import EMA_PERIOD, SWEEP_LOOKBACK, SWEEP_PIVOT
+from rules import Bar, Rule, ema, close, high, low, lowest, highest, pivot_low, pivot_high, minimum, maximum
+
+
 def check_liquidity_sweep_signal(c1, c2, ema_c1, ema_c2, recent_lows, recent_highs):
     """
     Checks for EMA 5 Liquidity Sweep Confirmation Strategy.
@@ -7,8 +11,8 @@ def check_liquidity_sweep_signal(c1, c2, ema_c1, ema_c2, recent_lows, recent_hig
         c2: Confirmation candle (EMA Acceptance)
         ema_c1: EMA 5 value corresponding to C1
         ema_c2: EMA 5 value corresponding to C2
-        recent_lows: List of lows of previous N candles (excluding C1, C2)
-        recent_highs: List of highs of previous N candles (excluding C1, C2)
+        recent_lows: Lows of previous N candles (excluding C1, C2), list or array
+        recent_highs: Highs of previous N candles (excluding C1, C2)
 
     Returns:
         "BUY", "SELL" or None
@@ -24,7 +28,7 @@ def check_liquidity_sweep_signal(c1, c2, ema_c1, ema_c2, recent_lows, recent_hig
     if c1["close"] < ema_c1:
         # ✅ Condition 2: Previous Low is Swept
         # Price breaks previous swing low slightly. Purpose: Hit seller stop-losses.
-        prev_candle_low = recent_lows[-1] if recent_lows else float('inf')
+        prev_candle_low = recent_lows[-1] if len(recent_lows) else float('inf')
         
         if c1["low"] < prev_candle_low:
              # ✅ Condition 3: Strong Rejection Wick
@@ -46,7 +50,7 @@ def check_liquidity_sweep_signal(c1, c2, ema_c1, ema_c2, recent_lows, recent_hig
     if c1["close"] > ema_c1:
         # ✅ Condition 2: Previous High is Swept
         # Price breaks previous swing high slightly. Purpose: Hit buyer stop-losses.
-        prev_candle_high = recent_highs[-1] if recent_highs else float('-inf')
+        prev_candle_high = recent_highs[-1] if len(recent_highs) else float('-inf')
         
         if c1["high"] > prev_candle_high:
             # ✅ Condition 3: Strong Rejection Wick
@@ -86,3 +90,64 @@ def check_ema_detach(candle, ema_val):
         return "BULLISH_DETACH"
         
     return None
+
+
+# --- The same strategies as declarative rules (see rules.py) ---
+# Position 0 is C2, the latest closed candle. These are what the live loop
+# and the backtests evaluate; the functions above are the readable
+# reference they are checked against.
+
+def liquidity_sweep_rule(ema_line=None, wick_ratio=0.3, body_ratio=0.30, lookback=SWEEP_LOOKBACK,
+                         pivot=SWEEP_PIVOT, ema_period=EMA_PERIOD, levels=None):
+    """
+    `check_liquidity_sweep_signal` as a `Rule` named "sweep".
+
+    Args:
+        ema_line: EMA expression, e.g. `field("ema")` for a precomputed
+            column (default: EMA of close over `ema_period`)
+        lookback: C1 must sweep the lowest low / highest high of this many
+            candles before it; the function above uses the last one only
+        pivot: if > 0, C1 must sweep the last fractal swing low / high
+            (this many candles each side) confirmed before it instead
+        levels: (swing low, swing high) expressions as of each candle, e.g.
+            `field("swing_low")` columns kept by `live_state.SeriesState`;
+            replace `lookback` and `pivot`
+    """
+    e = ema(close, ema_period) if ema_line is None else ema_line
+    c2, c1 = Bar(0), Bar(1)
+    e2, e1 = e, e.shift(1)
+    body_c2 = abs(c2.close - c2.open)
+    c1_range = c1.high - c1.low
+    # Levels as known when the candle before C1 closed
+    if levels is not None:
+        swing_low, swing_high = levels[0].shift(2), levels[1].shift(2)
+    elif pivot:
+        swing_low, swing_high = pivot_low(k=pivot).shift(2), pivot_high(k=pivot).shift(2)
+    else:
+        swing_low, swing_high = lowest(low, lookback).shift(2), highest(high, lookback).shift(2)
+
+    buy = (
+        (body_c2 > 0)
+        & (c1.close < e1)
+        & (c1.low < swing_low)
+        & (c1_range > 0) & ((minimum(c1.open, c1.close) - c1.low) / c1_range >= wick_ratio)
+        & (c2.close > e2) & ((c2.close - maximum(c2.open, e2)) / body_c2 >= body_ratio)
+    )
+    sell = (
+        (body_c2 > 0)
+        & (c1.close > e1)
+        & (c1.high > swing_high)
+        & (c1_range > 0) & ((c1.high - maximum(c1.open, c1.close)) / c1_range >= wick_ratio)
+        & (c2.close < e2) & ((minimum(c2.open, e2) - c2.close) / body_c2 >= body_ratio)
+    )
+    return Rule("sweep", {"BUY": buy, "SELL": sell}, values={"ema": e})
+
+
+def ema_detach_rule(ema_line=None, ema_period=EMA_PERIOD):
+    """`check_ema_detach` on the latest candle as a `Rule` named "ema_detach"."""
+    e = ema(close, ema_period) if ema_line is None else ema_line
+    return Rule("ema_detach", {"BEARISH_DETACH": high < e, "BULLISH_DETACH": low > e}, values={"ema": e})
+
+
+LIQUIDITY_SWEEP = liquidity_sweep_rule()
+EMA_DETACH = ema_detach_rule()
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import clock
+from delta_api import resolution_seconds
+from scheduler import next_close
+
+
+class BarBuilder:
+    """
+    Builds OHLCV bars for one symbol and resolution from individual trades.
+
+    A bar is closed by the first trade of a later period, or by `flush` once
+    the clock has passed the end of its period. Bars that started before
+    `start_after` (e.g. the period in progress when the feed connected) are
+    missing trades and are reported as partial.
+    """
+    __slots__ = ("sec", "bar", "last_closed", "start_after")
+
+    def __init__(self, resolution, start_after=0):
+        self.sec = resolution_seconds(resolution)
+        self.bar = None
+        self.last_closed = None
+        self.start_after = start_after
+
+    def add_trade(self, price, size, ts):
+        """Adds one trade. Returns the bar it closed, or None."""
+        bucket = int(ts) // self.sec * self.sec
+        if self.last_closed is not None and bucket <= self.last_closed:
+            return None  # late trade for a bar already emitted
+
+        closed = None
+        if self.bar is not None and bucket > self.bar["time"]:
+            closed = self._close()
+
+        if self.bar is None:
+            self.bar = {"time": bucket, "open": price, "high": price, "low": price, "close": price, "volume": size}
+        else:
+            bar = self.bar
+            if price > bar["high"]:
+                bar["high"] = price
+            if price < bar["low"]:
+                bar["low"] = price
+            bar["close"] = price
+            bar["volume"] += size
+        return closed
+
+    def flush(self, now):
+        """Closes the current bar if its period ended by `now`. Returns it or None."""
+        if self.bar is not None and self.bar["time"] + self.sec <= now:
+            return self._close()
+        return None
+
+    def is_partial(self, bar):
+        return bar["time"] < self.start_after
+
+    def _close(self):
+        bar, self.bar = self.bar, None
+        self.last_closed = bar["time"]
+        return bar
+
+
+class StreamRunner:
+    """
+    Consumes the exchange's public trade feed, builds bars in-process and
+    calls `on_bar(symbol, resolution, bar)` as soon as each bar closes.
+
+    Whenever the stream can't provide a complete bar (the first, partial bar
+    after connecting, or every close while disconnected) it calls
+    `on_gap(symbol, resolution)` `poll_buffer` seconds after the close, so the
+    caller can fall back to the REST candles. Callbacks run one at a time on a
+    worker thread so slow handlers never stall the feed.
+
+    `symbols` may be a callable returning the current list (e.g.
+    `Universe.symbols`); it is re-read every `symbols_interval` seconds and
+    the subscription follows it. Time comes from the `clock` module, so a
+    replay on a `VirtualClock` drives the stream's closes too.
+    """
+
+    def __init__(self, url, symbols, resolutions, on_bar, on_gap, close_grace=1, poll_buffer=5,
+                 symbols_interval=60):
+        self.url = url
+        self._symbols = symbols if callable(symbols) else (lambda: symbols)
+        self.symbols = list(self._symbols())
+        self.resolutions = list(resolutions)
+        self.on_bar = on_bar
+        self.on_gap = on_gap
+        self.close_grace = close_grace
+        self.poll_buffer = poll_buffer
+        self.symbols_interval = symbols_interval
+        self.builders = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._fallback = None
+        self._timers = set()
+
+    def run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        import websockets
+
+        delay = 1
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    self.symbols = list(self._symbols())
+                    await ws.send(subscription("subscribe", self.symbols))
+                    print(f"Stream connected to {self.url}")
+                    self._stop_fallback()
+                    self._reset_builders(clock.time())
+                    delay = 1
+                    await self._consume(ws)
+            except Exception as e:
+                print(f"Stream error: {e}")
+
+            # Keep signals flowing from REST until the feed is back
+            self._start_fallback()
+            print(f"Reconnecting in {delay}s...")
+            await _sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def refresh_symbols(self, now):
+        """
+        Re-reads the symbol list. New symbols get builders whose first bar
+        counts as partial; dropped ones lose theirs.
+
+        Returns:
+            (added, removed) symbol lists
+        """
+        symbols = list(self._symbols())
+        added = [symbol for symbol in symbols if symbol not in self.symbols]
+        removed = [symbol for symbol in self.symbols if symbol not in symbols]
+        for symbol in added:
+            for resolution in self.resolutions:
+                self.builders[(symbol, resolution)] = BarBuilder(resolution, start_after=now)
+        for symbol in removed:
+            for resolution in self.resolutions:
+                self.builders.pop((symbol, resolution), None)
+        self.symbols = symbols
+        return added, removed
+
+    async def _watch_symbols(self, ws):
+        while True:
+            await _sleep(self.symbols_interval)
+            added, removed = self.refresh_symbols(clock.time())
+            if removed:
+                await ws.send(subscription("unsubscribe", removed))
+            if added:
+                await ws.send(subscription("subscribe", added))
+            if added or removed:
+                print(f"Stream symbols: +{len(added)} -{len(removed)}, {len(self.symbols)} subscribed")
+
+    def _reset_builders(self, now):
+        self.builders = {
+            (symbol, resolution): BarBuilder(resolution, start_after=now)
+            for symbol in self.symbols
+            for resolution in self.resolutions
+        }
+
+    async def _consume(self, ws):
+        tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._watch_symbols(ws))]
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("type") != "all_trades":
+                    continue
+                # Trade timestamps are in microseconds
+                self.add_trade(msg["symbol"], float(msg["price"]), float(msg["size"]), msg["timestamp"] / 1e6)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def add_trade(self, symbol, price, size, ts):
+        for resolution in self.resolutions:
+            builder = self.builders.get((symbol, resolution))
+            if builder is None:
+                continue
+            bar = builder.add_trade(price, size, ts)
+            if bar is not None:
+                self._emit(symbol, resolution, builder, bar)
+
+    async def _flush_loop(self):
+        # Closes bars for symbols that go quiet right after a period ends
+        while True:
+            await _sleep(0.25)
+            now = clock.time() - self.close_grace
+            for (symbol, resolution), builder in self.builders.items():
+                bar = builder.flush(now)
+                if bar is not None:
+                    self._emit(symbol, resolution, builder, bar)
+
+    def _emit(self, symbol, resolution, builder, bar):
+        if builder.is_partial(bar):
+            close = bar["time"] + builder.sec
+            timer = asyncio.create_task(self._gap_after(close + self.poll_buffer, symbol, resolution))
+            self._timers.add(timer)
+            timer.add_done_callback(self._timers.discard)
+        else:
+            self._dispatch(self.on_bar, symbol, resolution, bar)
+
+    async def _gap_after(self, at, symbol, resolution):
+        await _sleep(max(0, at - clock.time()))
+        self._dispatch(self.on_gap, symbol, resolution)
+
+    def _dispatch(self, fn, *args):
+        def call():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error in stream handler for {args[0]}: {e}")
+        self._executor.submit(call)
+
+    def _start_fallback(self):
+        if self._fallback is None:
+            self._fallback = asyncio.create_task(self._poll_loop())
+
+    def _stop_fallback(self):
+        if self._fallback is not None:
+            self._fallback.cancel()
+            self._fallback = None
+
+    async def _poll_loop(self):
+        print("Stream down, falling back to REST polling")
+        while True:
+            now = clock.time()
+            closes = {res: next_close(res, now - self.poll_buffer) for res in self.resolutions}
+            close = min(closes.values())
+            await _sleep(max(0, close + self.poll_buffer - clock.time()))
+            self.symbols = list(self._symbols())
+            for resolution, res_close in closes.items():
+                if res_close == close:
+                    for symbol in self.symbols:
+                        self._dispatch(self.on_gap, symbol, resolution)
+
+
+def subscription(kind, symbols):
+    """A (un)subscribe message for the `all_trades` channel of `symbols`."""
+    return json.dumps({"type": kind, "payload": {"channels": [{"name": "all_trades", "symbols": symbols}]}})
+
+
+async def _sleep(seconds):
+    # `clock.sleep` off the event loop: real time keeps the feed flowing, a
+    # VirtualClock returns at once
+    await asyncio.get_running_loop().run_in_executor(None, clock.sleep, seconds)
+
+
+async def serve_fake_feed(host="localhost", port=8765, trades_per_second=20):
+    """
+    Local stand-in for the exchange feed: answers `all_trades` subscriptions
+    with a random-walk trade stream stamped with the current time.
+    """
+    import websockets
+
+    async def handler(ws):
+        msg = json.loads(await ws.recv())
+        symbols = msg["payload"]["channels"][0]["symbols"]
+        prices = {symbol: 100.0 for symbol in symbols}
+        while True:
+            symbol = random.choice(symbols)
+            prices[symbol] *= 1 + random.gauss(0, 0.001)
+            await ws.send(json.dumps({
+                "type": "all_trades",
+                "symbol": symbol,
+                "price": f"{prices[symbol]:.2f}",
+                "size": random.randint(1, 100),
+                "timestamp": int(time.time() * 1e6),
+            }))
+            await asyncio.sleep(random.expovariate(trades_per_second))
+
+    async with websockets.serve(handler, host, port):
+        print(f"Fake trade feed on ws://{host}:{port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    # python stream.py [port]  -> run the offline stand-in feed
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    asyncio.run(serve_fake_feed(port=port))
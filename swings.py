@@ -0,0 +1,194 @@
+"""
+Swing levels over candle arrays: rolling N-candle extremes and fractal pivots.
+
+Everything works along the last axis, so one call covers a single series or
+a (symbols x candles) stack, and costs O(1) per candle whatever the window:
+
+- `rolling_min`/`rolling_max` use the van Herk/Gil-Werman block method: the
+  series is cut into blocks of the window length, and each window is the
+  min of one block suffix and the next block's prefix, both from a single
+  cumulative pass.
+- `is_pivot` marks fractal highs/lows (higher/lower than the `k` candles on
+  each side); `last_pivot` carries the last one forward from the candle
+  that confirms it, `k` candles later, so no level is known before it is.
+
+NaN (missing history) is skipped inside windows; a window of only NaN is NaN.
+
+`RollingExtreme` and `PivotState` are the streaming counterparts for the
+live check: per-series state advanced one closed candle at a time with
+monotonic deques, amortized O(1) per candle.
+"""
+import math
+from collections import deque
+import numpy as np
+from indicators import IncrementalIndicator
+
+
+def rolling_min(x, n):
+    """Minimum of each value and the `n - 1` before it."""
+    x = np.asarray(x, dtype=np.float64)
+    if n <= 1:
+        return x.copy()
+    length = x.shape[-1]
+    total = -(-(length + n - 1) // n) * n
+    padded = np.full(x.shape[:-1] + (total,), np.nan)
+    padded[..., n - 1:n - 1 + length] = x
+    blocks = padded.reshape(x.shape[:-1] + (total // n, n))
+    prefix = np.fmin.accumulate(blocks, axis=-1).reshape(padded.shape)
+    suffix = np.fmin.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    # The window ending at i starts at padded position i: its part in the
+    # first block is a suffix, its part in the next block a prefix
+    return np.fmin(suffix[..., :length], prefix[..., n - 1:n - 1 + length])
+
+
+def rolling_max(x, n):
+    """Maximum of each value and the `n - 1` before it."""
+    return -rolling_min(-np.asarray(x, dtype=np.float64), n)
+
+
+def _shift(x, n):
+    # Positive n looks back, negative n looks ahead; NaN where out of range
+    out = np.full(x.shape, np.nan)
+    length = x.shape[-1]
+    if 0 <= n < length:
+        out[..., n:] = x[..., :length - n]
+    elif -length < n < 0:
+        out[..., :n] = x[..., -n:]
+    return out
+
+
+def is_pivot(x, k=2, high=True):
+    """
+    Fractal pivots of one series: a high above the `k` highs before it and
+    not below the `k` after it (`high=False`: a low, mirrored). Needs all
+    `k` candles on each side, so the first and last `k` candles (and those
+    right after left NaN padding) are never pivots.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if not high:
+        return is_pivot(-x, k)
+    window = rolling_max(x, k)
+    with np.errstate(invalid="ignore"):
+        return (x > _shift(window, 1)) & (x >= _shift(window, -k)) & ~np.isnan(_shift(x, k))
+
+
+def last_pivot(x, k=2, high=True):
+    """
+    The last confirmed pivot as known at each candle: a pivot at candle j
+    is confirmed by the close of candle j + k. NaN before the first one.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    confirmed = np.zeros(x.shape, dtype=bool)
+    confirmed[..., k:] = is_pivot(x, k, high)[..., :max(x.shape[-1] - k, 0)]
+    # The level of the last confirmed pivot, carried forward
+    positions = np.where(confirmed, np.arange(x.shape[-1]), -1)
+    last = np.maximum.accumulate(positions, axis=-1)
+    levels = np.take_along_axis(_shift(x, k), np.maximum(last, 0), axis=-1)
+    return np.where(last >= 0, levels, np.nan)
+
+
+
+class RollingExtreme(IncrementalIndicator):
+    """
+    Streaming `rolling_min` (`high=True`: `rolling_max`) of candle values
+    without NaN. A deque holds the candidates for the window's extreme, each
+    better than every later one; each value is pushed and popped at most once.
+    """
+    __slots__ = ("n", "sign", "_deque", "_count", "_undo")
+
+    def __init__(self, n, high=False):
+        self.n = n
+        # Maxima are tracked as minima of the negated values
+        self.sign = -1.0 if high else 1.0
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._deque = deque()  # (input index, signed value)
+        self._count = 0
+        self._undo = None
+
+    def update(self, x, time=None):
+        x = self.sign * x
+        popped = []
+        while self._deque and self._deque[-1][1] >= x:
+            popped.append(self._deque.pop())
+        self._deque.append((self._count, x))
+        expired = self._deque.popleft() if self._deque[0][0] <= self._count - self.n else None
+        # What `revise` needs to take this input back
+        self._undo = (popped, expired)
+        self._count += 1
+        self.previous = self.value
+        self.value = self.sign * self._deque[0][1]
+        self.last_time = time
+        return self.value
+
+    def revise(self, x):
+        popped, expired = self._undo
+        self._count -= 1
+        if expired is not None:
+            self._deque.appendleft(expired)
+        self._deque.pop()
+        self._deque.extend(reversed(popped))
+        self.value, time = self.previous, self.last_time
+        return self.update(x, time)
+
+
+class PivotState(IncrementalIndicator):
+    """
+    Streaming `last_pivot`: `value` is the level of the last fractal pivot
+    high (`high=False`: low) confirmed by the latest candle, NaN before the
+    first. The pivot candidate `k` candles back is compared with the max of
+    the `k` before it and of the `k` after it, both from one `RollingExtreme`.
+    """
+    __slots__ = ("k", "high", "_window", "_values", "_maxima", "_count", "_undo")
+
+    def __init__(self, k=2, high=True):
+        self.k = k
+        self.high = high
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._window = RollingExtreme(self.k, high=True)
+        self._values = deque(maxlen=self.k + 1)      # signed inputs, candidate first
+        self._maxima = deque(maxlen=self.k + 2)      # window maxima, the one before the candidate first
+        self._count = 0
+        self._undo = None
+
+    def update(self, x, time=None):
+        x = x if self.high else -x
+        # What `revise` needs to take this input back: what the deques drop
+        self._undo = (self._values[0] if len(self._values) == self._values.maxlen else None,
+                      self._maxima[0] if len(self._maxima) == self._maxima.maxlen else None)
+        self.previous = self.value
+        self._window.update(x)
+        self._push(x)
+        self.last_time = time
+        return self.value
+
+    def revise(self, x):
+        x = x if self.high else -x
+        dropped_value, dropped_max = self._undo
+        self._values.pop()
+        self._maxima.pop()
+        if dropped_value is not None:
+            self._values.appendleft(dropped_value)
+        if dropped_max is not None:
+            self._maxima.appendleft(dropped_max)
+        self._count -= 1
+        self._window.revise(x)
+        self._push(x)
+        return self.value
+
+    def _push(self, x):
+        self._values.append(x)
+        self._maxima.append(self._window.value)
+        self._count += 1
+        level = math.nan if self.previous is None else self.previous
+        # The candidate k candles back, once it has k candles on each side
+        if self._count >= 2 * self.k + 1:
+            candidate = self._values[0]
+            if candidate > self._maxima[0] and candidate >= self._window.value:
+                level = candidate if self.high else -candidate
+        self.value = level
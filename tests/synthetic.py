@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_candles(n, seed=0, start=1_700_006_400, seconds=15 * 60, volatility=0.004):
+    """
+    Deterministic random-walk OHLCV candles with uneven wicks, enough
+    sweeps and re-entries for every strategy to fire.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, volatility / 4, n))
+    top = np.maximum(open_, close)
+    bottom = np.minimum(open_, close)
+    return pd.DataFrame({
+        "time": pd.to_datetime(start + seconds * np.arange(n), unit="s"),
+        "open": open_,
+        "high": top * (1 + rng.exponential(volatility / 2, n)),
+        "low": bottom * (1 - rng.exponential(volatility / 2, n)),
+        "close": close,
+        "volume": rng.uniform(1, 10, n),
+    })
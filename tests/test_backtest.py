@@ -0,0 +1,15 @@
+import pytest
+from backtest import backtest_sweep, live_signals
+from synthetic import synthetic_candles
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorized_sweep_matches_live(seed):
+    df = synthetic_candles(1500, seed=seed)
+
+    signals = backtest_sweep(df)
+    fast = [(int(i), s) for i, s in zip(signals["index"], signals["signal"])]
+    slow = live_signals(df)
+
+    assert slow, "the synthetic series should produce signals"
+    assert fast == slow
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import clock
+from candle_cache import CandleCache
+from candle_store import CandleStore
+
+START = 1_700_006_400
+SEC = 900
+
+
+@pytest.fixture
+def virtual_clock():
+    vc = clock.VirtualClock(START)
+    previous = clock.install(vc)
+    yield vc
+    clock.install(previous)
+
+
+def history(symbol, resolution, start, end, timeout=None):
+    # A candle every 15 minutes, published up to the one forming at the virtual now
+    first = -(-int(start) // SEC) * SEC
+    last = min(int(end), int(clock.time()))
+    return [{"time": t, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": t % 7}
+            for t in range(first, last + 1, SEC)]
+
+
+def test_store_has_no_gap_after_downtime(virtual_clock, tmp_path):
+    store = CandleStore(str(tmp_path))
+    cache = CandleCache(fetch=history, store=store)
+
+    virtual_clock.sleep(100 * SEC)
+    cache.refresh("BTCUSD", "15m", limit=10)
+    before = store.count("BTCUSD", "15m")
+
+    # Down for longer than the window: the next refresh cold-starts
+    virtual_clock.sleep(3000 * SEC + 60)
+    cache.refresh("BTCUSD", "15m", limit=10)
+
+    times = store.read("BTCUSD", "15m")["time"]
+    assert len(times) == before + 3000
+    assert (np.diff(times) == SEC).all()
+    assert times[-1] == START + 3099 * SEC
+
+
+def test_restart_backfills_from_the_stored_candles(virtual_clock, tmp_path):
+    virtual_clock.sleep(50 * SEC)
+    CandleCache(fetch=history, store=CandleStore(str(tmp_path))).refresh("BTCUSD", "15m", limit=10)
+
+    virtual_clock.sleep(40 * SEC)
+    store = CandleStore(str(tmp_path))
+    cache = CandleCache(fetch=history, store=store)
+    cache.load("BTCUSD", "15m", limit=10)
+    cache.refresh("BTCUSD", "15m", limit=10)
+
+    times = store.read("BTCUSD", "15m")["time"]
+    assert (np.diff(times) == SEC).all()
+    assert times[-1] == START + 89 * SEC
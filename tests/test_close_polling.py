@@ -0,0 +1,77 @@
+import pytest
+import clock
+from candle_cache import poll_until_closed
+from candles import close_published
+
+CLOSE = 1_700_006_400 + 900  # a 15m close
+SEC = 900
+
+
+@pytest.fixture
+def virtual_clock():
+    vc = clock.VirtualClock(CLOSE)
+    previous = clock.install(vc)
+    yield vc
+    clock.install(previous)
+
+
+def test_rollover_publishes_the_close_right_away():
+    assert close_published(CLOSE, CLOSE, CLOSE + 1, settle=5)
+
+
+def test_closed_candle_settles_after_the_settle_time():
+    assert not close_published(CLOSE - SEC, CLOSE, CLOSE + 2, settle=5)
+    assert close_published(CLOSE - SEC, CLOSE, CLOSE + 5, settle=5)
+
+
+@pytest.mark.parametrize("last_time", [CLOSE - 3 * SEC, None])
+def test_period_without_trades_settles_too(last_time):
+    assert not close_published(last_time, CLOSE, CLOSE + 2, settle=5)
+    assert close_published(last_time, CLOSE, CLOSE + 5, settle=5)
+
+
+def test_thin_symbol_is_not_polled_until_it_is_missed(virtual_clock):
+    # LIQUID rolls over at +2s, THIN's newest candle is hours old, EMPTY has none
+    newest = {"LIQUID": lambda now: CLOSE if now >= CLOSE + 2 else CLOSE - SEC,
+              "THIN": lambda now: CLOSE - 12 * SEC,
+              "EMPTY": lambda now: None}
+    fetches = []
+    settled = {}
+
+    def fetch(symbol):
+        fetches.append(symbol)
+        return newest[symbol](clock.time())
+
+    def on_result(symbol, last_time):
+        if close_published(last_time, CLOSE, clock.time(), settle=5):
+            settled[symbol] = clock.time() - CLOSE
+            return True
+        return False
+
+    missed = poll_until_closed(fetch, list(newest), on_result, give_up_at=CLOSE + 30, interval=1)
+
+    assert missed == []
+    assert settled == {"LIQUID": 2, "THIN": 5, "EMPTY": 5}
+    assert fetches.count("THIN") == 6
+
+
+def test_each_round_is_handed_over_together(virtual_clock):
+    # A and B roll over at +2s, C only settles at +5s
+    newest = {"A": CLOSE + 2, "B": CLOSE + 2, "C": CLOSE + 60}
+    settled, rounds = [], []
+
+    def on_result(symbol, rolls_over_at):
+        last_time = CLOSE if clock.time() >= rolls_over_at else CLOSE - SEC
+        if close_published(last_time, CLOSE, clock.time(), settle=5):
+            settled.append(symbol)
+            return True
+        return False
+
+    def on_round():
+        if settled:
+            rounds.append((clock.time() - CLOSE, sorted(settled)))
+            settled.clear()
+
+    poll_until_closed(newest.get, list(newest), on_result, give_up_at=CLOSE + 30, interval=1, on_round=on_round)
+
+    assert rounds == [(2, ["A", "B"]), (5, ["C"])]
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest import backtest_sweep
+from candles import Candles
+from indicators import EMAState, ema
+from live_state import SeriesState
+from rules import compile_rules, field, stack
+from strategy import liquidity_sweep_rule
+from synthetic import synthetic_candles
+
+
+def as_candles(df):
+    times = ((df["time"] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    return Candles(times, *(df[c].to_numpy(dtype=float) for c in ("open", "high", "low", "close", "volume")))
+
+
+def test_ema_state_matches_ema():
+    close = synthetic_candles(500, seed=4)["close"]
+    expected = ema(close, 5).to_numpy()
+
+    state = EMAState(5)
+    state.seed(close[:100].tolist())
+    assert state.value == expected[99]
+    for i in range(100, len(close)):
+        state.update(close.iloc[i])
+        assert state.value == expected[i]
+        assert state.previous == expected[i - 1]
+
+
+def test_ema_state_revises_and_syncs():
+    close = synthetic_candles(300, seed=5)["close"].tolist()
+    expected = ema(pd.Series(close), 5).to_numpy()
+    times = list(range(len(close)))
+
+    state = EMAState(5)
+    state.seed(close[:50], times[:50])
+    # A re-published last candle, then a sliding window of 100
+    state.update(close[50] + 1, times[50])
+    state.revise(close[50])
+    assert state.value == expected[50]
+    for end in range(52, len(close), 3):
+        start = max(0, end - 100)
+        state.sync(times[start:end], close[start:end])
+        assert state.value == expected[end - 1]
+
+
+@pytest.mark.parametrize("lookback, pivot", [(1, 0), (5, 0), (1, 2)])
+def test_live_state_signals_match_backtest(lookback, pivot):
+    df = synthetic_candles(1200, seed=6)
+    candles = as_candles(df)
+    kernel = compile_rules([liquidity_sweep_rule(field("ema"), levels=(field("swing_low"), field("swing_high")))])
+    assert kernel.history == 3
+    expected = backtest_sweep(df, lookback=lookback, pivot=pivot)
+
+    # The live loop: a 100-candle window sliding one closed candle per cycle
+    state = SeriesState(lookback=lookback, pivot=pivot, keep=kernel.history)
+    live = []
+    for end in range(100, len(candles) + 1):
+        window = candles[end - 100:end]
+        state.sync_candles(window)
+        result = kernel.run(state.fields(window, kernel.history))
+        np.testing.assert_allclose(result.value("sweep", "ema")[-1], ema(df["close"][:end], 5).iloc[-1], rtol=1e-12)
+        signal = result.signal("sweep")[-1]
+        if signal:
+            live.append((end - 1, signal))
+
+    assert live
+    assert live == [(int(i), s) for i, s in zip(expected["index"], expected["signal"]) if i >= 99]
+
+
+def test_stacked_series_match_single_runs():
+    kernel = compile_rules([liquidity_sweep_rule(field("ema"), levels=(field("swing_low"), field("swing_high")))])
+    windows = [as_candles(synthetic_candles(n, seed=seed)) for seed, n in ((7, 300), (8, 120), (9, 40))]
+    states = [SeriesState(keep=kernel.history) for _ in windows]
+    for state, window in zip(states, windows):
+        state.sync_candles(window)
+    data = [state.fields(window, kernel.history) for state, window in zip(states, windows)]
+
+    stacked = kernel.latest(stack(data, kernel.fields(), kernel.history))
+    for row, fields in enumerate(data):
+        single = kernel.run(fields)
+        assert stacked.signal("sweep")[row, -1] == single.signal("sweep")[-1]
+        np.testing.assert_array_equal(stacked.value("sweep", "ema")[row], single.value("sweep", "ema"))
@@ -0,0 +1,42 @@
+import pytest
+from market_data import CircuitOpen, MarketDataClient
+
+URL = "https://api.example.com/v2/history/candles"
+
+
+class Response:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class Session:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+
+    def get(self, url, params=None, timeout=None):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_half_open_trial_failing_with_another_error_is_released():
+    now = [0.0]
+    session = Session(ConnectionError("down"), ValueError("bad payload"), Response())
+    client = MarketDataClient(session, retries=0, breaker_threshold=1, breaker_reset=30, clock=lambda: now[0])
+    breaker = client.breaker("api.example.com")
+
+    with pytest.raises(ConnectionError):
+        client.get(URL)
+    with pytest.raises(CircuitOpen):
+        client.get(URL)
+
+    now[0] = 31.0
+    assert breaker.state == "half-open"
+    with pytest.raises(ValueError):
+        client.get(URL)
+    # The next call is let through as the trial and closes the breaker
+    assert isinstance(client.get(URL), Response)
+    assert breaker.state == "closed"
@@ -0,0 +1,86 @@
+import importlib
+import os
+import sys
+import numpy as np
+import pytest
+from candles import Candles
+from resample import MultiTimeframeSeries
+from synthetic import synthetic_candles
+from conftest import ROOT_DIR
+
+PDL_DIR = os.path.join(ROOT_DIR, "pdl-reentry-bot")
+# pdl-reentry-bot's modules share these names with the root bot's
+PDL_MODULES = ("config", "strategy", "backtest", "multi_strategy")
+
+
+@pytest.fixture(scope="module")
+def pdl():
+    saved = {name: sys.modules.pop(name) for name in PDL_MODULES if name in sys.modules}
+    sys.path.insert(0, PDL_DIR)
+    try:
+        yield {name: importlib.import_module(name) for name in PDL_MODULES}
+    finally:
+        sys.path.remove(PDL_DIR)
+        for name in PDL_MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+def history(seed):
+    # ~3 weeks of 15m candles starting mid-day, so the first day is partial
+    return synthetic_candles(2000, seed=seed, start=1_700_006_400 + 9 * 3600)
+
+
+def rows(pdl, df):
+    times = pdl["backtest"].to_epoch(df["time"])
+    return list(zip(times.tolist(), *(df[c].tolist() for c in ("open", "high", "low", "close", "volume"))))
+
+
+def fast_signals(pdl, df):
+    signals = pdl["backtest"].backtest_pdl(df)
+    return [(int(i), s) for i, s in zip(signals["index"], signals["signal"])]
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_vectorized_pdl_matches_live_strategy(pdl, seed, capsys):
+    df = history(seed)
+    bars = rows(pdl, df)
+    bar_seconds = pdl["backtest"].BAR_SECONDS
+
+    # The single-symbol live loop: levels from locally aggregated daily
+    # candles, then the check on the candles closed so far
+    strategy = pdl["strategy"].Strategy()
+    daily = MultiTimeframeSeries("15m", ["1d"], limit=5)
+    slow = []
+    for k in range(len(bars)):
+        now = bars[k][0] + bar_seconds
+        daily.feed(bars[:k + 1], now)
+        daily_candles = daily.candles("1d")
+        if not daily_candles.empty:
+            strategy.update_levels(daily_candles, includes_forming=False)
+        sig_type, _ = strategy.check_signal(Candles.from_tuples(bars[max(0, k - 10):k + 1]), includes_forming=False)
+        if sig_type:
+            slow.append((k, sig_type))
+    capsys.readouterr()
+
+    assert slow, "the synthetic series should produce signals"
+    assert fast_signals(pdl, df) == slow
+
+
+def test_vectorized_pdl_matches_multi_strategy(pdl):
+    frames = [history(seed) for seed in (0, 1, 2)]
+    scanner = pdl["multi_strategy"].MultiStrategy(["A", "B", "C"])
+    n = len(frames)
+
+    slow = [[] for _ in frames]
+    columns = [{c: f[c].to_numpy(dtype=float) for c in ("open", "high", "low", "close")} for f in frames]
+    times = pdl["backtest"].to_epoch(frames[0]["time"])
+    for k, t in enumerate(times):
+        o, h, l, c = (np.array([col[name][k] for col in columns]) for name in ("open", "high", "low", "close"))
+        sig, _, _ = scanner.on_candle(np.full(n, t), o, h, l, c)
+        for i in np.flatnonzero(sig):
+            slow[i].append((k, "BUY" if sig[i] > 0 else "SELL"))
+
+    for i, df in enumerate(frames):
+        assert slow[i], "the synthetic series should produce signals"
+        assert fast_signals(pdl, df) == slow[i]
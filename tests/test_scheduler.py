@@ -0,0 +1,38 @@
+from scheduler import CandleScheduler
+
+HOUR = 1_700_006_400 + 3600  # an hour boundary
+
+
+def test_next_run_coalesces_closes():
+    scheduler = CandleScheduler(["5m", "15m", "1h"], buffer=5)
+    assert scheduler.next_run(HOUR - 60) == (HOUR, ["5m", "15m", "1h"])
+    assert scheduler.next_run(HOUR + 5) == (HOUR + 300, ["5m"])
+
+
+def test_catch_up_keeps_longer_timeframes_missed_earlier():
+    scheduler = CandleScheduler(["5m", "15m", "1h"], buffer=5)
+    # Last run was for the 55m close; the top-of-hour and 5m-past closes were overrun
+    assert scheduler.last_run(HOUR + 7 * 60, since=HOUR - 300) == (HOUR + 300, ["5m", "15m", "1h"])
+    assert scheduler.last_run(HOUR + 7 * 60, since=HOUR) == (HOUR + 300, ["5m"])
+
+
+def test_run_catches_up_after_an_overrun():
+    now = [HOUR - 360]
+    calls = []
+    scheduler = CandleScheduler(["5m", "1h"], buffer=0, clock=lambda: now[0])
+
+    def wait_until(at):
+        now[0] = max(now[0], at)
+        return not scheduler._stop.is_set()
+
+    def callback(timeframes, close_time):
+        calls.append((close_time, timeframes))
+        if len(calls) == 1:
+            # Overrun past the top of the hour and the 5m close after it
+            now[0] = close_time + 11 * 60
+        else:
+            scheduler.stop()
+
+    scheduler.wait_until = wait_until
+    scheduler.run(callback)
+    assert calls == [(HOUR - 300, ["5m"]), (HOUR + 300, ["5m", "1h"])]
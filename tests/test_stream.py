@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+import clock
+from stream import StreamRunner
+
+CLOSE = 1_700_006_400 + 900  # a 15m close
+SEC = 900
+
+
+def test_fallback_polls_at_the_virtual_closes():
+    gaps = []
+    runner = StreamRunner("ws://unused", ["BTCUSD", "ETHUSD"], ["15m"], on_bar=None,
+                          on_gap=lambda symbol, resolution: gaps.append((symbol, clock.time() - CLOSE)),
+                          poll_buffer=5)
+    runner._dispatch = lambda fn, *args: fn(*args)
+
+    previous = clock.install(clock.VirtualClock(CLOSE - 100, CLOSE + 2 * SEC + 60))
+    try:
+        with pytest.raises(clock.ReplayFinished):
+            asyncio.run(runner._poll_loop())
+    finally:
+        clock.install(previous)
+
+    assert gaps == [("BTCUSD", 5), ("ETHUSD", 5), ("BTCUSD", SEC + 5), ("ETHUSD", SEC + 5),
+                    ("BTCUSD", 2 * SEC + 5), ("ETHUSD", 2 * SEC + 5)]
+
+
+def test_subscription_follows_the_symbol_list():
+    symbols = ["BTCUSD", "ETHUSD"]
+    runner = StreamRunner("ws://unused", lambda: list(symbols), ["5m", "15m"], on_bar=None, on_gap=None)
+    runner._reset_builders(CLOSE)
+
+    symbols[:] = ["BTCUSD", "SOLUSD"]
+    assert runner.refresh_symbols(CLOSE + 30) == (["SOLUSD"], ["ETHUSD"])
+    assert sorted(runner.builders) == [("BTCUSD", "15m"), ("BTCUSD", "5m"), ("SOLUSD", "15m"), ("SOLUSD", "5m")]
+
+    # The first bar of a newly subscribed symbol misses trades
+    builder = runner.builders[("SOLUSD", "15m")]
+    builder.add_trade(10.0, 1, CLOSE + 40)
+    bar = builder.add_trade(11.0, 1, CLOSE + SEC)
+    assert builder.is_partial(bar)
+    assert runner.refresh_symbols(CLOSE + 60) == ([], [])
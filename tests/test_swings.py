@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import swings
+
+
+def brute_pivots(x, k, high):
+    y = x if high else -x
+    n = len(y)
+    return np.array([
+        i >= k and i + k < n and bool(np.all(y[i] > y[i - k:i])) and bool(np.all(y[i] >= y[i + 1:i + k + 1]))
+        for i in range(n)
+    ])
+
+
+@pytest.mark.parametrize("n", [1, 3, 5, 12])
+def test_rolling_min_max(n):
+    x = np.random.default_rng(n).normal(size=50)
+    x[[0, 7, 8]] = np.nan
+    expected_min = [np.nanmin(x[max(0, i - n + 1):i + 1]) if not np.isnan(x[max(0, i - n + 1):i + 1]).all() else np.nan
+                    for i in range(len(x))]
+    np.testing.assert_array_equal(swings.rolling_min(x, n), expected_min)
+    np.testing.assert_array_equal(swings.rolling_max(-x, n), -np.array(expected_min))
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+@pytest.mark.parametrize("high", [True, False])
+def test_is_pivot_needs_k_candles_each_side(k, high):
+    rng = np.random.default_rng(k)
+    for _ in range(50):
+        x = np.round(rng.normal(size=int(rng.integers(2, 40))), 1)
+        np.testing.assert_array_equal(swings.is_pivot(x, k, high), brute_pivots(x, k, high))
+
+
+def test_no_pivot_at_the_left_edge():
+    x = np.array([1, 5, 2, 1, 0, 3, 1, 0.5, 4, 1, 1.0])
+    assert np.flatnonzero(swings.is_pivot(x, 2)).tolist() == [5, 8]
+    # Confirmed two candles after each pivot
+    levels = swings.last_pivot(x, 2)
+    assert np.isnan(levels[:7]).all()
+    assert levels[7:].tolist() == [3, 3, 3, 4]
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+@pytest.mark.parametrize("high", [True, False])
+def test_streaming_states_match_batch(k, high):
+    rng = np.random.default_rng(10 + k)
+    for _ in range(30):
+        x = np.round(rng.normal(size=int(rng.integers(1, 60))), 1)
+        pivots, extremes = swings.last_pivot(x, k, high), (swings.rolling_max if high else swings.rolling_min)(x, k + 2)
+        pivot, extreme = swings.PivotState(k, high), swings.RollingExtreme(k + 2, high)
+        for i, v in enumerate(x):
+            if rng.random() < 0.3:
+                # A re-published candle: applied with another value, then revised
+                pivot.update(v + 3)
+                extreme.update(v - 3)
+                pivot.revise(v)
+                extreme.revise(v)
+            else:
+                pivot.update(v)
+                extreme.update(v)
+            np.testing.assert_array_equal(pivot.value, pivots[i])
+            assert extreme.value == extremes[i]
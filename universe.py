@@ -0,0 +1,127 @@
+import json
+import time
+from delta_api import client, REQUEST_TIMEOUT
+
+PRODUCTS_URL = "https://cdn.india.deltaex.org/v2/products"
+TICKERS_URL = "https://cdn.india.deltaex.org/v2/tickers"
+CONTRACT_TYPE = "perpetual_futures"
+
+
+def fetch_products(timeout=REQUEST_TIMEOUT):
+    """Live perpetual products, as returned by the products endpoint."""
+    params = {"contract_types": CONTRACT_TYPE, "states": "live"}
+    r = client.get(PRODUCTS_URL, params=params, timeout=timeout)
+    return r.json()["result"]
+
+
+def fetch_tickers(timeout=REQUEST_TIMEOUT):
+    """24h tickers of every perpetual, used to rank symbols by turnover."""
+    r = client.get(TICKERS_URL, params={"contract_types": CONTRACT_TYPE}, timeout=timeout)
+    return r.json()["result"]
+
+
+def load_fixture(path):
+    """
+    Offline stand-in for the two endpoints: a JSON file with "products"
+    and "tickers" lists in the API's shapes.
+
+    Returns:
+        (fetch_products, fetch_tickers) callables reading from the file.
+    """
+    def read(key):
+        with open(path) as f:
+            return json.load(f)[key]
+    return (lambda: read("products")), (lambda: read("tickers"))
+
+
+def rank_symbols(products, tickers, pinned=(), tier_sizes=(50,)):
+    """
+    Splits live perpetuals into priority tiers.
+
+    Tier 0 holds the `pinned` symbols that are listed. The rest are ordered
+    by 24h USD turnover (symbols without a ticker last) and cut into tiers of
+    `tier_sizes`; whatever is left forms the final tier.
+
+    Returns:
+        List of tiers, each a list of symbols, highest priority first.
+    """
+    listed = {
+        p["symbol"] for p in products
+        if p.get("contract_type", CONTRACT_TYPE) == CONTRACT_TYPE and p.get("state", "live") == "live"
+    }
+    turnover = {}
+    for t in tickers:
+        try:
+            turnover[t["symbol"]] = float(t.get("turnover_usd") or 0)
+        except (TypeError, ValueError):
+            continue
+
+    tiers = [[s for s in pinned if s in listed]]
+    rest = sorted(listed - set(pinned), key=lambda s: (-turnover.get(s, -1), s))
+    for size in tier_sizes:
+        tiers.append(rest[:size])
+        rest = rest[size:]
+    tiers.append(rest)
+    return [tier for tier in tiers if tier]
+
+
+class Universe:
+    """
+    The set of symbols to scan, discovered from the products endpoint and
+    refreshed every `refresh_interval` seconds.
+
+    A failed refresh keeps the previous list; if discovery has never
+    succeeded, `fallback` (e.g. config.SYMBOLS) is scanned instead.
+    """
+
+    def __init__(self, pinned=(), tier_sizes=(50,), refresh_interval=3600, fallback=(),
+                 fixture=None, clock=time.time):
+        self.pinned = list(pinned)
+        self.tier_sizes = tuple(tier_sizes)
+        self.refresh_interval = refresh_interval
+        self.fallback = list(fallback)
+        self.clock = clock
+        if fixture:
+            self.fetch_products, self.fetch_tickers = load_fixture(fixture)
+        else:
+            self.fetch_products, self.fetch_tickers = fetch_products, fetch_tickers
+        self.tiers = []
+        self.refreshed_at = None
+
+    def refresh(self):
+        try:
+            products = self.fetch_products()
+        except Exception as e:
+            print(f"Error discovering products: {e}")
+            return False
+        try:
+            tickers = self.fetch_tickers()
+        except Exception as e:
+            # Still usable, just without turnover ranking
+            print(f"Error fetching tickers: {e}")
+            tickers = []
+
+        tiers = rank_symbols(products, tickers, self.pinned, self.tier_sizes)
+        if not tiers:
+            print("Product discovery returned no live perpetuals, keeping the previous list")
+            return False
+        self.tiers = tiers
+        self.refreshed_at = self.clock()
+        print(f"Universe: {sum(len(t) for t in tiers)} symbols in tiers of {[len(t) for t in tiers]}")
+        return True
+
+    def symbols(self):
+        """All symbols, highest priority first. Refreshes the list when due."""
+        if self.refreshed_at is None or self.clock() - self.refreshed_at >= self.refresh_interval:
+            if not self.refresh() and self.refreshed_at is not None:
+                # Retry on the next call but don't hammer the endpoint every cycle
+                self.refreshed_at = self.clock() - self.refresh_interval / 2
+        if not self.tiers:
+            return list(self.fallback)
+        return [symbol for tier in self.tiers for symbol in tier]
+
+    def tier_of(self, symbol):
+        for i, tier in enumerate(self.tiers):
+            if symbol in tier:
+                return i
+        return None